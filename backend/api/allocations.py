@@ -0,0 +1,237 @@
+"""
+Выборочный профиль выделения памяти по действиям DRF.
+
+AllocationMiddleware включает tracemalloc на доле запросов SAMPLE_RATE
+и записывает для действия представления (например RecipeViewSet.list)
+пик памяти за запрос, память, оставшуюся занятой после ответа без
+учёта его тела, и места выделения оставшихся блоков. Место — ближайший
+к выделению кадр кода проекта, а если его нет — кадр библиотеки.
+
+Трассировка глобальна для процесса, поэтому воркер профилирует один
+запрос за раз, а выделения других потоков gthread попадают в его
+профиль. Снимки воркеров собираются так же, как у метрик; смотреть —
+/api/allocations/ для staff или команда allocation_report.
+"""
+import atexit
+import copy
+import functools
+import inspect
+import os
+import random
+import threading
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import Http404
+from django.utils.module_loading import import_string
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from .metrics import get_response_size
+from .snapshots import WorkerSnapshotStore
+
+IGNORED_TRACES = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def empty_stats():
+    return {
+        'samples': 0, 'peak_max': 0, 'peak_total': 0, 'net_total': 0,
+        'sites': {},
+    }
+
+
+def trim_sites(sites):
+    """Самые крупные места выделения, остальные отбрасываются."""
+    return dict(sorted(
+        sites.items(), key=lambda item: -item[1][0]
+    )[:settings.ALLOCATION_PROFILING['SITES_LIMIT']])
+
+
+def merge_stats(target, source):
+    for action, stats in source.items():
+        current = target.setdefault(action, empty_stats())
+        current['samples'] += stats['samples']
+        current['peak_max'] = max(current['peak_max'], stats['peak_max'])
+        current['peak_total'] += stats['peak_total']
+        current['net_total'] += stats['net_total']
+        for site, (size, count) in stats['sites'].items():
+            total = current['sites'].setdefault(site, [0, 0])
+            total[0] += size
+            total[1] += count
+        current['sites'] = trim_sites(current['sites'])
+    return target
+
+
+def get_action_label(request):
+    """Класс представления DRF и действие, например RecipeViewSet.list."""
+    match = getattr(request, 'resolver_match', None)
+    view_class = getattr(getattr(match, 'func', None), 'cls', None)
+    if view_class is None:
+        return None
+    method = request.method.lower()
+    actions = getattr(match.func, 'actions', None) or {}
+    return f'{view_class.__name__}.{actions.get(method, method)}'
+
+
+@functools.lru_cache()
+def get_middleware_files():
+    """Файлы middleware: они есть в стеке любого запроса."""
+    return frozenset(
+        inspect.getfile(import_string(path)) for path in settings.MIDDLEWARE
+    )
+
+
+def allocation_site(traceback, base_dir):
+    """Ближайший к выделению кадр проекта, кроме кадров middleware."""
+    skipped = get_middleware_files()
+    for frame in reversed(traceback):
+        if (frame.filename.startswith(base_dir)
+                and 'site-packages' not in frame.filename
+                and frame.filename not in skipped):
+            return (
+                f'{os.path.relpath(frame.filename, base_dir)}:'
+                f'{frame.lineno}'
+            )
+    frame = traceback[-1]
+    filename = frame.filename.split('site-packages/')[-1]
+    if filename.startswith(base_dir):
+        filename = os.path.relpath(filename, base_dir)
+    return f'{filename}:{frame.lineno}'
+
+
+def top_sites(snapshot):
+    base_dir = str(settings.BASE_DIR)
+    sites = {}
+    for stat in snapshot.filter_traces(IGNORED_TRACES).statistics(
+        'traceback'
+    ):
+        site = sites.setdefault(
+            allocation_site(stat.traceback, base_dir), [0, 0]
+        )
+        site[0] += stat.size
+        site[1] += stat.count
+    return trim_sites(sites)
+
+
+class AllocationRegistry:
+    """Профили действий в текущем воркере."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._flushed_at = time.monotonic()
+        self.store = WorkerSnapshotStore(
+            settings.ALLOCATION_PROFILING['DIR'], merge_stats
+        )
+
+    def observe(self, action, peak, net, sites):
+        with self._lock:
+            merge_stats(self._stats, {action: {
+                'samples': 1, 'peak_max': peak, 'peak_total': peak,
+                'net_total': net, 'sites': sites,
+            }})
+        if (time.monotonic() - self._flushed_at
+                > settings.ALLOCATION_PROFILING['FLUSH_INTERVAL']):
+            self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            return copy.deepcopy(self._stats)
+
+    def flush(self):
+        self._flushed_at = time.monotonic()
+        self.store.write(self.snapshot())
+
+    def collect(self):
+        """Суммарные профили всех воркеров."""
+        total = self.snapshot()
+        for snapshot in self.store.read_all(exclude_pid=os.getpid()):
+            total = merge_stats(total, snapshot)
+        return total
+
+
+registry = None
+
+
+def get_registry():
+    global registry
+    if registry is None:
+        registry = AllocationRegistry()
+        atexit.register(registry.flush)
+    return registry
+
+
+class AllocationMiddleware:
+
+    def __init__(self, get_response):
+        if not settings.ALLOCATION_PROFILING['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.registry = get_registry()
+        self._tracing = threading.Lock()
+
+    def __call__(self, request):
+        options = settings.ALLOCATION_PROFILING
+        # Трассировку, включённую не нами (PYTHONTRACEMALLOC), не трогаем.
+        if (random.random() >= options['SAMPLE_RATE']
+                or tracemalloc.is_tracing()
+                or not self._tracing.acquire(blocking=False)):
+            return self.get_response(request)
+        try:
+            tracemalloc.start(options['FRAMES'])
+            try:
+                response = self.get_response(request)
+                current, peak = tracemalloc.get_traced_memory()
+                snapshot = tracemalloc.take_snapshot()
+            finally:
+                tracemalloc.stop()
+        finally:
+            self._tracing.release()
+        action = get_action_label(request)
+        if action is not None:
+            self.registry.observe(
+                action, peak,
+                max(current - get_response_size(response), 0),
+                top_sites(snapshot)
+            )
+        return response
+
+
+def summarize(stats, top):
+    """Профили действий по убыванию пика, размеры в КБ."""
+    rows = []
+    for action, data in stats.items():
+        samples = data['samples']
+        rows.append({
+            'action': action,
+            'samples': samples,
+            'peak_max_kb': round(data['peak_max'] / 1024, 1),
+            'peak_avg_kb': round(data['peak_total'] / samples / 1024, 1),
+            'net_avg_kb': round(data['net_total'] / samples / 1024, 1),
+            'sites': [
+                {
+                    'site': site,
+                    'avg_kb': round(size / samples / 1024, 1),
+                    'blocks': count,
+                }
+                for site, (size, count) in list(data['sites'].items())[:top]
+            ],
+        })
+    return sorted(rows, key=lambda row: -row['peak_max_kb'])
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def allocations_view(request):
+    if not settings.ALLOCATION_PROFILING['ENABLED']:
+        raise Http404
+    return Response(summarize(
+        get_registry().collect(), settings.ALLOCATION_PROFILING['TOP']
+    ))
@@ -4,3 +4,21 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.conf import settings
+        from foodgram.cache import two_tier_cache
+
+        from . import signals  # noqa: F401
+
+        two_tier_cache.check_shared()
+
+        if (settings.THROTTLING['ENABLED']
+                or settings.THROTTLING['ADMISSION']['ENABLED']):
+            from . import throttling
+
+            throttling.check_cache()
+        if settings.SLOW_QUERIES['ENABLED']:
+            from . import slow_queries
+
+            slow_queries.install()
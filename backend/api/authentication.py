@@ -0,0 +1,64 @@
+import copy
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from foodgram.cache import two_tier_cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+TOKEN_CACHE_PREFIX = 'auth-token:'
+
+_request_identities = ContextVar('request_identities', default=None)
+
+
+def invalidate_token(key):
+    """Сбрасывает запись токена во всех воркерах."""
+    two_tier_cache.invalidate_tags(f'token:{key}')
+
+
+@contextmanager
+def request_identities(**identities):
+    """
+    Кэш личностей на время одного внешнего запроса: вложенные запросы
+    пакета с тем же токеном получают пользователя без обращения к кэшам.
+    """
+    reset = _request_identities.set(dict(identities))
+    try:
+        yield
+    finally:
+        _request_identities.reset(reset)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по токену с кэшированием пары (пользователь, токен).
+    Экономит запрос к таблице токенов на каждом авторизованном запросе.
+
+    Пара хранится в двухуровневом кэше с тегами token:<key> и
+    user:<id>: выход, смена пароля или деактивация в одном воркере
+    делают запись устаревшей во всех воркерах.
+    """
+
+    def authenticate_credentials(self, key):
+        identities = _request_identities.get()
+        if identities is not None and key in identities:
+            return identities[key]
+        cached = two_tier_cache.get(TOKEN_CACHE_PREFIX + key)
+        if cached is not None:
+            user, token = cached
+            if not user.is_active:
+                raise AuthenticationFailed(_('User inactive or deleted.'))
+            # Копия защищает общий объект от изменений внутри запроса.
+            return copy.copy(user), token
+        # Версия тега токена берётся до запроса: удаление токена во время
+        # запроса не даст сохранить его как действующий.
+        versions = two_tier_cache.tag_versions([f'token:{key}'])
+        user, token = super().authenticate_credentials(key)
+        versions.update(two_tier_cache.tag_versions([f'user:{user.pk}']))
+        two_tier_cache.set(
+            TOKEN_CACHE_PREFIX + key, (user, token),
+            timeout=settings.TOKEN_AUTH_CACHE['TTL'], tag_versions=versions
+        )
+        return copy.copy(user), token
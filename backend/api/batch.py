@@ -0,0 +1,103 @@
+"""
+Пакетные GET-запросы для начальной загрузки клиента.
+
+Вложенные запросы выполняются в том же процессе и на том же
+подключении к БД, что и внешний, без повторного прохода через
+middleware. Пользователь, определённый внешним запросом, передаётся
+вложенным через кэш личностей, поэтому токен проверяется один раз.
+"""
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import Resolver404, resolve
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .authentication import request_identities
+from .serializers import BatchRequestSerializer
+
+API_PREFIX = '/api/'
+
+
+def make_subrequest(request, path, query):
+    environ = dict(request.META)
+    environ.update({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'CONTENT_LENGTH': '0',
+        'wsgi.input': BytesIO(),
+    })
+    environ.pop('CONTENT_TYPE', None)
+    return WSGIRequest(environ)
+
+
+def release(response):
+    """
+    Закрывает файлы и итераторы вложенного ответа. response.close()
+    отправил бы request_finished и закрыл подключение к БД посреди
+    внешнего запроса.
+    """
+    closers, response._resource_closers = response._resource_closers, []
+    for closer in closers:
+        closer()
+
+
+class BatchView(APIView):
+    """Выполняет список GET-запросов к API и возвращает все ответы."""
+    permission_classes = (AllowAny,)
+
+    def post(self, request):
+        serializer = BatchRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        identities = {}
+        if request.auth is not None:
+            identities[request.auth.key] = (request.user, request.auth)
+        with request_identities(**identities):
+            responses = [
+                self.dispatch_subrequest(request, url)
+                for url in serializer.validated_data['requests']
+            ]
+        return Response({'responses': responses})
+
+    def dispatch_subrequest(self, request, url):
+        parts = urlsplit(url)
+        result = {'url': url}
+        try:
+            if not parts.path.startswith(API_PREFIX):
+                raise Resolver404
+            match = resolve(parts.path)
+        except Resolver404:
+            result.update(status=status.HTTP_404_NOT_FOUND, body=None)
+            return result
+        view_class = getattr(match.func, 'cls', None)
+        if view_class is None or issubclass(view_class, BatchView):
+            result.update(
+                status=status.HTTP_400_BAD_REQUEST,
+                body={'detail': 'Маршрут недоступен в пакетном запросе.'}
+            )
+            return result
+        subrequest = make_subrequest(request, parts.path, parts.query)
+        subrequest.resolver_match = match
+        response = match.func(subrequest, *match.args, **match.kwargs)
+        try:
+            if response.streaming:
+                result.update(
+                    status=status.HTTP_400_BAD_REQUEST,
+                    body={'detail': 'Потоковый ответ недоступен в пакетном '
+                                    'запросе.'}
+                )
+            else:
+                result.update(
+                    status=response.status_code,
+                    body=getattr(response, 'data', None)
+                )
+        finally:
+            release(response)
+        return result
+
+
+batch_view = BatchView.as_view()
@@ -1,4 +1,7 @@
 SHOPPING_CART_NAME = 'user_shopping_cart.pdf'
+# Меняется вместе с оформлением PDF, чтобы старые выгрузки не отдавались.
+SHOPPING_CART_EXPORT_VERSION = 1
+EXPORT_ARCHIVE_INVALID = 'Допустимые значения: ndjson, zip.'
 SELF_SUB = 'Пользователь не может подписаться сам на себя.'
 DOUBLE_SUB = 'Нельзя дважды подписаться на одного юзера.'
 NO_EXIST_SUB = 'Подписка уже удалена либо не была ранее создана.'
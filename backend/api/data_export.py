@@ -0,0 +1,193 @@
+"""
+Выгрузка всех данных пользователя: профиль, рецепты с ингредиентами
+и тегами, избранное, список покупок и подписки.
+
+Разделы читаются через iterator(chunk_size) — в PostgreSQL это курсоры
+на стороне сервера — и сразу превращаются в строки NDJSON, так что
+память не растёт с числом рецептов. iterator() не поддерживает
+prefetch_related, поэтому ингредиенты и теги идут отдельными потоками,
+отсортированными по id рецепта, и присоединяются к рецептам слиянием.
+Выгрузка не атомарна: изменения во время неё могут попасть в одни
+разделы и не попасть в другие.
+"""
+import json
+import zipfile
+from itertools import groupby
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from recipes.models import Favorite, IngredientRecipe, Recipe, ShoppingCart
+from recipes.registry import ingredient_registry
+from user.models import Follow
+
+ITERATOR_CHUNK_SIZE = 2000
+STREAM_BUFFER_SIZE = 64 * 1024
+
+
+def iter_profile(user):
+    yield {
+        'type': 'profile', 'id': user.pk, 'email': user.email,
+        'username': user.username, 'first_name': user.first_name,
+        'last_name': user.last_name, 'date_joined': user.date_joined,
+    }
+
+
+def attach(rows):
+    """
+    Строки потока, отсортированного по id рецепта, для очередного
+    рецепта. Рецепты запрашиваются по возрастанию id.
+    """
+    groups = groupby(rows, key=lambda row: row[0])
+    current = next(groups, None)
+
+    def take(recipe_id):
+        nonlocal current
+        while current is not None and current[0] < recipe_id:
+            current = next(groups, None)
+        if current is None or current[0] != recipe_id:
+            return []
+        return [row[1:] for row in current[1]]
+
+    return take
+
+
+def iter_recipes(user):
+    ingredients = attach(IngredientRecipe.objects.filter(
+        recipe__author=user
+    ).order_by('recipe_id', 'id').values_list(
+        'recipe_id', 'ingredient_id', 'amount'
+    ).iterator(chunk_size=ITERATOR_CHUNK_SIZE))
+    tags = attach(Recipe.tags.through.objects.filter(
+        recipe__author=user
+    ).order_by('recipe_id', 'tag_id').values_list(
+        'recipe_id', 'tag__slug'
+    ).iterator(chunk_size=ITERATOR_CHUNK_SIZE))
+    catalog = ingredient_registry.get()
+    for recipe in Recipe.visible.filter(author=user).order_by('id').values(
+        'id', 'name', 'text', 'cooking_time', 'created_at', 'image'
+    ).iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+        amounts = ingredients(recipe['id'])
+        if any(pk not in catalog for pk, _ in amounts):
+            catalog = ingredient_registry.get([pk for pk, _ in amounts])
+        yield {
+            'type': 'recipe', **recipe,
+            'image': (
+                settings.MEDIA_URL + recipe['image'] if recipe['image']
+                else None
+            ),
+            'tags': [slug for slug, in tags(recipe['id'])],
+            'ingredients': [
+                {
+                    'id': pk, 'name': catalog[pk][0],
+                    'measurement_unit': catalog[pk][1], 'amount': amount,
+                }
+                for pk, amount in amounts
+            ],
+        }
+
+
+def iter_relations(model, kind):
+    def iter_rows(user):
+        for recipe_id, name in model.objects.filter(
+            user=user, recipe__pending_deletion=False
+        ).order_by('id').values_list('recipe_id', 'recipe__name').iterator(
+            chunk_size=ITERATOR_CHUNK_SIZE
+        ):
+            yield {'type': kind, 'recipe_id': recipe_id, 'name': name}
+
+    return iter_rows
+
+
+def iter_subscriptions(user):
+    for author_id, username, subscribed_at in Follow.objects.filter(
+        user=user, author__pending_deletion=False
+    ).order_by('id').values_list(
+        'author_id', 'author__username', 'subscribe_date'
+    ).iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+        yield {
+            'type': 'subscription', 'author_id': author_id,
+            'username': username, 'subscribed_at': subscribed_at,
+        }
+
+
+SECTIONS = (
+    ('profile', iter_profile),
+    ('recipes', iter_recipes),
+    ('favorites', iter_relations(Favorite, 'favorite')),
+    ('shopping_cart', iter_relations(ShoppingCart, 'shopping_cart')),
+    ('subscriptions', iter_subscriptions),
+)
+
+
+def buffered(records):
+    """Строки NDJSON, собранные в куски около STREAM_BUFFER_SIZE байт."""
+    buffer, size = [], 0
+    for record in records:
+        line = json.dumps(
+            record, cls=DjangoJSONEncoder, ensure_ascii=False
+        ).encode() + b'\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= STREAM_BUFFER_SIZE:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def iter_ndjson(user):
+    for _, section in SECTIONS:
+        yield from buffered(section(user))
+
+
+class ZipStream:
+    """
+    Файл только для записи: zipfile пишет в него архив, а генератор
+    забирает накопленное. Без seek zipfile пишет размеры после данных.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        if chunks:
+            yield b''.join(chunks)
+
+
+def iter_zip(user):
+    """Разделы в отдельных файлах NDJSON и картинки рецептов."""
+    stream = ZipStream()
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, section in SECTIONS:
+            with archive.open(f'{name}.ndjson', 'w') as entry:
+                for chunk in buffered(section(user)):
+                    entry.write(chunk)
+                    yield from stream.drain()
+        # Пустое имя открыло бы сам MEDIA_ROOT и оборвало архив
+        # посреди ответа.
+        for image in Recipe.visible.filter(author=user).exclude(
+            image=''
+        ).values_list('image', flat=True).iterator(
+            chunk_size=ITERATOR_CHUNK_SIZE
+        ):
+            # Картинки уже сжаты: ZipInfo по умолчанию без сжатия.
+            info = zipfile.ZipInfo(image, timezone.now().timetuple()[:6])
+            try:
+                source = default_storage.open(image)
+            except FileNotFoundError:
+                continue
+            with source, archive.open(info, 'w') as entry:
+                for chunk in source.chunks(STREAM_BUFFER_SIZE):
+                    entry.write(chunk)
+                    yield from stream.drain()
+    yield from stream.drain()
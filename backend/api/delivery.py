@@ -0,0 +1,103 @@
+"""
+Отдача файлов через nginx.
+
+Django проверяет доступ и отвечает пустым ответом с заголовком
+X-Accel-Redirect, а файл отдаёт nginx из internal-локации через
+sendfile: воркер освобождается сразу, а не на время передачи.
+Каталоги и соответствующие им локации перечислены в
+settings.X_ACCEL['LOCATIONS']. Без X_ACCEL_ENABLED (runserver,
+проверки) файл отдаёт сам Django.
+
+Сгенерированные файлы (PDF списка покупок) кладутся в EXPORTS_ROOT под
+именем из хэша содержимого запроса: пока список не изменился,
+повторная загрузка не генерирует файл заново.
+"""
+import hashlib
+import mimetypes
+import os
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+
+EXPORT_MODE = 0o644
+
+
+def content_disposition(filename, as_attachment):
+    disposition = 'attachment' if as_attachment else 'inline'
+    try:
+        filename.encode('ascii')
+    except UnicodeEncodeError:
+        return f"{disposition}; filename*=utf-8''{quote(filename)}"
+    return f'{disposition}; filename="{filename}"'
+
+
+def get_internal_url(path):
+    """Адрес файла в internal-локации nginx."""
+    path = Path(path).resolve()
+    for root, location in settings.X_ACCEL['LOCATIONS'].items():
+        root = Path(root).resolve()
+        if root in path.parents:
+            return location + quote(str(path.relative_to(root)))
+    raise ValueError(f'{path} вне каталогов X_ACCEL["LOCATIONS"]')
+
+
+def send_file(path, filename=None, as_attachment=False):
+    """Ответ с файлом, который отдаёт nginx. Доступ проверяет вызывающий."""
+    filename = filename or Path(path).name
+    if not settings.X_ACCEL['ENABLED']:
+        return FileResponse(
+            open(path, 'rb'), as_attachment=as_attachment, filename=filename
+        )
+    response = HttpResponse(content_type=(
+        mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    ))
+    response['X-Accel-Redirect'] = get_internal_url(path)
+    response['Content-Disposition'] = content_disposition(
+        filename, as_attachment
+    )
+    return response
+
+
+def get_export(kind, owner_id, key, suffix, render):
+    """
+    Путь к файлу выгрузки владельца. Файл создаётся вызовом render(),
+    возвращающим BytesIO, только если выгрузки с таким key ещё нет;
+    выгрузки этого вида у владельца, созданные или отданные до начала
+    генерации, удаляются.
+    """
+    directory = Path(settings.EXPORTS_ROOT) / kind / str(owner_id)
+    digest = hashlib.sha256(repr(key).encode()).hexdigest()[:32]
+    path = directory / f'{digest}.{suffix}'
+    try:
+        # Отданный файл не должен выглядеть старым для очистки ниже.
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+    else:
+        return path
+    directory.mkdir(parents=True, exist_ok=True)
+    started = time.time()
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix='.')
+    try:
+        with open(descriptor, 'wb') as file:
+            file.write(render().getbuffer())
+        # mkstemp создаёт файл с правами 0600, а nginx работает под
+        # другим пользователем.
+        os.chmod(temporary, EXPORT_MODE)
+        os.replace(temporary, path)
+    except BaseException:
+        Path(temporary).unlink(missing_ok=True)
+        raise
+    # Файл, созданный параллельным запросом за время генерации, может
+    # прямо сейчас отдаваться клиенту — его не трогаем.
+    for stale in directory.glob(f'*.{suffix}'):
+        try:
+            if stale != path and stale.stat().st_mtime < started:
+                stale.unlink()
+        except FileNotFoundError:
+            pass
+    return path
@@ -0,0 +1,99 @@
+"""
+Быстрая сериализация рецептов на чтение.
+
+Строит тот же JSON, что RecipeReadSerializer, из кортежей values_list()
+без экземпляров моделей и полей DRF: поля берутся заранее собранными
+itemgetter, а вложенные теги, ингредиенты и авторы загружаются по одному
+запросу на страницу, названия ингредиентов — из справочника в памяти.
+Совпадение вывода проверяет команда check_serializer_parity.
+"""
+from collections import defaultdict
+from operator import itemgetter
+
+from recipes.models import IngredientRecipe, Recipe
+from recipes.registry import ingredient_registry
+
+RECIPE_FIELDS = ('id', 'name', 'image', 'text', 'cooking_time', 'author_id')
+RELATION_FIELDS = ('is_favorited', 'is_in_shopping_cart')
+USER_FIELDS = ('id', 'username', 'first_name', 'last_name', 'email')
+TAG_FIELDS = ('id', 'name', 'color', 'slug')
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit', 'amount')
+
+TAG_COLUMNS = ('tag_id', 'tag__name', 'tag__color', 'tag__slug')
+
+get_recipe_id = itemgetter(0)
+get_author_id = itemgetter(5)
+get_relations = itemgetter(6, 7)
+get_tail = itemgetter(slice(1, None))
+
+image_storage = Recipe._meta.get_field('image').storage
+
+
+def recipe_values(queryset, user):
+    """Кортежи полей рецептов для serialize_recipes()."""
+    fields = RECIPE_FIELDS
+    if user.is_authenticated:
+        fields += RELATION_FIELDS
+    return queryset.values_list(*fields)
+
+
+def group_rows(queryset, columns, fields):
+    grouped = defaultdict(list)
+    for row in queryset.values_list('recipe_id', *columns):
+        grouped[row[0]].append(dict(zip(fields, get_tail(row))))
+    return grouped
+
+
+def serialize_recipes(rows, request, authors):
+    """
+    Рецепты из кортежей recipe_values(). authors — queryset
+    пользователей с аннотацией is_subscribed для авторизованных.
+    """
+    ids = [get_recipe_id(row) for row in rows]
+    tags = group_rows(
+        Recipe.tags.through.objects.filter(recipe_id__in=ids).order_by(
+            'tag_id'
+        ), TAG_COLUMNS, TAG_FIELDS
+    )
+    ingredients = defaultdict(list)
+    amounts = list(IngredientRecipe.objects.filter(
+        recipe_id__in=ids
+    ).order_by('id').values_list('recipe_id', 'ingredient_id', 'amount'))
+    catalog = ingredient_registry.get({row[1] for row in amounts})
+    for recipe_id, ingredient_id, amount in amounts:
+        ingredients[recipe_id].append(dict(zip(INGREDIENT_FIELDS, (
+            ingredient_id, *catalog[ingredient_id], amount
+        ))))
+    authenticated = request.user.is_authenticated
+    author_columns = USER_FIELDS + (('is_subscribed',) if authenticated
+                                    else ())
+    users = {
+        row[0]: dict(zip(USER_FIELDS, row), is_subscribed=(
+            row[-1] if authenticated else False
+        ))
+        for row in authors.filter(
+            pk__in={get_author_id(row) for row in rows}
+        ).values_list(*author_columns)
+    }
+
+    results = []
+    for row in rows:
+        recipe_id, name, image, text, cooking_time, author_id = row[:6]
+        is_favorited, is_in_shopping_cart = (
+            get_relations(row) if authenticated else (False, False)
+        )
+        results.append({
+            'id': recipe_id,
+            'name': name,
+            'tags': tags.get(recipe_id, []),
+            'author': users[author_id],
+            'ingredients': ingredients.get(recipe_id, []),
+            'image': request.build_absolute_uri(
+                image_storage.url(image)
+            ) if image else None,
+            'text': text,
+            'cooking_time': cooking_time,
+            'is_favorited': is_favorited,
+            'is_in_shopping_cart': is_in_shopping_cart,
+        })
+    return results
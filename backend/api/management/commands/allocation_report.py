@@ -0,0 +1,64 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.allocations import merge_stats, summarize
+from api.snapshots import WorkerSnapshotStore
+
+SORT_KEYS = {
+    'peak': lambda row: row['peak_max_kb'],
+    'net': lambda row: row['net_avg_kb'],
+    'samples': lambda row: row['samples'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводка выборочного профиля памяти по действиям DRF '
+        'из снимков всех воркеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir', default=settings.ALLOCATION_PROFILING['DIR'],
+            help='Каталог снимков воркеров.'
+        )
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--sites', type=int, default=5,
+            help='Мест выделения на действие.'
+        )
+        parser.add_argument(
+            '--sort', choices=sorted(SORT_KEYS), default='peak'
+        )
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        stats = {}
+        for snapshot in WorkerSnapshotStore(
+            options['dir'], merge_stats
+        ).read_all():
+            stats = merge_stats(stats, snapshot)
+        rows = sorted(
+            summarize(stats, options['sites']),
+            key=SORT_KEYS[options['sort']], reverse=True
+        )[:options['limit']]
+        if options['json']:
+            self.stdout.write(json.dumps(rows, indent=2, ensure_ascii=False))
+            return
+        if not rows:
+            self.stdout.write('Профилей нет: включите ALLOCATION_PROFILING.')
+            return
+        for row in rows:
+            self.stdout.write(
+                f'{row["action"]:40} запросов {row["samples"]:5}  '
+                f'пик макс {row["peak_max_kb"]:9.1f} КБ  '
+                f'сред {row["peak_avg_kb"]:9.1f} КБ  '
+                f'осталось {row["net_avg_kb"]:8.1f} КБ'
+            )
+            for site in row['sites']:
+                self.stdout.write(
+                    f'    {site["avg_kb"]:9.1f} КБ  {site["blocks"]:6} '
+                    f'блоков  {site["site"]}'
+                )
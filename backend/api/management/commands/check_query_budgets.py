@@ -0,0 +1,362 @@
+import tempfile
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from foodgram.cache import two_tier_cache
+from recipes.dataset import DATASET_PASSWORD, generate_dataset
+from recipes.models import Recipe, Tag
+from recipes.registry import ingredient_registry
+from rest_framework.authtoken.models import Token
+
+from api.authentication import invalidate_token
+from api.testing import IMAGE, QueryRecorder, api_client, isolated_database
+from api.urls import router
+
+User = get_user_model()
+
+Check = namedtuple('Check', 'route method actor path data budget')
+
+# Управление транзакциями зависит от СУБД и в бюджет не входит.
+TRANSACTION_STATEMENTS = (
+    'BEGIN', 'SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT'
+)
+
+SMALL_SCALE = {
+    'users': 4, 'follows': 2, 'recipes': 4, 'ingredients': 10,
+    'ingredients_per_recipe': 2, 'tags': 3, 'tags_per_recipe': 1,
+    'favorites': 2, 'cart': 2,
+}
+LARGE_SCALE = {
+    'users': 40, 'follows': 12, 'recipes': 60, 'ingredients': 40,
+    'ingredients_per_recipe': 7, 'tags': 6, 'tags_per_recipe': 3,
+    'favorites': 12, 'cart': 8,
+}
+
+
+def recipe_payload(ctx):
+    return {
+        'name': f'Рецепт {ctx.prefix}',
+        'text': f'Описание {ctx.prefix}',
+        'cooking_time': 10,
+        'image': IMAGE,
+        'tags': ctx.tag_ids,
+        'ingredients': [
+            {'id': pk, 'amount': 5} for pk in ctx.ingredient_ids
+        ],
+    }
+
+
+def user_payload(name):
+    return lambda ctx: {
+        'email': f'{ctx.prefix}-{name}@example.com',
+        'username': f'{ctx.prefix}-{name}',
+        'first_name': 'Имя',
+        'last_name': 'Фамилия',
+        'password': 'Qwerty-123456',
+    }
+
+
+# Порядок важен: запросы на запись идут после чтения и опираются
+# на созданные ранее объекты (например, own_recipe_id).
+CHECKS = (
+    Check('api-root', 'GET', 'anonymous', '/api/', None, 0),
+    Check('metrics', 'GET', 'anonymous', '/api/metrics', None, 0),
+    Check('allocations', 'GET', 'user', '/api/allocations/', None, 1),
+    Check('recipes-list', 'GET', 'anonymous',
+          '/api/recipes/?limit=10', None, 5),
+    Check('recipes-list', 'GET', 'user',
+          '/api/recipes/?limit=10', None, 6),
+    Check('recipes-list', 'GET', 'user',
+          '/api/recipes/?limit=10&is_favorited=1', None, 6),
+    Check('recipes-list', 'GET', 'anonymous',
+          '/api/recipes/?limit=10&tags={tag_slug}', None, 6),
+    Check('recipes-list', 'GET', 'user',
+          '/api/recipes/?limit=10&sideload=true', None, 6),
+    Check('recipes-detail', 'GET', 'anonymous',
+          '/api/recipes/{recipe_id}/', None, 4),
+    Check('recipes-detail', 'GET', 'user',
+          '/api/recipes/{recipe_id}/', None, 5),
+    Check('recipes-download-shopping-cart', 'GET', 'user',
+          '/api/recipes/download_shopping_cart/', None, 2),
+    Check('tags-list', 'GET', 'anonymous', '/api/tags/', None, 1),
+    Check('tags-detail', 'GET', 'anonymous',
+          '/api/tags/{tag_id}/', None, 1),
+    Check('ingredients-list', 'GET', 'anonymous',
+          '/api/ingredients/?name={ingredient_prefix}', None, 1),
+    Check('ingredients-detail', 'GET', 'user',
+          '/api/ingredients/{ingredient_id}/', None, 2),
+    Check('users-list', 'GET', 'anonymous', '/api/users/', None, 2),
+    Check('users-list', 'GET', 'user', '/api/users/', None, 3),
+    Check('users-detail', 'GET', 'user',
+          '/api/users/{author_id}/', None, 2),
+    Check('users-me', 'GET', 'user', '/api/users/me/', None, 2),
+    Check('users-subscriptions', 'GET', 'user',
+          '/api/users/subscriptions/?recipes_limit=2', None, 4),
+    Check('batch', 'POST', 'user', '/api/batch/', {'requests': [
+        '/api/users/me/', '/api/tags/', '/api/recipes/?limit=10',
+        '/api/ingredients/?name=small',
+    ]}, 9),
+    Check('recipes-favorite', 'POST', 'user',
+          '/api/recipes/{free_recipe_id}/favorite/', None, 4),
+    Check('recipes-favorite', 'DELETE', 'user',
+          '/api/recipes/{free_recipe_id}/favorite/', None, 3),
+    Check('recipes-shopping_cart', 'POST', 'user',
+          '/api/recipes/{free_recipe_id}/shopping_cart/', None, 4),
+    Check('recipes-shopping_cart', 'DELETE', 'user',
+          '/api/recipes/{free_recipe_id}/shopping_cart/', None, 3),
+    Check('recipes-favorite-batch', 'POST', 'user',
+          '/api/recipes/favorite/batch/', lambda ctx: {
+              'add': ctx.batch_ids[:3], 'remove': ctx.batch_ids[3:]
+          }, 5),
+    Check('recipes-shopping_cart-batch', 'POST', 'user',
+          '/api/recipes/shopping_cart/batch/', lambda ctx: {
+              'add': ctx.batch_ids[:3], 'remove': ctx.batch_ids[3:]
+          }, 5),
+    Check('users-subscribe', 'POST', 'user',
+          '/api/users/{free_author_id}/subscribe/', None, 10),
+    Check('users-subscribe', 'DELETE', 'user',
+          '/api/users/{free_author_id}/subscribe/', None, 4),
+    Check('recipes-list', 'POST', 'user',
+          '/api/recipes/', recipe_payload, 15),
+    Check('recipes-detail', 'PATCH', 'user',
+          '/api/recipes/{own_recipe_id}/', recipe_payload, 16),
+    Check('recipes-detail', 'PUT', 'user',
+          '/api/recipes/{own_recipe_id}/', recipe_payload, 16),
+    Check('recipes-detail', 'DELETE', 'user',
+          '/api/recipes/{own_recipe_id}/', None, 9),
+    Check('users-list', 'POST', 'anonymous',
+          '/api/users/', user_payload('new'), 4),
+    Check('login', 'POST', 'anonymous', '/api/auth/token/login/',
+          lambda ctx: {'email': ctx.email, 'password': DATASET_PASSWORD},
+          3),
+    Check('users-detail', 'PATCH', 'user',
+          '/api/users/{user_id}/', {'first_name': 'Новое'}, 4),
+    Check('users-detail', 'PUT', 'user',
+          '/api/users/{user_id}/', user_payload('detail'), 6),
+    Check('users-me', 'PATCH', 'user',
+          '/api/users/me/', {'last_name': 'Новая'}, 4),
+    Check('users-me', 'PUT', 'user',
+          '/api/users/me/', user_payload('me'), 6),
+    Check('users-activation', 'POST', 'anonymous',
+          '/api/users/activation/', {'uid': 'x', 'token': 'x'}, 0),
+    Check('users-resend-activation', 'POST', 'anonymous',
+          '/api/users/resend_activation/', {'email': 'x@x.ru'}, 1),
+    Check('users-reset-password', 'POST', 'anonymous',
+          '/api/users/reset_password/', {'email': 'x@x.ru'}, 1),
+    Check('users-reset-password-confirm', 'POST', 'anonymous',
+          '/api/users/reset_password_confirm/', {'uid': 'x'}, 0),
+    Check('users-reset-username', 'POST', 'anonymous',
+          '/api/users/reset_email/', {'email': 'x@x.ru'}, 1),
+    Check('users-reset-username-confirm', 'POST', 'anonymous',
+          '/api/users/reset_email_confirm/', {'uid': 'x'}, 0),
+    Check('users-set-username', 'POST', 'user', '/api/users/set_email/',
+          {'current_password': 'wrong'}, 1),
+    Check('users-set-password', 'POST', 'user', '/api/users/set_password/',
+          {'current_password': DATASET_PASSWORD,
+           'new_password': 'Qwerty-654321'}, 2),
+    Check('users-me', 'DELETE', 'victim', '/api/users/me/',
+          {'current_password': DATASET_PASSWORD}, 8),
+    Check('users-detail', 'DELETE', 'victim', '/api/users/{victim_id}/',
+          {'current_password': DATASET_PASSWORD}, 9),
+    Check('users-me-export', 'GET', 'user', '/api/users/me/export/',
+          None, 7),
+    Check('users-me-export', 'GET', 'user',
+          '/api/users/me/export/?archive=zip', None, 8),
+    Check('recipes-shopping_cart-clear', 'DELETE', 'user',
+          '/api/recipes/shopping_cart/clear/', None, 4),
+    Check('logout', 'POST', 'user', '/api/auth/token/logout/', None, 3),
+)
+
+
+class Phase:
+    """Объекты набора данных, к которым обращаются проверки."""
+
+    def __init__(self, prefix, seed, scale):
+        self.prefix = prefix
+        # Разные seed: у тегов уникальный цвет, и одинаковые цвета
+        # второго набора были бы молча пропущены.
+        dataset = generate_dataset(prefix=prefix, seed=seed, **scale)
+        user_ids = dataset['user_ids']
+        self.user = User.objects.get(pk=user_ids[0])
+        self.user_id = self.user.pk
+        self.email = self.user.email
+        followed = set(
+            self.user.sub_user.values_list('author_id', flat=True)
+        )
+        self.author_id = next(iter(followed))
+        self.free_author_id = next(
+            pk for pk in user_ids[1:] if pk not in followed
+        )
+        related = set(self.user.favorite_recipe.values_list(
+            'recipe_id', flat=True
+        )) | set(self.user.shopping_cart.values_list(
+            'recipe_id', flat=True
+        ))
+        self.recipe_id = dataset['recipe_ids'][0]
+        self.free_recipe_id = next(
+            pk for pk in dataset['recipe_ids'] if pk not in related
+        )
+        self.batch_ids = dataset['recipe_ids'][:4] + [10 ** 9]
+        self.tag_ids = dataset['tag_ids'][:2]
+        self.tag_id = self.tag_ids[0]
+        self.tag_slug = Tag.objects.filter(
+            recipes=self.recipe_id
+        ).values_list('slug', flat=True)[0]
+        self.ingredient_ids = dataset['ingredient_ids'][:3]
+        self.ingredient_id = self.ingredient_ids[0]
+        self.ingredient_prefix = prefix
+        self.own_recipe_id = None
+        self.victim_id = None
+        self.clients = {
+            'anonymous': api_client(),
+            'user': api_client(self.user),
+        }
+        self.token = Token.objects.get(user=self.user).key
+
+    def client_for(self, actor):
+        if actor == 'victim':
+            victim = User.objects.create_user(
+                username=f'{self.prefix}-victim-{self.victim_id or 0}',
+                email=f'{self.prefix}-victim-{self.victim_id or 0}@x.ru',
+                password=DATASET_PASSWORD,
+            )
+            self.victim_id = victim.pk
+            return api_client(victim)
+        return self.clients[actor]
+
+    def run(self, check):
+        client = self.client_for(check.actor)
+        path = check.path.format(**vars(self))
+        data = check.data(self) if callable(check.data) else check.data
+        # Каждый запрос считается на холодных кэшах, включая токен.
+        caches['default'].clear()
+        two_tier_cache.clear_local()
+        invalidate_token(self.token)
+        # Справочник ингредиентов загружается воркером один раз,
+        # в бюджет запроса его загрузка не входит.
+        ingredient_registry.get()
+        with QueryRecorder() as recorder:
+            response = getattr(client, check.method.lower())(
+                path, data, content_type='application/json'
+            ) if data is not None else getattr(
+                client, check.method.lower()
+            )(path)
+            # Потоковый ответ выполняет запросы при чтении.
+            if response.streaming:
+                b''.join(response.streaming_content)
+        if check.route == 'recipes-list' and check.method == 'POST':
+            self.own_recipe_id = Recipe.objects.filter(
+                author=self.user
+            ).latest('created_at').pk
+        return response.status_code, [
+            sql for sql in recorder.queries
+            if not sql.startswith(TRANSACTION_STATEMENTS)
+        ]
+
+
+def router_routes():
+    routes = {
+        ('login', 'POST'), ('logout', 'POST'), ('metrics', 'GET'),
+        ('batch', 'POST'), ('allocations', 'GET'),
+    }
+    for pattern in router.urls:
+        actions = getattr(pattern.callback, 'actions', None) or {
+            'get': None
+        }
+        # DRF добавляет head в actions после первого запроса к view,
+        # а HEAD обрабатывается тем же методом, что и GET.
+        routes.update(
+            (pattern.name, method.upper()) for method in actions
+            if method != 'head'
+        )
+    return routes
+
+
+def missing_routes():
+    """Маршруты API без бюджета запросов."""
+    return router_routes() - {
+        (check.route, check.method) for check in CHECKS
+    }
+
+
+def measure():
+    """
+    Прогоняет CHECKS на малом и большом наборах данных в текущей БД.
+    Возвращает для каждой проверки SQL малого прогона, статус и SQL
+    большого.
+    """
+    with tempfile.TemporaryDirectory() as media, override_settings(
+        MEDIA_ROOT=media, EXPORTS_ROOT=f'{media}/exports'
+    ):
+        small = Phase('small', 0, SMALL_SCALE)
+        small_results = [small.run(check) for check in CHECKS]
+        large = Phase('large', 1, LARGE_SCALE)
+        large_results = [large.run(check) for check in CHECKS]
+    return [
+        (check, small_queries, status, queries)
+        for check, (_, small_queries), (status, queries) in zip(
+            CHECKS, small_results, large_results
+        )
+    ]
+
+
+def find_problems(check, small_queries, queries):
+    problems = []
+    if len(queries) != len(small_queries):
+        problems.append(
+            f'зависит от объёма данных: {len(small_queries)} '
+            f'-> {len(queries)}'
+        )
+    if len(queries) > check.budget:
+        problems.append(f'превышен бюджет {check.budget}')
+    return problems
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет, что число SQL-запросов каждого эндпоинта API '
+        'не зависит от объёма данных и укладывается в бюджет.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-sql', action='store_true',
+            help='Печатать SQL всех проверок, а не только провальных.'
+        )
+
+    def handle(self, *args, **options):
+        missing = missing_routes()
+        if missing:
+            raise CommandError(
+                'Нет бюджета запросов для маршрутов: '
+                + ', '.join(f'{method} {name}'
+                            for name, method in sorted(missing))
+            )
+
+        with isolated_database():
+            results = measure()
+
+        failures = 0
+        for check, small_queries, status, queries in results:
+            problems = find_problems(check, small_queries, queries)
+            line = (
+                f'{check.method:6} {check.route:32} {check.actor:9} '
+                f'{status} запросов: {len(queries)}/{check.budget}'
+            )
+            if problems:
+                failures += 1
+                self.stdout.write(self.style.ERROR(
+                    f'{line} — {"; ".join(problems)}'
+                ))
+            else:
+                self.stdout.write(line)
+            if problems or options['verbose_sql']:
+                for sql in queries:
+                    self.stdout.write(f'    {sql}')
+        if failures:
+            raise CommandError(
+                f'Бюджет запросов нарушен в {failures} проверках.'
+            )
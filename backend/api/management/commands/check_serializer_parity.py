@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from foodgram.cache import two_tier_cache
+from recipes.dataset import generate_dataset
+from recipes.models import Recipe, Tag
+
+from api.testing import api_client, isolated_database
+
+User = get_user_model()
+
+SCALE = {
+    'users': 20, 'follows': 5, 'recipes': 60, 'ingredients': 50,
+    'ingredients_per_recipe': 6, 'tags': 5, 'tags_per_recipe': 2,
+    'favorites': 10, 'cart': 5,
+}
+# Символы, которые JSON-рендеры экранируют по-разному.
+TRICKY_TEXT = 'Кавычки " \\ / эмодзи \U0001F372 разделители \u2028\u2029 \t'
+
+
+def first_difference(left, right):
+    for position, (a, b) in enumerate(zip(left, right)):
+        if a != b:
+            return position
+    return min(len(left), len(right))
+
+
+def describe_mismatch(fast, regular):
+    position = first_difference(fast[1], regular[1])
+    return (
+        f'статус {fast[0]} / {regular[0]}, '
+        f'расхождение с байта {position}:\n'
+        f'  быстро:  {fast[1][position:position + 80]!r}\n'
+        f'  обычно:  {regular[1][position:position + 80]!r}'
+    )
+
+
+def create_tricky_recipe(user, dataset):
+    recipe = Recipe.objects.create(
+        author=user, name=TRICKY_TEXT, text=TRICKY_TEXT,
+        cooking_time=1, image=''
+    )
+    recipe.tags.set(dataset['tag_ids'][:1])
+    return recipe
+
+
+def get_urls(dataset, user, tricky):
+    recipe_ids = dataset['recipe_ids']
+    tag_slugs = list(Tag.objects.filter(
+        pk__in=dataset['tag_ids']
+    ).values_list('slug', flat=True))
+    urls = [
+        '/api/recipes/',
+        '/api/recipes/?limit=25',
+        '/api/recipes/?limit=10&page=3',
+        '/api/recipes/?limit=10&page=100',
+        f'/api/recipes/?tags={tag_slugs[0]}&tags={tag_slugs[1]}',
+        f'/api/recipes/?author={user.pk}',
+        '/api/recipes/?is_favorited=1&limit=50',
+        '/api/recipes/?is_in_shopping_cart=true',
+        f'/api/recipes/{tricky.pk}/',
+        '/api/recipes/0/',
+        '/api/recipes/abc/',
+    ]
+    urls += [f'/api/recipes/{pk}/' for pk in recipe_ids[:10]]
+    return urls
+
+
+def fetch(client, url, fast):
+    """Статус и тело ответа на холодных кэшах."""
+    caches['default'].clear()
+    two_tier_cache.clear_local()
+    with override_settings(FAST_SERIALIZATION=fast):
+        response = client.get(url)
+    return response.status_code, response.content
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает ответы рецептов быстрой сериализации и обычных '
+        'сериализаторов DRF байт в байт на синтетических данных.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            dataset = generate_dataset(
+                prefix='parity', seed=options['seed'], **SCALE
+            )
+            user = User.objects.get(pk=dataset['user_ids'][0])
+            tricky = create_tricky_recipe(user, dataset)
+            urls = get_urls(dataset, user, tricky)
+            clients = {'anonymous': api_client(), 'user': api_client(user)}
+            mismatches = 0
+            for actor, client in clients.items():
+                for url in urls:
+                    fast = fetch(client, url, True)
+                    regular = fetch(client, url, False)
+                    if fast == regular:
+                        continue
+                    mismatches += 1
+                    self.stdout.write(self.style.ERROR(
+                        f'{actor} {url}: {describe_mismatch(fast, regular)}'
+                    ))
+        checked = len(urls) * len(clients)
+        if mismatches:
+            raise CommandError(
+                f'Ответы различаются в {mismatches} из {checked} запросов.'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Ответы совпадают во всех {checked} запросах.'
+        ))
@@ -0,0 +1,52 @@
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.data_export import iter_ndjson, iter_zip
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает все данные пользователя в NDJSON или zip-архив '
+        'потоком, не загружая их в память целиком.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('user', help='id или email пользователя.')
+        parser.add_argument(
+            '--archive', choices=('ndjson', 'zip'), default='ndjson'
+        )
+        parser.add_argument(
+            '--output', help='Файл выгрузки, по умолчанию stdout.'
+        )
+
+    def handle(self, *args, **options):
+        lookup = options['user']
+        try:
+            user = User.objects.get(
+                **{'pk' if lookup.isdigit() else 'email': lookup}
+            )
+        except User.DoesNotExist:
+            raise CommandError(f'Пользователь {lookup} не найден.')
+        stream = iter_zip if options['archive'] == 'zip' else iter_ndjson
+        started = time.perf_counter()
+        size = 0
+        output = (
+            open(options['output'], 'wb') if options['output']
+            else sys.stdout.buffer
+        )
+        try:
+            for chunk in stream(user):
+                output.write(chunk)
+                size += len(chunk)
+        finally:
+            if options['output']:
+                output.close()
+        self.stderr.write(
+            f'Выгружено {size / 1024:.1f} КБ за '
+            f'{time.perf_counter() - started:.2f} с'
+        )
@@ -0,0 +1,167 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Холодный старт воркера: WSGI-приложение и URLconf со всеми view.
+PROBE = '''
+import json, sys
+import foodgram.wsgi
+from django.urls import get_resolver
+get_resolver().url_patterns
+rss = 0
+with open('/proc/self/status') as status:
+    for line in status:
+        if line.startswith('VmRSS:'):
+            rss = int(line.split()[1])
+print(json.dumps({'rss_kb': rss, 'modules': sorted(sys.modules)}))
+'''
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+# Модули, которые должны загружаться при первом использовании.
+LAZY_MODULES = ('api.pdf_generator', 'reportlab')
+
+
+def parse_importtime(output):
+    """Строки -X importtime: (модуль, собственное и общее время в мкс)."""
+    rows = []
+    for line in output.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us),
+                         len(indent) // 2))
+    return rows
+
+
+def probe():
+    """Один холодный старт в отдельном процессе."""
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode:
+        raise CommandError(result.stderr[-2000:])
+    process = json.loads(result.stdout.splitlines()[-1])
+    rows = parse_importtime(result.stderr)
+    packages = {}
+    for module, self_us, _, _ in rows:
+        package = module.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+    return {
+        'wall_ms': round(wall_ms, 1),
+        # Корневые импорты не вложены друг в друга.
+        'import_ms': round(sum(
+            cumulative for _, _, cumulative, depth in rows if depth == 0
+        ) / 1000, 1),
+        'rss_mb': round(process['rss_kb'] / 1024, 1),
+        'module_count': len(process['modules']),
+        'packages_ms': {
+            package: round(self_us / 1000, 1)
+            for package, self_us in sorted(
+                packages.items(), key=lambda item: -item[1]
+            )
+        },
+        'modules': process['modules'],
+    }
+
+
+def get_lazy_modules():
+    """Модули, которых не должно быть в процессе после старта."""
+    if settings.SLOW_QUERIES['ENABLED']:
+        return LAZY_MODULES
+    return LAZY_MODULES + ('api.slow_queries',)
+
+
+class Command(BaseCommand):
+    help = (
+        'Профиль импорта foodgram.wsgi в отдельном процессе через '
+        '-X importtime: время холодного старта, RSS после загрузки и '
+        'самые тяжёлые пакеты. Падает, если при старте загружены '
+        'модули, которые должны импортироваться лениво.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Число запусков, в отчёт попадает самый быстрый.'
+        )
+        parser.add_argument('--top', type=int, default=15)
+        parser.add_argument(
+            '--max-ms', type=float, help='Бюджет времени импорта.'
+        )
+        parser.add_argument(
+            '--max-rss-mb', type=float, help='Бюджет RSS после импорта.'
+        )
+        parser.add_argument(
+            '--output', help='Файл для результатов в формате JSON.'
+        )
+        parser.add_argument(
+            '--compare', help='Результаты прошлого прогона для сравнения.'
+        )
+
+    def handle(self, *args, **options):
+        runs = [probe() for _ in range(max(options['repeat'], 1))]
+        report = min(runs, key=lambda run: run['import_ms'])
+        modules = set(report.pop('modules'))
+        previous = None
+        if options['compare']:
+            previous = json.loads(
+                Path(options['compare']).read_text(encoding='utf-8')
+            )
+        self.print_report(report, options['top'], previous)
+        if options['output']:
+            Path(options['output']).write_text(
+                json.dumps(report, indent=2, ensure_ascii=False),
+                encoding='utf-8'
+            )
+
+        errors = []
+        loaded = [name for name in get_lazy_modules() if name in modules]
+        if loaded:
+            errors.append(f'При старте загружены: {", ".join(loaded)}')
+        if options['max_ms'] and report['import_ms'] > options['max_ms']:
+            errors.append(
+                f'Импорт {report["import_ms"]} мс, бюджет '
+                f'{options["max_ms"]} мс'
+            )
+        if (options['max_rss_mb']
+                and report['rss_mb'] > options['max_rss_mb']):
+            errors.append(
+                f'RSS {report["rss_mb"]} МБ, бюджет '
+                f'{options["max_rss_mb"]} МБ'
+            )
+        if errors:
+            raise CommandError('\n'.join(errors))
+
+    def print_report(self, report, top, previous=None):
+        lines = [
+            f'Процесс целиком  {report["wall_ms"]:8.1f} мс',
+            f'Импорт           {report["import_ms"]:8.1f} мс',
+            f'RSS              {report["rss_mb"]:8.1f} МБ',
+            f'Модулей          {report["module_count"]:8}',
+        ]
+        if previous:
+            for index, key in enumerate(
+                ('wall_ms', 'import_ms', 'rss_mb', 'module_count')
+            ):
+                before = previous.get(key)
+                if before:
+                    change = (report[key] - before) / before * 100
+                    lines[index] += f'  {change:+.1f}%'
+        for line in lines:
+            self.stdout.write(line)
+        self.stdout.write('Пакеты по собственному времени импорта:')
+        for package, milliseconds in list(
+            report['packages_ms'].items()
+        )[:top]:
+            self.stdout.write(f'  {package:30} {milliseconds:8.1f} мс')
@@ -0,0 +1,197 @@
+import json
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from recipes.dataset import DEFAULT_SCALE, generate_dataset
+
+from api.testing import (IMAGE, QueryRecorder, api_client, isolated_database,
+                         percentile)
+
+User = get_user_model()
+
+
+class Scenarios:
+    """Запросы бенчмарка к основным эндпоинтам."""
+
+    def __init__(self, dataset, rng):
+        self.rng = rng
+        self.recipe_ids = dataset['recipe_ids']
+        self.tag_ids = dataset['tag_ids']
+        self.ingredient_ids = dataset['ingredient_ids']
+        self.user = User.objects.get(pk=dataset['user_ids'][0])
+        self.client = api_client(self.user)
+        self.anonymous = api_client()
+        self.own_recipes = list(
+            self.user.recipes.values_list('id', flat=True)
+        )
+        self.created = 0
+
+    def recipe_payload(self):
+        self.created += 1
+        return {
+            'name': f'Бенчмарк {self.created}',
+            'text': f'Рецепт бенчмарка {self.created}',
+            'cooking_time': self.rng.randint(1, 120),
+            'image': IMAGE,
+            'tags': self.rng.sample(self.tag_ids, 1),
+            'ingredients': [
+                {'id': pk, 'amount': self.rng.randint(1, 100)}
+                for pk in self.rng.sample(self.ingredient_ids, 5)
+            ],
+        }
+
+    def recipes_list(self):
+        page = self.rng.randint(1, 10)
+        return self.client.get(f'/api/recipes/?page={page}&limit=6')
+
+    def recipes_list_anonymous(self):
+        page = self.rng.randint(1, 10)
+        return self.anonymous.get(f'/api/recipes/?page={page}&limit=6')
+
+    def recipes_detail(self):
+        pk = self.rng.choice(self.recipe_ids)
+        return self.client.get(f'/api/recipes/{pk}/')
+
+    def users_subscriptions(self):
+        return self.client.get('/api/users/subscriptions/?recipes_limit=3')
+
+    def ingredients_search(self):
+        return self.client.get('/api/ingredients/?name=dataset')
+
+    def recipes_download_shopping_cart(self):
+        return self.client.get('/api/recipes/download_shopping_cart/')
+
+    def recipes_create(self):
+        response = self.client.post(
+            '/api/recipes/', self.recipe_payload(),
+            content_type='application/json'
+        )
+        if response.status_code == 201:
+            self.own_recipes.append(response.json()['id'])
+        return response
+
+    def recipes_update(self):
+        if not self.own_recipes:
+            self.recipes_create()
+        pk = self.rng.choice(self.own_recipes)
+        return self.client.patch(
+            f'/api/recipes/{pk}/', self.recipe_payload(),
+            content_type='application/json'
+        )
+
+    def all(self):
+        return {
+            name.replace('_', '-'): getattr(self, name)
+            for name in (
+                'recipes_list', 'recipes_list_anonymous', 'recipes_detail',
+                'users_subscriptions', 'ingredients_search',
+                'recipes_download_shopping_cart', 'recipes_create',
+                'recipes_update',
+            )
+        }
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет бенчмарки эндпоинтов API на временной БД '
+        'с синтетическими данными и сохраняет результаты в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--only', nargs='*', help='Запустить только эти сценарии.'
+        )
+        parser.add_argument(
+            '--output', help='Файл для результатов в формате JSON.'
+        )
+        parser.add_argument(
+            '--compare', help='Результаты прошлого прогона для сравнения.'
+        )
+        for name, default in DEFAULT_SCALE.items():
+            parser.add_argument(
+                f'--{name.replace("_", "-")}', type=int, default=default,
+                dest=name
+            )
+
+    def handle(self, *args, **options):
+        scale = {name: options[name] for name in DEFAULT_SCALE}
+        with isolated_database(), tempfile.TemporaryDirectory() as media:
+            with override_settings(
+                MEDIA_ROOT=media, EXPORTS_ROOT=f'{media}/exports'
+            ):
+                dataset = generate_dataset(seed=options['seed'], **scale)
+                results = self.run(dataset, options)
+                vendor = connection.vendor
+
+        report = {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'vendor': vendor,
+            'scale': scale,
+            'iterations': options['iterations'],
+            'results': results,
+        }
+        previous = None
+        if options['compare']:
+            previous = json.loads(
+                Path(options['compare']).read_text(encoding='utf-8')
+            )['results']
+        self.print_report(results, previous)
+        if options['output']:
+            Path(options['output']).write_text(
+                json.dumps(report, indent=2, ensure_ascii=False),
+                encoding='utf-8'
+            )
+
+    def run(self, dataset, options):
+        scenarios = Scenarios(dataset, random.Random(options['seed']))
+        results = {}
+        for name, scenario in scenarios.all().items():
+            if options['only'] and name not in options['only']:
+                continue
+            for _ in range(options['warmup']):
+                scenario()
+            latencies, query_counts, statuses = [], [], {}
+            for _ in range(options['iterations']):
+                with QueryRecorder() as recorder:
+                    started = time.perf_counter()
+                    response = scenario()
+                    latencies.append(
+                        (time.perf_counter() - started) * 1000
+                    )
+                query_counts.append(len(recorder))
+                status = str(response.status_code)
+                statuses[status] = statuses.get(status, 0) + 1
+            results[name] = {
+                'p50_ms': round(percentile(latencies, 0.5), 3),
+                'p95_ms': round(percentile(latencies, 0.95), 3),
+                'mean_ms': round(statistics.mean(latencies), 3),
+                'queries_p50': percentile(query_counts, 0.5),
+                'queries_max': max(query_counts),
+                'statuses': statuses,
+            }
+        return results
+
+    def print_report(self, results, previous=None):
+        for name, result in results.items():
+            line = (
+                f'{name:34} p50 {result["p50_ms"]:8.2f} мс  '
+                f'p95 {result["p95_ms"]:8.2f} мс  '
+                f'запросов {result["queries_p50"]:4} '
+                f'(макс {result["queries_max"]})'
+            )
+            if previous and name in previous:
+                before = previous[name]['p50_ms']
+                change = (result['p50_ms'] - before) / before * 100
+                line += f'  p50 {change:+.1f}%'
+            self.stdout.write(line)
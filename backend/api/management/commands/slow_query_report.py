@@ -0,0 +1,96 @@
+import json
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.testing import percentile
+
+SORT_KEYS = {
+    'total': lambda group: group['total_ms'],
+    'count': lambda group: group['count'],
+    'max': lambda group: group['max_ms'],
+}
+
+
+def read_entries(log_file):
+    """Записи журнала вместе с файлами после ротации."""
+    log_file = Path(log_file)
+    # От старых к новым: .log.10 старше .log.2.
+    rotated = sorted(
+        (
+            path for path in log_file.parent.glob(log_file.name + '.*')
+            if path.suffix[1:].isdigit()
+        ),
+        key=lambda path: int(path.suffix[1:]), reverse=True
+    )
+    paths = rotated + [log_file]
+    for path in paths:
+        if not path.exists():
+            continue
+        with open(path, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+class Command(BaseCommand):
+    help = 'Сводка журнала медленных SQL-запросов по отпечаткам.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--log', default=settings.SLOW_QUERIES['LOG_FILE'],
+            help='Путь к журналу медленных запросов.'
+        )
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--sort', choices=sorted(SORT_KEYS), default='total'
+        )
+
+    def handle(self, *args, **options):
+        groups = defaultdict(lambda: {
+            'count': 0, 'durations': [], 'call_sites': Counter(),
+        })
+        for entry in read_entries(options['log']):
+            group = groups[entry['fingerprint']]
+            group['count'] += 1
+            group['durations'].append(entry['duration_ms'])
+            group['normalized'] = entry['normalized']
+            group['plan'] = entry.get('plan')
+            if entry['call_site']:
+                group['call_sites'][entry['call_site'][0]] += 1
+
+        if not groups:
+            self.stdout.write('Журнал медленных запросов пуст.')
+            return
+
+        for group in groups.values():
+            group['total_ms'] = sum(group['durations'])
+            group['max_ms'] = max(group['durations'])
+
+        ordered = sorted(
+            groups.items(), key=lambda item: SORT_KEYS[options['sort']](
+                item[1]
+            ), reverse=True
+        )
+        for digest, group in ordered[:options['limit']]:
+            durations = group['durations']
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{digest}: {group["count"]} запросов, '
+                f'всего {group["total_ms"]:.1f} мс, '
+                f'p50 {percentile(durations, 0.5):.1f} мс, '
+                f'p95 {percentile(durations, 0.95):.1f} мс, '
+                f'макс {group["max_ms"]:.1f} мс'
+            ))
+            self.stdout.write(f'  {group["normalized"][:500]}')
+            for call_site, count in group['call_sites'].most_common(3):
+                self.stdout.write(f'  {count} × {call_site}')
+            if group['plan']:
+                self.stdout.write(
+                    '  план: ' + json.dumps(
+                        group['plan'], ensure_ascii=False
+                    )[:500]
+                )
@@ -0,0 +1,280 @@
+"""
+Метрики запросов в формате Prometheus.
+
+MetricsMiddleware собирает по каждому представлению (имени маршрута
+DRF, например ``recipes-list``) гистограмму времени ответа, число и
+время SQL-запросов, размер ответа и время сериализации. Каждый воркер
+периодически сбрасывает свои счётчики в файл, а /api/metrics
+суммирует снимки всех воркеров.
+"""
+import atexit
+import contextvars
+import copy
+import hmac
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+from .snapshots import WorkerSnapshotStore
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+_serializer_depth = contextvars.ContextVar('serializer_depth', default=0)
+
+
+def empty_stats():
+    return {
+        'count': 0,
+        'buckets': [0] * len(BUCKETS),
+        'duration': 0.0,
+        'queries': 0,
+        'query_time': 0.0,
+        'bytes': 0,
+        'serializer_time': 0.0,
+        'statuses': {},
+    }
+
+
+def merge_stats(target, source):
+    """Складывает снимки {view: {method: stats}} двух воркеров."""
+    target = copy.deepcopy(target)
+    for view, methods in source.items():
+        for method, stats in methods.items():
+            current = target.setdefault(view, {}).setdefault(
+                method, empty_stats()
+            )
+            for name in ('count', 'duration', 'queries', 'query_time',
+                         'bytes', 'serializer_time'):
+                current[name] += stats[name]
+            current['buckets'] = [
+                left + right for left, right
+                in zip(current['buckets'], stats['buckets'])
+            ]
+            for status, count in stats['statuses'].items():
+                current['statuses'][status] = (
+                    current['statuses'].get(status, 0) + count
+                )
+    return target
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'query_time', 'serializer_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.serializer_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_time += time.perf_counter() - started
+
+
+class MetricsRegistry:
+    """Счётчики текущего воркера."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._flushed_at = time.monotonic()
+        self.store = WorkerSnapshotStore(
+            settings.METRICS['DIR'], merge_stats
+        )
+
+    def observe(self, view, method, status, duration, metrics, size):
+        with self._lock:
+            stats = self._stats.setdefault(view, {}).setdefault(
+                method, empty_stats()
+            )
+            stats['count'] += 1
+            stats['duration'] += duration
+            stats['queries'] += metrics.queries
+            stats['query_time'] += metrics.query_time
+            stats['serializer_time'] += metrics.serializer_time
+            stats['bytes'] += size
+            status = str(status)
+            stats['statuses'][status] = stats['statuses'].get(status, 0) + 1
+            for index, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    stats['buckets'][index] += 1
+        if (time.monotonic() - self._flushed_at
+                > settings.METRICS['FLUSH_INTERVAL']):
+            self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            return copy.deepcopy(self._stats)
+
+    def flush(self):
+        self._flushed_at = time.monotonic()
+        self.store.write(self.snapshot())
+
+    def collect(self):
+        """Суммарные счётчики всех воркеров."""
+        total = self.snapshot()
+        for snapshot in self.store.read_all(exclude_pid=os.getpid()):
+            total = merge_stats(total, snapshot)
+        return total
+
+
+registry = None
+
+
+def get_registry():
+    global registry
+    if registry is None:
+        registry = MetricsRegistry()
+        atexit.register(registry.flush)
+    return registry
+
+
+def timed_serialization(func, *args):
+    """
+    Вызывает func и учитывает его время как время сериализации
+    текущего запроса. Вложенные вызовы не учитываются повторно.
+    """
+    metrics = _current.get()
+    if metrics is None or _serializer_depth.get():
+        return func(*args)
+    token = _serializer_depth.set(1)
+    started = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        _serializer_depth.reset(token)
+        metrics.serializer_time += time.perf_counter() - started
+
+
+class TimedSerializerMixin:
+    """
+    Учитывает to_representation в метриках запроса. При many=True
+    ListSerializer вызывает его для каждого объекта, так что список
+    тоже учитывается целиком.
+    """
+
+    def to_representation(self, instance):
+        return timed_serialization(super().to_representation, instance)
+
+
+def get_view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.url_name:
+        return 'unmatched'
+    return match.url_name
+
+
+def get_response_size(response):
+    if response.streaming:
+        return int(response.get('Content-Length') or 0)
+    return len(response.content)
+
+
+class MetricsMiddleware:
+
+    def __init__(self, get_response):
+        if not settings.METRICS['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.registry = get_registry()
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(metrics)
+                    )
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.registry.observe(
+            get_view_label(request), request.method, response.status_code,
+            time.perf_counter() - started, metrics,
+            get_response_size(response),
+        )
+        return response
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def render(stats):
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    items = sorted(
+        (escape(view), method, data)
+        for view, methods in stats.items()
+        for method, data in methods.items()
+    )
+
+    family('foodgram_http_requests_total', 'counter',
+           'Число запросов по представлению, методу и статусу.')
+    for view, method, data in items:
+        for status, count in sorted(data['statuses'].items()):
+            lines.append(
+                f'foodgram_http_requests_total{{view="{view}",'
+                f'method="{method}",status="{status}"}} {count}'
+            )
+
+    name = 'foodgram_http_request_duration_seconds'
+    family(name, 'histogram', 'Время обработки запроса.')
+    for view, method, data in items:
+        labels = f'view="{view}",method="{method}"'
+        for bound, count in zip(BUCKETS, data['buckets']):
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {data["count"]}')
+        lines.append(f'{name}_sum{{{labels}}} {data["duration"]}')
+        lines.append(f'{name}_count{{{labels}}} {data["count"]}')
+
+    for name, field, help_text in (
+        ('foodgram_db_queries_total', 'queries', 'Число SQL-запросов.'),
+        ('foodgram_db_query_duration_seconds_total', 'query_time',
+         'Суммарное время SQL-запросов.'),
+        ('foodgram_http_response_size_bytes_total', 'bytes',
+         'Суммарный размер ответов.'),
+        ('foodgram_serializer_duration_seconds_total', 'serializer_time',
+         'Суммарное время сериализации.'),
+    ):
+        family(name, 'counter', help_text)
+        for view, method, data in items:
+            lines.append(
+                f'{name}{{view="{view}",method="{method}"}} {data[field]}'
+            )
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """
+    Без METRICS_TOKEN метрики закрыты. Снаружи адрес закрыт и в nginx:
+    Prometheus обращается к бэкенду напрямую из сети контейнеров.
+    """
+    token = settings.METRICS['TOKEN']
+    if not settings.METRICS['ENABLED'] or not token:
+        raise Http404
+    if not hmac.compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+    ):
+        raise Http404
+    return HttpResponse(
+        render(get_registry().collect()), content_type=CONTENT_TYPE
+    )
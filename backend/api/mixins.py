@@ -0,0 +1,99 @@
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from foodgram.cache import two_tier_cache
+from rest_framework.response import Response
+
+
+class CachedReadMixin:
+    """
+    Кэширует данные ответов list и retrieve в двухуровневом кэше.
+    Ключ строится из действия, аргументов URL и всех отсортированных
+    параметров запроса: от них зависят и проверка параметров, и ссылки
+    пагинации в ответе. Инвалидация — по тегам из get_cache_tags().
+    Пересчёт промаха выполняет один воркер, остальные ждут результат.
+    """
+    cache_tags = ()
+    cache_timeout = None
+
+    def get_cache_key(self, request):
+        query = urlencode(sorted(
+            (key, value)
+            for key, values in request.query_params.lists()
+            for value in values
+        ))
+        kwargs = urlencode(sorted(self.kwargs.items()))
+        # Хост входит в ключ: ссылки пагинации в ответе абсолютные.
+        return (
+            f'{self.basename}:{self.action}:{request.get_host()}:'
+            f'{kwargs}:{query}'
+        )
+
+    def get_cache_tags(self):
+        return self.cache_tags
+
+    def should_cache(self, request):
+        return True
+
+    def compute_response(self, handler, key, request, *args, **kwargs):
+        tag_versions = two_tier_cache.tag_versions(self.get_cache_tags())
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            two_tier_cache.set(
+                key, response.data, timeout=self.cache_timeout,
+                tag_versions=tag_versions
+            )
+        return response
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not self.should_cache(request):
+            return handler(request, *args, **kwargs)
+        key = self.get_cache_key(request)
+        data = two_tier_cache.get(key)
+        if data is None:
+            lock_timeout = settings.RESPONSE_CACHE_LOCK_TIMEOUT
+            if two_tier_cache.acquire(key, lock_timeout):
+                try:
+                    return self.compute_response(
+                        handler, key, request, *args, **kwargs
+                    )
+                finally:
+                    two_tier_cache.release(key)
+            data = two_tier_cache.wait(key, lock_timeout)
+            if data is None:
+                return handler(request, *args, **kwargs)
+        return Response(data)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class AnonymousResponseCacheMixin(CachedReadMixin):
+    """
+    Кэширует ответы только для анонимных пользователей: для них
+    персональные поля всегда ложны и ответ зависит лишь от запроса.
+    Такие ответы помечаются публичными для кэша nginx.
+    """
+    cache_timeout = settings.RESPONSE_CACHE_TIMEOUT
+
+    def should_cache(self, request):
+        return not request.user.is_authenticated
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if self.action in ('list', 'retrieve'):
+            patch_vary_headers(response, ('Authorization',))
+            if response.status_code == 200 and self.should_cache(request):
+                patch_cache_control(
+                    response, public=True,
+                    max_age=settings.RESPONSE_CACHE_MAX_AGE
+                )
+        return response
@@ -9,24 +9,29 @@ from reportlab.pdfgen import canvas
 CART_TITLE = 'СПИСОК ПОКУПОК'
 EMPTY_CART_TITLE = 'Список покупок пуст'
 FONTS_DIR = Path('./static/fonts/DejaVuSerif.ttf').resolve()
+FONT_NAME = 'DejaVuSerif'
+
+
+def register_fonts():
+    """Разбирает TTF один раз на процесс, а не на каждый PDF."""
+    if FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(FONT_NAME, FONTS_DIR))
 
 
 def download_pdf_shopping_cart(user, ingredients_list):
     buffer = io.BytesIO()
     pdf_page = canvas.Canvas(buffer, pagesize=letter)
 
-    pdfmetrics.registerFont(TTFont('DejaVuSerif', FONTS_DIR))
-    pdf_page.setFont('DejaVuSerif', 14)
+    register_fonts()
+    pdf_page.setFont(FONT_NAME, 14)
 
     x_value, y_value = 20, 635
 
     if ingredients_list:
         pdf_page.drawCentredString(315, 700, CART_TITLE)
 
-        for value in ingredients_list:
-            name = value['ingredient__name'].capitalize()
-            amount = value['total_amount']
-            measure = value['ingredient__measurement_unit']
+        for name, measure, amount in ingredients_list:
+            name = name.capitalize()
             write_string = f'{name} - {amount} ({measure});'
             pdf_page.drawString(
                 x_value, y_value, write_string
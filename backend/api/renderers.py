@@ -0,0 +1,38 @@
+from django.conf import settings
+from rest_framework.utils import encoders
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    if orjson else None
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson, если он установлен. Вывод совпадает
+    с JSONRenderer байт в байт: даты, Decimal и ленивые строки
+    отдаются тому же JSONEncoder, а отступы — стандартному рендереру.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or not settings.FAST_SERIALIZATION
+                or data is None or not self.compact or self.ensure_ascii
+                or self.get_indent(
+                    accepted_media_type, renderer_context or {}
+                ) is not None):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        ret = orjson.dumps(
+            data, default=encoders.JSONEncoder().default,
+            option=ORJSON_OPTIONS
+        )
+        return ret.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace('\u2029'.encode(), b'\\u2029')
@@ -1,18 +1,23 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from django.db.models import Count
+from django.db.models import (Count, Manager, Prefetch,
+                              prefetch_related_objects)
 from drf_base64.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
-from recipes.models import (
-    Favorite, Ingredient, IngredientRecipe, Recipe, ShoppingCart, Tag
-)
+from outbox.constants import CREATED, RECIPE, UPDATED
+from outbox.events import record_change
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from recipes.registry import ingredient_registry
 from user.models import Follow
 
+from .metrics import TimedSerializerMixin
+
 User = get_user_model()
 
 
-class UserReadSerializer(serializers.ModelSerializer):
+class UserReadSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для модели User."""
     is_subscribed = serializers.SerializerMethodField()
 
@@ -24,6 +29,8 @@ class UserReadSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         return bool(
             request and request.user.is_authenticated
@@ -31,7 +38,7 @@ class UserReadSerializer(serializers.ModelSerializer):
         )
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Сериализатор для модели Tag.
     Только GET запросы.
@@ -42,7 +49,7 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'color', 'slug')
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для модели Ingredient."""
 
     class Meta:
@@ -50,29 +57,54 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit',)
 
 
+class IngredientRecipeListSerializer(serializers.ListSerializer):
+    """Снимок справочника берётся один раз на список ингредиентов."""
+
+    def to_representation(self, data):
+        rows = list(data.all() if isinstance(data, Manager) else data)
+        self.child.catalog = ingredient_registry.get(
+            [row.ingredient_id for row in rows]
+        )
+        return super().to_representation(rows)
+
+
 class IngredientRecipeSerializer(serializers.ModelSerializer):
-    id = serializers.ReadOnlyField(source='ingredient.id')
-    name = serializers.ReadOnlyField(source='ingredient.name')
-    measurement_unit = serializers.ReadOnlyField(
-        source='ingredient.measurement_unit'
-    )
+    """Название и единица берутся из справочника в памяти, без JOIN."""
+    id = serializers.ReadOnlyField(source='ingredient_id')
+    name = serializers.ReadOnlyField()
+    measurement_unit = serializers.ReadOnlyField()
+    catalog = None
 
     class Meta:
         model = IngredientRecipe
         fields = (
             'id', 'name', 'measurement_unit', 'amount'
         )
+        list_serializer_class = IngredientRecipeListSerializer
 
-
-class IngredientAmountSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    def to_representation(self, instance):
+        pk = instance.ingredient_id
+        catalog = self.catalog
+        if catalog is None or pk not in catalog:
+            catalog = ingredient_registry.get((pk,))
+        name, measurement_unit = catalog[pk]
+        return {
+            'id': pk, 'name': name, 'measurement_unit': measurement_unit,
+            'amount': instance.amount,
+        }
+
+
+class IngredientAmountSerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
+    id = serializers.IntegerField()
 
     class Meta:
         model = IngredientRecipe
         fields = ('id', 'amount')
 
 
-class RecipeWriteSerializer(serializers.ModelSerializer):
+class RecipeWriteSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для рецептов на запись."""
     tags = serializers.PrimaryKeyRelatedField(
         many=True,
@@ -94,13 +126,18 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         )
         validators = [
             UniqueTogetherValidator(
-                queryset=Recipe.objects.all(),
+                queryset=Recipe.visible.all(),
                 fields=('name', 'text'),
                 message='Данный рецепт уже существует.'
             )
         ]
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance],
+            Prefetch('tags', Tag.objects.order_by('id')),
+            Prefetch('recipe', IngredientRecipe.objects.order_by('id'))
+        )
         serializer = RecipeReadSerializer(
             instance,
             context={
@@ -136,11 +173,14 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Рецепт не может быть создан без ингредиентов.'
             )
+        catalog = ingredient_registry.get(
+            {value['id'] for value in ingredient_amount}
+        )
         list_of_ingredients = set()
         for value in ingredient_amount:
-            ingredient = value.get('id')
+            ingredient = value['id']
 
-            if ingredient not in Ingredient.objects.all():
+            if ingredient not in catalog:
                 raise serializers.ValidationError(
                     f'Ингредиент "{ingredient}" не существует.'
                 )
@@ -155,12 +195,12 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
     def create_ingredients(recipe, ingredients):
         ingredients_to_create = []
         for ingredient_data in ingredients:
-            ingredient = ingredient_data['id']
+            ingredient_id = ingredient_data['id']
             amount = ingredient_data['amount']
             ingredients_to_create.append(
                 IngredientRecipe(
                     recipe=recipe,
-                    ingredient=ingredient,
+                    ingredient_id=ingredient_id,
                     amount=amount
                 )
             )
@@ -175,6 +215,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(**validated_data)
         self.create_ingredients(recipe, ingredients)
         recipe.tags.set(tags)
+        record_change(RECIPE, CREATED, recipe.pk, author_id=author.pk)
         return recipe
 
     @transaction.atomic
@@ -184,10 +225,13 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         instance.ingredients.clear()
         self.create_ingredients(instance, ingredients)
         instance.tags.set(tags)
+        record_change(
+            RECIPE, UPDATED, instance.pk, author_id=instance.author_id
+        )
         return super().update(instance, validated_data)
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeReadSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для рецептов на чтение."""
     author = UserReadSerializer(
         read_only=True,
@@ -211,6 +255,8 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         return bool(
             request and request.user.is_authenticated
@@ -218,6 +264,8 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         return bool(
             request and request.user.is_authenticated
@@ -230,7 +278,39 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         return None
 
 
-class ShortRecipeSerializer(serializers.ModelSerializer):
+class SideloadedRecipeSerializer(RecipeReadSerializer):
+    """Рецепт с id автора и тегов вместо вложенных объектов."""
+    author = serializers.PrimaryKeyRelatedField(read_only=True)
+    tags = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+
+def sideload_recipes(recipes, context):
+    """
+    Рецепты со ссылками и словари авторов и тегов по id:
+    каждый автор и тег сериализуется один раз на ответ.
+    """
+    authors, tags = {}, {}
+    for recipe in recipes:
+        authors.setdefault(recipe.author_id, recipe.author)
+        for tag in recipe.tags.all():
+            tags.setdefault(tag.pk, tag)
+    return {
+        'results': SideloadedRecipeSerializer(
+            recipes, many=True, context=context
+        ).data,
+        'authors': {
+            author['id']: author for author in UserReadSerializer(
+                authors.values(), many=True, context=context
+            ).data
+        },
+        'tags': {
+            tag['id']: tag
+            for tag in TagSerializer(tags.values(), many=True).data
+        },
+    }
+
+
+class ShortRecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     image = Base64ImageField()
 
     class Meta:
@@ -238,6 +318,12 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'image', 'cooking_time')
 
 
+def get_recipes_limit(request):
+    """Параметр recipes_limit; нечисловое значение не ограничивает."""
+    value = request.query_params.get('recipes_limit', '')
+    return int(value) if value.isdigit() else None
+
+
 class SubscriptionSerializer(UserReadSerializer):
     recipes = serializers.SerializerMethodField()
     recipes_count = serializers.SerializerMethodField()
@@ -250,70 +336,71 @@ class SubscriptionSerializer(UserReadSerializer):
 
     def get_recipes(self, obj):
         request = self.context['request']
-        recipe_limit = request.GET.get('recipes_limit')
-        if recipe_limit:
-            recipes = obj.recipes.all()[:int(recipe_limit)]
-        else:
-            recipes = obj.recipes.all()
+        recipe_limit = get_recipes_limit(request)
+        recipes = obj.recipes(manager='visible').all()
+        if recipe_limit is not None:
+            recipes = recipes[:recipe_limit]
         serializer = ShortRecipeSerializer(
             recipes, many=True, context={'request': request}
         )
         return serializer.data
 
     def get_recipes_count(self, obj):
-        results = Recipe.objects.filter(author=obj).aggregate(
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
+        results = Recipe.visible.filter(author=obj).aggregate(
             count_recipes=Count('name')
         )
         return results['count_recipes']
 
 
-class FavoriteSerializer(serializers.ModelSerializer):
+class RecipeBatchSerializer(TimedSerializerMixin, serializers.Serializer):
+    """Пакет id рецептов для добавления и удаления."""
+    add = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        max_length=settings.RECIPE_BATCH_MAX_SIZE,
+        required=False,
+        default=list
+    )
+    remove = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        max_length=settings.RECIPE_BATCH_MAX_SIZE,
+        required=False,
+        default=list
+    )
 
-    class Meta:
-        model = Favorite
-        fields = ('user', 'recipe')
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Favorite.objects.all(),
-                fields=('user', 'recipe'),
-                message='Рецепт уже добавлен в избранное'
+    def validate(self, data):
+        add = list(dict.fromkeys(data['add']))
+        remove = list(dict.fromkeys(data['remove']))
+        if not add and not remove:
+            raise serializers.ValidationError(
+                'Передайте id рецептов в `add` или `remove`.'
             )
-        ]
-
-    def to_representation(self, instance):
-        serializer = ShortRecipeSerializer(
-            instance.recipe,
-            context={
-                'request': self.context['request']
-            }
-        )
-        return serializer.data
-
-
-class ShoppingCartSerializer(serializers.ModelSerializer):
-
-    class Meta:
-        model = ShoppingCart
-        fields = ('user', 'recipe')
-        validators = [
-            UniqueTogetherValidator(
-                queryset=ShoppingCart.objects.all(),
-                fields=('user', 'recipe'),
-                message='Рецепт уже добавлен в корзину покупок'
+        if set(add) & set(remove):
+            raise serializers.ValidationError(
+                'Рецепт не может одновременно добавляться и удаляться.'
             )
-        ]
+        if len(add) + len(remove) > settings.RECIPE_BATCH_MAX_SIZE:
+            raise serializers.ValidationError(
+                'Не больше {} рецептов в одном запросе.'.format(
+                    settings.RECIPE_BATCH_MAX_SIZE
+                )
+            )
+        return {'add': add, 'remove': remove}
 
-    def to_representation(self, instance):
-        serializer = ShortRecipeSerializer(
-            instance.recipe,
-            context={
-                'request': self.context['request']
-            }
-        )
-        return serializer.data
+
+class BatchRequestSerializer(TimedSerializerMixin, serializers.Serializer):
+    """Список адресов для пакетного запроса."""
+    requests = serializers.ListField(
+        child=serializers.CharField(max_length=2000),
+        allow_empty=False,
+        max_length=settings.BATCH_MAX_REQUESTS
+    )
 
 
-class SubscriptionCreateSerializer(serializers.ModelSerializer):
+class SubscriptionCreateSerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
     class Meta:
         model = Follow
         fields = ('author', 'user')
@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from foodgram.cache import two_tier_cache
+from rest_framework.authtoken.models import Token
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+
+from .authentication import invalidate_token
+
+User = get_user_model()
+
+
+def invalidate_on_commit(*tags):
+    """
+    Ответы помечены тегами всех сущностей, которые в них встроены:
+    список рецептов — 'recipes', 'users', 'tags' и 'ingredients'.
+    """
+    transaction.on_commit(lambda: two_tier_cache.invalidate_tags(*tags))
+
+
+@receiver(post_delete, sender=Token)
+def drop_deleted_token(sender, instance, **kwargs):
+    """Выход через djoser удаляет токен — убираем его из кэша."""
+    transaction.on_commit(lambda: invalidate_token(instance.key))
+
+
+@receiver(post_save, sender=User)
+def drop_user_tokens(sender, instance, update_fields=None, **kwargs):
+    """
+    Смена пароля, деактивация или правка профиля
+    делают закэшированного пользователя неактуальным: тег user:<id>
+    сбрасывает и ответы, и кэш токенов.
+    """
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    invalidate_on_commit('users', f'user:{instance.pk}')
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user(sender, instance, **kwargs):
+    invalidate_on_commit('users', f'user:{instance.pk}')
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe(sender, instance, **kwargs):
+    invalidate_on_commit('recipes', f'recipe:{instance.pk}')
+
+
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=IngredientRecipe)
+def invalidate_recipe_ingredients(sender, instance, **kwargs):
+    invalidate_on_commit('recipes', f'recipe:{instance.recipe_id}')
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(sender, instance, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate_on_commit('recipes', f'recipe:{instance.pk}')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag(sender, instance, **kwargs):
+    invalidate_on_commit('tags')
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient(sender, instance, **kwargs):
+    invalidate_on_commit('ingredients')
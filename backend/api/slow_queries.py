@@ -0,0 +1,186 @@
+"""
+Выборка медленных SQL-запросов.
+
+Обёртка над курсором записывает запросы дольше порога в JSONL-журнал
+с ротацией: SQL, форму параметров, длительность, место вызова в коде
+проекта и план выполнения. Анализ журнала — команда slow_query_report.
+"""
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+import traceback
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.backends.sqlite3.base import FORMAT_QMARK_REGEX
+
+logger = logging.getLogger('foodgram.slow_queries')
+
+_local = threading.local()
+_sampler = None
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_LIST = re.compile(r'\bIN\s*\((?:\s*\?\s*,)*\s*\?\s*\)', re.I)
+WHITESPACE = re.compile(r'\s+')
+EXPLAIN_SAVEPOINT = 'slow_query_explain'
+
+
+def fingerprint(sql):
+    """Нормализованный SQL без литералов и его короткий хэш."""
+    normalized = STRING_LITERAL.sub('?', sql)
+    normalized = NUMBER_LITERAL.sub('?', normalized)
+    normalized = normalized.replace('%s', '?')
+    normalized = PLACEHOLDER_LIST.sub('IN (...)', normalized)
+    normalized = WHITESPACE.sub(' ', normalized).strip()
+    digest = hashlib.md5(normalized.encode()).hexdigest()[:12]
+    return digest, normalized
+
+
+def params_shape(params, many):
+    if params is None:
+        return None
+    if many:
+        rows = list(params)
+        return {'rows': len(rows), 'row': params_shape(rows[0], False)
+                if rows else None}
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    return [type(value).__name__ for value in params]
+
+
+def get_call_site():
+    """Ближайшие к запросу кадры стека из кода проекта."""
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(base_dir)
+        and 'site-packages' not in frame.filename
+        and not frame.filename.endswith('slow_queries.py')
+    ]
+    return [
+        f'{Path(frame.filename).relative_to(base_dir)}:{frame.lineno}'
+        f' in {frame.name}'
+        for frame in reversed(frames[-5:])
+    ]
+
+
+def explain(connection, sql, params, analyze=False):
+    """
+    План запроса отдельным курсором, минуя обёртки Django. ANALYZE
+    выполняет запрос повторно, поэтому включается отдельно и не
+    используется внутри транзакции. В транзакции план строится под
+    точкой сохранения: ошибка EXPLAIN в PostgreSQL иначе прервала бы
+    транзакцию вызывающего кода.
+    """
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    in_transaction = not connection.get_autocommit()
+    if connection.vendor == 'postgresql':
+        options = (
+            'ANALYZE, FORMAT JSON' if analyze and not in_transaction
+            else 'FORMAT JSON'
+        )
+        prefix = f'EXPLAIN ({options}) '
+    elif connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+        # Обёртка курсора Django для SQLite заменяет %s на ?.
+        sql = FORMAT_QMARK_REGEX.sub('?', sql).replace('%%', '%')
+    else:
+        prefix = 'EXPLAIN '
+    cursor = connection.connection.cursor()
+    try:
+        if in_transaction:
+            cursor.execute(f'SAVEPOINT {EXPLAIN_SAVEPOINT}')
+        try:
+            cursor.execute(prefix + sql, params or ())
+            plan = [list(row) for row in cursor.fetchall()]
+        except Exception as error:
+            plan = {'error': str(error)}
+            if in_transaction:
+                cursor.execute(f'ROLLBACK TO SAVEPOINT {EXPLAIN_SAVEPOINT}')
+        if in_transaction:
+            cursor.execute(f'RELEASE SAVEPOINT {EXPLAIN_SAVEPOINT}')
+        return plan
+    except Exception as error:
+        return {'error': str(error)}
+    finally:
+        cursor.close()
+
+
+def get_logger():
+    if not logger.handlers:
+        options = settings.SLOW_QUERIES
+        path = Path(options['LOG_FILE'])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(
+            path, maxBytes=options['MAX_BYTES'],
+            backupCount=options['BACKUP_COUNT'], encoding='utf-8'
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+class SlowQuerySampler:
+
+    def __init__(self, options):
+        self.threshold = options['THRESHOLD_MS'] / 1000
+        self.sample_rate = options['SAMPLE_RATE']
+        self.with_explain = options['EXPLAIN']
+        self.explain_analyze = options['EXPLAIN_ANALYZE']
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = time.perf_counter() - started
+        if (duration >= self.threshold
+                and not getattr(_local, 'recording', False)
+                and random.random() < self.sample_rate):
+            _local.recording = True
+            try:
+                self.record(context['connection'], sql, params, many,
+                            duration)
+            finally:
+                _local.recording = False
+        return result
+
+    def record(self, connection, sql, params, many, duration):
+        digest, normalized = fingerprint(sql)
+        entry = {
+            'time': time.time(),
+            'fingerprint': digest,
+            'normalized': normalized,
+            'sql': sql,
+            'params': params_shape(params, many),
+            'duration_ms': round(duration * 1000, 3),
+            'vendor': connection.vendor,
+            'alias': connection.alias,
+            'call_site': get_call_site(),
+        }
+        if self.with_explain and not many:
+            entry['plan'] = explain(
+                connection, sql, params, self.explain_analyze
+            )
+        get_logger().info(json.dumps(entry, ensure_ascii=False, default=str))
+
+
+def attach_sampler(sender, connection, **kwargs):
+    global _sampler
+    if _sampler is None:
+        _sampler = SlowQuerySampler(settings.SLOW_QUERIES)
+    if _sampler not in connection.execute_wrappers:
+        # В начало списка: execute_wrapper() снимает последнюю обёртку.
+        connection.execute_wrappers.insert(0, _sampler)
+
+
+def install():
+    connection_created.connect(attach_sampler)
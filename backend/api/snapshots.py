@@ -0,0 +1,88 @@
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+ARCHIVE_NAME = 'archive.json'
+LOCK_NAME = '.lock'
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class WorkerSnapshotStore:
+    """
+    Хранит снимки состояния воркеров gunicorn в файлах <pid>.json.
+    Снимки завершившихся воркеров сливаются в archive.json функцией
+    merge, чтобы накопленные счётчики не терялись и файлов не
+    становилось больше числа живых воркеров.
+    """
+
+    def __init__(self, directory, merge):
+        self.directory = Path(directory)
+        self.merge = merge
+
+    @contextmanager
+    def _locked(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / LOCK_NAME, 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self, path):
+        try:
+            with open(path, encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, path, data):
+        tmp_path = path.with_name(f'.{path.name}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file)
+        os.replace(tmp_path, path)
+
+    def write(self, data, pid=None):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._write(self.directory / f'{pid or os.getpid()}.json', data)
+
+    def read_all(self, exclude_pid=None):
+        """Снимки всех воркеров, кроме exclude_pid, и архив."""
+        snapshots = []
+        with self._locked():
+            archive_path = self.directory / ARCHIVE_NAME
+            archive = self._read(archive_path)
+            archive_changed = False
+            for path in self.directory.glob('*.json'):
+                if not path.stem.isdigit():
+                    continue
+                pid = int(path.stem)
+                if pid == exclude_pid:
+                    continue
+                data = self._read(path)
+                if data is None:
+                    continue
+                if pid_alive(pid):
+                    snapshots.append(data)
+                    continue
+                archive = data if archive is None else self.merge(
+                    archive, data
+                )
+                archive_changed = True
+                path.unlink()
+            if archive_changed:
+                self._write(archive_path, archive)
+        if archive is not None:
+            snapshots.append(archive)
+        return snapshots
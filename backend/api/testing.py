@@ -0,0 +1,95 @@
+"""
+Вспомогательные средства для бенчмарков и проверок API на временной
+базе данных с синтетическим набором данных.
+"""
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.test.utils import (override_settings, setup_databases,
+                               setup_test_environment,
+                               teardown_databases,
+                               teardown_test_environment)
+from rest_framework.authtoken.models import Token
+
+# Прозрачный PNG 1x1 для создания рецептов.
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJ'
+    'AAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=='
+)
+
+LOCAL_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'api-testing',
+    },
+}
+
+
+def isolated_settings():
+    """
+    Локальный кэш вместо общего. Прогоны шлют сотни запросов от
+    одного клиента, поэтому ограничение частоты отключено. Подходит
+    и как декоратор классов TestCase.
+    """
+    return override_settings(
+        CACHES=LOCAL_CACHES, DEBUG=False,
+        THROTTLING={**settings.THROTTLING, 'ENABLED': False}
+    )
+
+
+@contextmanager
+def isolated_database(verbosity=0):
+    """
+    Создаёт временную тестовую БД и включает isolated_settings(),
+    чтобы данные прогона не попали в рабочую базу и общий кэш.
+    """
+    setup_test_environment()
+    old_config = setup_databases(verbosity, interactive=False)
+    try:
+        with isolated_settings():
+            yield
+    finally:
+        teardown_databases(old_config, verbosity)
+        teardown_test_environment()
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class QueryRecorder:
+    """Записывает SQL-запросы на всех подключениях."""
+
+    def __init__(self):
+        self.queries = []
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self.queries = []
+        self._stack = ExitStack()
+        for alias in connections:
+            self._stack.enter_context(
+                connections[alias].execute_wrapper(self)
+            )
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def __len__(self):
+        return len(self.queries)
+
+
+def api_client(user=None):
+    """Клиент Django, авторизованный токеном пользователя."""
+    if user is None:
+        return Client()
+    token, _ = Token.objects.get_or_create(user=user)
+    return Client(HTTP_AUTHORIZATION=f'Token {token.key}')
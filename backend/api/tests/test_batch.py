@@ -0,0 +1,43 @@
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from api.testing import api_client, isolated_settings
+
+User = get_user_model()
+
+
+@isolated_settings()
+class BatchTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='batcher', email='batcher@example.com', password='x'
+        )
+
+    def test_streaming_subresponse_rejected_and_closed(self):
+        opened = []
+
+        def tracking_open(*args, **kwargs):
+            file = open(*args, **kwargs)
+            opened.append(file)
+            return file
+
+        with tempfile.TemporaryDirectory() as exports, override_settings(
+            EXPORTS_ROOT=exports
+        ), mock.patch('api.delivery.open', tracking_open, create=True):
+            response = api_client(self.user).post('/api/batch/', {
+                'requests': [
+                    '/api/tags/', '/api/recipes/download_shopping_cart/',
+                ],
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        tags, cart = response.data['responses']
+        self.assertEqual(tags['status'], 200)
+        self.assertEqual(cart['status'], 400)
+        self.assertTrue(opened)
+        self.assertTrue(all(file.closed for file in opened))
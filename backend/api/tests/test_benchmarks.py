@@ -0,0 +1,46 @@
+import tempfile
+
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from api.management.commands.run_benchmarks import Command
+from api.testing import isolated_settings
+from recipes.dataset import generate_dataset
+
+# Сценарии списка открывают страницы 1-10 по 6 рецептов.
+SCALE = {
+    'users': 6, 'follows': 3, 'recipes': 60, 'ingredients': 20,
+    'ingredients_per_recipe': 4, 'tags': 3, 'tags_per_recipe': 2,
+    'favorites': 4, 'cart': 3,
+}
+OPTIONS = {'seed': 0, 'warmup': 1, 'iterations': 5, 'only': None}
+
+
+@isolated_settings()
+class BenchmarkScenariosTest(TestCase):
+    """Сценарии run_benchmarks на малом наборе данных."""
+
+    def test_scenarios(self):
+        with tempfile.TemporaryDirectory() as media, override_settings(
+            MEDIA_ROOT=media, EXPORTS_ROOT=f'{media}/exports'
+        ):
+            dataset = generate_dataset(seed=0, **SCALE)
+            results = Command().run(dataset, OPTIONS)
+        self.assertEqual(set(results), {
+            'recipes-list', 'recipes-list-anonymous', 'recipes-detail',
+            'users-subscriptions', 'ingredients-search',
+            'recipes-download-shopping-cart', 'recipes-create',
+            'recipes-update',
+        })
+        for name, result in results.items():
+            with self.subTest(scenario=name):
+                self.assertEqual(
+                    sum(result['statuses'].values()), OPTIONS['iterations']
+                )
+                self.assertTrue(all(
+                    status.startswith('2') for status in result['statuses']
+                ), result['statuses'])
+                self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+                self.assertLessEqual(
+                    result['queries_p50'], result['queries_max']
+                )
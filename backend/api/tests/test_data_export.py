@@ -0,0 +1,64 @@
+import io
+import json
+import tempfile
+import zipfile
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from api.data_export import iter_recipes, iter_zip
+from api.testing import isolated_settings
+from recipes.models import Recipe
+
+User = get_user_model()
+
+IMAGE = 'recipes/images/export.png'
+
+
+@isolated_settings()
+class DataExportTest(TestCase):
+    """Рецепт без картинки не ломает выгрузку."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='exporter', email='exporter@example.com', password='x'
+        )
+        cls.with_image = Recipe.objects.create(
+            author=cls.user, name='С картинкой', text='Текст',
+            cooking_time=5, image=IMAGE
+        )
+        cls.without_image = Recipe.objects.create(
+            author=cls.user, name='Без картинки', text='Текст',
+            cooking_time=5, image=''
+        )
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        path = Path(media.name) / IMAGE
+        path.parent.mkdir(parents=True)
+        path.write_bytes(b'png')
+
+    def test_missing_image_is_null(self):
+        images = {
+            recipe['id']: recipe['image']
+            for recipe in iter_recipes(self.user)
+        }
+        self.assertIsNone(images[self.without_image.pk])
+        self.assertTrue(images[self.with_image.pk].endswith(IMAGE))
+
+    def test_zip_skips_missing_image(self):
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(iter_zip(self.user))))
+        self.assertIn(IMAGE, archive.namelist())
+        self.assertEqual(archive.read(IMAGE), b'png')
+        recipes = [
+            json.loads(line)
+            for line in archive.read('recipes.ndjson').splitlines()
+        ]
+        self.assertEqual(len(recipes), 2)
@@ -0,0 +1,70 @@
+import io
+import os
+import stat
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from api.delivery import EXPORT_MODE, get_export
+
+
+def render(content):
+    return lambda: io.BytesIO(content)
+
+
+class GetExportTest(SimpleTestCase):
+    """Выгрузки в EXPORTS_ROOT: права, повторное использование, очистка."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(EXPORTS_ROOT=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def export(self, key, content=b'pdf'):
+        return get_export('cart', 1, key, 'pdf', render(content))
+
+    def age(self, path, seconds=60):
+        past = time.time() - seconds
+        os.utime(path, (past, past))
+
+    def test_readable_by_nginx(self):
+        path = self.export('list')
+        self.assertEqual(stat.S_IMODE(path.stat().st_mode), EXPORT_MODE)
+
+    def test_hit_reuses_and_touches_file(self):
+        path = self.export('list')
+        self.age(path)
+        self.assertEqual(self.export('list', b'other'), path)
+        self.assertEqual(path.read_bytes(), b'pdf')
+        self.assertGreater(path.stat().st_mtime, time.time() - 10)
+
+    def test_cleanup_spares_file_served_during_generation(self):
+        served = self.export('old')
+        stale = served.with_name('stale.pdf')
+        stale.write_bytes(b'stale')
+        self.age(served)
+        self.age(stale)
+
+        def render_new():
+            # Параллельный запрос отдаёт прежнюю выгрузку из кэша.
+            self.assertEqual(self.export('old'), served)
+            return io.BytesIO(b'new')
+
+        path = get_export('cart', 1, 'new', 'pdf', render_new)
+        self.assertTrue(path.exists())
+        self.assertTrue(served.exists())
+        self.assertFalse(stale.exists())
+
+    def test_failed_render_leaves_no_files(self):
+        path = self.export('list')
+
+        def broken():
+            raise RuntimeError
+
+        with self.assertRaises(RuntimeError):
+            get_export('cart', 1, 'broken', 'pdf', broken)
+        self.assertEqual(list(path.parent.iterdir()), [path])
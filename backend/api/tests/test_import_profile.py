@@ -0,0 +1,31 @@
+from django.test import SimpleTestCase
+
+from api.management.commands.import_profile import (get_lazy_modules,
+                                                    parse_importtime, probe)
+
+IMPORTTIME = '''import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        420 | foodgram
+import time:        80 |         80 |   foodgram.settings
+'''
+
+
+class ImportProfileTest(SimpleTestCase):
+    """Холодный старт воркера не загружает тяжёлые подсистемы."""
+
+    def test_parse_importtime(self):
+        self.assertEqual(parse_importtime(IMPORTTIME), [
+            ('_io', 120, 120, 1),
+            ('foodgram', 300, 420, 0),
+            ('foodgram.settings', 80, 80, 1),
+        ])
+
+    def test_heavy_modules_load_lazily(self):
+        report = probe()
+        loaded = [
+            name for name in get_lazy_modules()
+            if name in report['modules']
+        ]
+        self.assertFalse(loaded, f'При старте загружены: {loaded}')
+        self.assertGreater(report['import_ms'], 0)
+        self.assertGreater(report['rss_mb'], 0)
@@ -0,0 +1,75 @@
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from api.testing import api_client, isolated_settings
+
+User = get_user_model()
+
+
+@isolated_settings()
+class UserPermissionsTest(TestCase):
+    """Изменять и удалять пользователя может только он сам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner, cls.other = (
+            User.objects.create_user(
+                username=name, email=f'{name}@example.com',
+                first_name=name, last_name=name, password='Qwerty-123456'
+            )
+            for name in ('owner', 'other')
+        )
+
+    def test_owner_updates_self(self):
+        response = api_client(self.owner).patch(
+            f'/api/users/{self.owner.pk}/', {'first_name': 'Новое'},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.owner.refresh_from_db()
+        self.assertEqual(self.owner.first_name, 'Новое')
+
+    def test_other_user_cannot_update_or_delete(self):
+        client = api_client(self.other)
+        url = f'/api/users/{self.owner.pk}/'
+        for method in ('patch', 'put', 'delete'):
+            with self.subTest(method=method):
+                response = getattr(client, method)(
+                    url, {'first_name': 'Чужое'},
+                    content_type='application/json'
+                )
+                self.assertEqual(response.status_code, 403)
+        self.assertTrue(User.objects.filter(
+            pk=self.owner.pk, first_name='owner'
+        ).exists())
+
+    def test_anonymous_cannot_update(self):
+        response = api_client().patch(
+            f'/api/users/{self.owner.pk}/', {'first_name': 'Аноним'},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 401)
+
+
+@isolated_settings()
+class ShoppingCartDownloadPermissionsTest(TestCase):
+    """Список покупок скачивает только авторизованный пользователь."""
+
+    def test_anonymous(self):
+        response = api_client().get('/api/recipes/download_shopping_cart/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_user(self):
+        user = User.objects.create_user(
+            username='buyer', email='buyer@example.com', password='x'
+        )
+        with tempfile.TemporaryDirectory() as exports, override_settings(
+            EXPORTS_ROOT=exports
+        ):
+            response = api_client(user).get(
+                '/api/recipes/download_shopping_cart/'
+            )
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,30 @@
+from django.test import TransactionTestCase
+
+from api.management.commands.check_query_budgets import (find_problems,
+                                                         measure,
+                                                         missing_routes)
+from api.testing import isolated_settings
+
+
+@isolated_settings()
+class QueryBudgetsTest(TransactionTestCase):
+    """
+    Каждый маршрут API укладывается в бюджет запросов, и их число не
+    зависит от объёма данных. TransactionTestCase, как и
+    check_query_budgets: запросы on_commit входят в бюджет.
+    """
+
+    def test_every_route_has_budget(self):
+        self.assertFalse(missing_routes())
+
+    def test_query_budgets(self):
+        for check, small_queries, status, queries in measure():
+            with self.subTest(
+                method=check.method, route=check.route, actor=check.actor
+            ):
+                self.assertLess(status, 500)
+                problems = find_problems(check, small_queries, queries)
+                self.assertFalse(problems, '\n'.join([
+                    f'{check.method} {check.path}: {"; ".join(problems)}',
+                    *queries,
+                ]))
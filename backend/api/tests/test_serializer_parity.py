@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from api.management.commands.check_serializer_parity import (
+    SCALE, create_tricky_recipe, describe_mismatch, fetch, get_urls)
+from api.testing import api_client, isolated_settings
+from recipes.dataset import generate_dataset
+
+User = get_user_model()
+
+
+@isolated_settings()
+class SerializerParityTest(TestCase):
+    """Быстрая сериализация отвечает байт в байт как DRF."""
+
+    @classmethod
+    def setUpTestData(cls):
+        dataset = generate_dataset(prefix='parity', seed=0, **SCALE)
+        cls.user = User.objects.get(pk=dataset['user_ids'][0])
+        cls.tricky = create_tricky_recipe(cls.user, dataset)
+        cls.urls = get_urls(dataset, cls.user, cls.tricky)
+
+    def assert_parity(self, client, url):
+        fast = fetch(client, url, True)
+        regular = fetch(client, url, False)
+        self.assertEqual(fast, regular, describe_mismatch(fast, regular))
+
+    def test_anonymous(self):
+        client = api_client()
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assert_parity(client, url)
+
+    def test_user(self):
+        client = api_client(self.user)
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assert_parity(client, url)
+
+    def test_after_favorite_and_cart_change(self):
+        client = api_client(self.user)
+        url = f'/api/recipes/{self.tricky.pk}/'
+        for relation in ('favorite', 'shopping_cart'):
+            response = client.post(f'{url}{relation}/')
+            self.assertEqual(response.status_code, 201)
+            with self.subTest(relation=relation):
+                self.assert_parity(client, url)
+                self.assert_parity(
+                    client, '/api/recipes/?is_favorited=1&limit=50'
+                )
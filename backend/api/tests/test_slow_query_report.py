@@ -0,0 +1,26 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from api.management.commands.slow_query_report import read_entries
+
+
+class ReadEntriesTest(SimpleTestCase):
+
+    def test_rotated_logs_oldest_first(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log_file = Path(directory) / 'slow_queries.log'
+            for name, order in (
+                ('slow_queries.log', 12), ('slow_queries.log.1', 11),
+                ('slow_queries.log.2', 10), ('slow_queries.log.10', 2),
+                ('slow_queries.log.11', 1),
+            ):
+                (Path(directory) / name).write_text(
+                    json.dumps({'order': order}) + '\n', encoding='utf-8'
+                )
+            self.assertEqual(
+                [entry['order'] for entry in read_entries(log_file)],
+                [1, 2, 10, 11, 12]
+            )
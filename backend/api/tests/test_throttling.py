@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from api.testing import api_client, isolated_settings
+from api.throttling import IN_FLIGHT_KEY, get_cache
+
+User = get_user_model()
+
+CAPACITY = 4
+
+
+def admission_only():
+    """Контроль допуска без корзин жетонов."""
+    return override_settings(THROTTLING={
+        **settings.THROTTLING,
+        'ENABLED': False,
+        'ADMISSION': {
+            **settings.THROTTLING['ADMISSION'],
+            'ENABLED': True, 'CAPACITY': CAPACITY, 'SHED_AT': 0.75,
+            'EXPENSIVE_COST': 10, 'RETRY_AFTER': 3,
+        },
+    })
+
+
+@isolated_settings()
+class AdmissionControlTest(TestCase):
+    """ADMISSION_CONTROL_ENABLED работает и без THROTTLING_ENABLED."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='admission', email='admission@example.com',
+            password='x'
+        )
+
+    def get(self, path, busy, user=None):
+        """Запрос, пока busy других запросов уже в обработке."""
+        get_cache().set(IN_FLIGHT_KEY, busy)
+        return api_client(user).get(path)
+
+    def test_idle(self):
+        with admission_only():
+            self.assertEqual(self.get('/api/tags/', 0).status_code, 200)
+
+    def test_saturated_rejects_cheap_requests(self):
+        with admission_only():
+            response = self.get('/api/tags/', CAPACITY)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '3')
+
+    def test_busy_sheds_expensive_requests_first(self):
+        busy = CAPACITY * 3 // 4
+        with admission_only():
+            expensive = self.get(
+                '/api/recipes/download_shopping_cart/', busy, self.user
+            )
+            cheap = self.get('/api/tags/', busy)
+        self.assertEqual(expensive.status_code, 429)
+        self.assertEqual(cheap.status_code, 200)
+
+    def test_counter_released_after_request(self):
+        with admission_only():
+            self.get('/api/tags/', 0)
+        self.assertEqual(get_cache().get(IN_FLIGHT_KEY), 0)
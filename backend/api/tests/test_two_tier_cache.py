@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from foodgram.cache import TwoTierCache
+
+FILE_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': '/tmp/foodgram_cache_test',
+    },
+}
+
+
+def two_tier_cache(shared):
+    return TwoTierCache({**settings.TWO_TIER_CACHE, 'SHARED': shared})
+
+
+@override_settings(CACHES=FILE_CACHES)
+class TwoTierCacheTest(SimpleTestCase):
+
+    def test_shared_tier_refused_on_file_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            two_tier_cache(shared=True).check_shared()
+
+    def test_without_shared_tier(self):
+        cache = two_tier_cache(shared=False)
+        cache.check_shared()
+        cache.set('recipes', [1], tags=('recipe:1',))
+        self.assertEqual(cache.get('recipes'), [1])
+        cache.invalidate_tags('recipe:1')
+        self.assertIsNone(cache.get('recipes'))
@@ -0,0 +1,178 @@
+"""
+Ограничение частоты запросов с весом эндпоинтов.
+
+Запрос стоит THROTTLING['COSTS']['<МЕТОД> <url_name>'] жетонов, по
+умолчанию один: PDF списка покупок или создание рецепта с картинкой
+в base64 дороже страницы списка. Жетоны списываются из двух корзин
+в общем для воркеров кэше: общей корзины пользователя (для анонимов —
+IP) и его корзины на этом эндпоинте. Корзина хранится одним числом —
+моментом, когда она снова станет полной (GCRA). Чтение и запись
+корзин клиента идут под блокировкой на атомарном add, поэтому
+параллельные запросы одного клиента не списывают жетоны поверх друг
+друга. Нужен общий кэш с атомарными add и incr (Redis, memcached):
+с кэшем в файлах или в памяти процесса ограничение не включается.
+
+Контроль допуска считает запросы в обработке у всех воркеров общим
+счётчиком в кэше. При загрузке выше ADMISSION['SHED_AT'] отклоняются
+дорогие запросы, а дешёвые — только когда заняты все воркеры.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from foodgram.cache import NON_ATOMIC_BACKENDS
+from rest_framework.throttling import BaseThrottle
+
+from .metrics import get_view_label
+
+IN_FLIGHT_KEY = 'throttle:in_flight'
+LOCK_TIMEOUT = 1
+LOCK_ATTEMPTS = 10
+LOCK_POLL_INTERVAL = 0.005
+
+
+def get_cache():
+    return caches[settings.THROTTLING['CACHE_ALIAS']]
+
+
+def check_cache():
+    """Проверка при запуске, что кэш подходит для ограничения частоты."""
+    if isinstance(get_cache(), NON_ATOMIC_BACKENDS):
+        raise ImproperlyConfigured(
+            'THROTTLING_ENABLED и ADMISSION_CONTROL_ENABLED требуют '
+            'общего кэша с атомарными add и incr (Redis, memcached).'
+        )
+
+
+def get_endpoint(request):
+    return f'{request.method} {get_view_label(request)}'
+
+
+def get_cost(request):
+    return settings.THROTTLING['COSTS'].get(get_endpoint(request), 1)
+
+
+def get_in_flight():
+    """Число запросов в обработке у всех воркеров."""
+    return max(get_cache().get(IN_FLIGHT_KEY, 0), 0)
+
+
+class CostThrottle(BaseThrottle):
+    """
+    Списывает цену запроса из корзин get_buckets(), если её хватает
+    во всех, и отклоняет дорогие запросы при перегрузке воркеров.
+    Корзины проверяются вместе: отклонённый запрос ничего не списывает.
+    """
+
+    def __init__(self):
+        self.retry_after = None
+
+    def get_identity(self, request):
+        """Ключ клиента и настройки его общей корзины."""
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}', settings.THROTTLING['USER']
+        return f'anon:{self.get_ident(request)}', settings.THROTTLING['ANON']
+
+    def get_buckets(self, request):
+        """Ключи корзин с пополнением в жетонах в секунду и ёмкостью."""
+        identity, config = self.get_identity(request)
+        endpoint = settings.THROTTLING['ENDPOINT']
+        label = get_endpoint(request).replace(' ', ':')
+        return {
+            f'throttle:{identity}': (config['RATE'], config['BURST']),
+            f'throttle:{identity}:{label}': (
+                endpoint['RATE'], endpoint['BURST']
+            ),
+        }
+
+    def admit(self, cost):
+        config = settings.THROTTLING['ADMISSION']
+        if not config['ENABLED']:
+            return True
+        # Текущий запрос уже учтён в счётчике.
+        busy = (get_in_flight() - 1) / config['CAPACITY']
+        if cost >= config['EXPENSIVE_COST']:
+            return busy < config['SHED_AT']
+        return busy < 1
+
+    def allow_request(self, request, view):
+        config = settings.THROTTLING
+        # Контроль допуска и корзины включаются независимо.
+        if not config['ENABLED'] and not config['ADMISSION']['ENABLED']:
+            return True
+        cost = get_cost(request)
+        if not self.admit(cost):
+            self.retry_after = config['ADMISSION']['RETRY_AFTER']
+            return False
+        if not config['ENABLED']:
+            return True
+        identity, _ = self.get_identity(request)
+        lock = f'throttle:lock:{identity}'
+        cache = get_cache()
+        for _ in range(LOCK_ATTEMPTS):
+            if cache.add(lock, True, timeout=LOCK_TIMEOUT):
+                break
+            time.sleep(LOCK_POLL_INTERVAL)
+        else:
+            # Клиент шлёт слишком много запросов одновременно.
+            self.retry_after = LOCK_TIMEOUT
+            return False
+        try:
+            return self.consume(cache, self.get_buckets(request), cost)
+        finally:
+            cache.delete(lock)
+
+    def consume(self, cache, buckets, cost):
+        """Списывает cost из всех корзин или не трогает ни одну."""
+        now = time.time()
+        stored = cache.get_many(buckets)
+        full_at = {}
+        overdraft = 0
+        for key, (rate, burst) in buckets.items():
+            # Запрос дороже ёмкости иначе не прошёл бы никогда.
+            full_at[key] = (
+                max(stored.get(key, now), now) + min(cost, burst) / rate
+            )
+            overdraft = max(overdraft, full_at[key] - now - burst / rate)
+        if overdraft > 0:
+            self.retry_after = overdraft
+            return False
+        cache.set_many(
+            full_at, timeout=math.ceil(max(full_at.values()) - now) + 1
+        )
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+
+class InFlightMiddleware:
+    """
+    Ведёт общий счётчик запросов в обработке для контроля допуска.
+    Атомарный incr есть у Redis и memcached. Ключ живёт COUNTER_TTL
+    секунд и создаётся заново, поэтому запросы упавших воркеров не
+    накапливаются в счётчике.
+    """
+
+    def __init__(self, get_response):
+        if not settings.THROTTLING['ADMISSION']['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        cache = get_cache()
+        timeout = settings.THROTTLING['ADMISSION']['COUNTER_TTL']
+        if not cache.add(IN_FLIGHT_KEY, 1, timeout=timeout):
+            try:
+                cache.incr(IN_FLIGHT_KEY)
+            except ValueError:
+                cache.add(IN_FLIGHT_KEY, 1, timeout=timeout)
+        try:
+            return self.get_response(request)
+        finally:
+            try:
+                cache.decr(IN_FLIGHT_KEY)
+            except ValueError:
+                pass
@@ -1,6 +1,9 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter as Router
 
+from .allocations import allocations_view
+from .batch import batch_view
+from .metrics import metrics_view
 from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
 
 app_name = 'api'
@@ -12,6 +15,9 @@ router.register('ingredients', IngredientViewSet, basename='ingredients')
 router.register('recipes', RecipeViewSet, basename='recipes')
 
 urlpatterns = [
+    path('metrics', metrics_view, name='metrics'),
+    path('batch/', batch_view, name='batch'),
+    path('allocations/', allocations_view, name='allocations'),
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
 ]
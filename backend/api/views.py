@@ -1,78 +1,294 @@
+from deletion.jobs import schedule_deletion
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import FileResponse
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import (BooleanField, Count, Exists, OuterRef, Prefetch,
+                              Q, Subquery, Sum, Value)
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
+from djoser.permissions import CurrentUserOrAdmin
 from djoser.views import UserViewSet
+from foodgram.cache import two_tier_cache
+from outbox.constants import CREATED, DELETED, FOLLOW, UPDATED, USER
+from outbox.events import record_change
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
                             ShoppingCart, Tag)
+from recipes.registry import ingredient_registry
+from user.models import Follow
 
-from .constants import NO_EXIST_SUB, RECIPE_NOT_ADD, SHOPPING_CART_NAME
+from .constants import (EXPORT_ARCHIVE_INVALID, NO_EXIST_SUB,
+                        RECIPE_ALREADY_EXISTS, RECIPE_NOT_ADD,
+                        RECIPE_NOT_FOUND, SHOPPING_CART_EXPORT_VERSION,
+                        SHOPPING_CART_NAME)
+from .data_export import iter_ndjson, iter_zip
+from .delivery import content_disposition, get_export, send_file
+from .fast_serializers import recipe_values, serialize_recipes
 from .filters import IngredientFilter, RecipeFilter
+from .metrics import timed_serialization
+from .mixins import AnonymousResponseCacheMixin, CachedReadMixin
 from .pagination import RecipePaginator
-from .pdf_generator import download_pdf_shopping_cart
 from .permissions import IsOwnerOrReadOnly
-from .serializers import (FavoriteSerializer, IngredientSerializer,
+from .serializers import (IngredientSerializer, RecipeBatchSerializer,
                           RecipeReadSerializer, RecipeWriteSerializer,
-                          ShoppingCartSerializer, SubscriptionCreateSerializer,
+                          ShortRecipeSerializer, SubscriptionCreateSerializer,
                           SubscriptionSerializer, TagSerializer,
-                          UserReadSerializer)
+                          UserReadSerializer, get_recipes_limit,
+                          sideload_recipes)
 
 User = get_user_model()
 
+# Предел BigAutoField: больший id PostgreSQL отвергает ошибкой.
+MAX_RECIPE_ID = 2 ** 63 - 1
 
-class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.all()
+
+def annotate_is_subscribed(queryset, user):
+    """Признак подписки одним подзапросом вместо запроса на автора."""
+    if not user.is_authenticated:
+        return queryset
+    return queryset.annotate(is_subscribed=Exists(
+        Follow.objects.filter(user=user, author=OuterRef('pk'))
+    ))
+
+
+def parse_recipe_id(pk):
+    """id рецепта из URL или None, если это не id."""
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    return pk if 0 < pk <= MAX_RECIPE_ID else None
+
+
+def get_short_recipe(request, pk):
+    """
+    Краткий рецепт для ответов избранного и списка покупок из кэша:
+    он меняется редко, а запрашивается при каждом добавлении.
+    """
+    def compute():
+        recipe = get_object_or_404(
+            Recipe.visible.only('id', 'name', 'image', 'cooking_time'),
+            pk=pk
+        )
+        return ShortRecipeSerializer(
+            recipe, context={'request': request}
+        ).data
+
+    return two_tier_cache.get_or_set(
+        f'short_recipe:{request.get_host()}:{pk}', compute,
+        tags=(f'recipe:{pk}',), timeout=settings.RESPONSE_CACHE_TIMEOUT
+    )
+
+
+class RecipeViewSet(AnonymousResponseCacheMixin, viewsets.ModelViewSet):
+    queryset = Recipe.visible.all()
     permission_classes = (IsOwnerOrReadOnly, )
     filter_backends = (DjangoFilterBackend, )
     filterset_class = RecipeFilter
     pagination_class = RecipePaginator
 
+    def get_cache_tags(self):
+        embedded = ('users', 'tags', 'ingredients')
+        if self.action == 'retrieve':
+            return (f'recipe:{self.kwargs["pk"]}', *embedded)
+        return ('recipes', *embedded)
+
+    def annotate_relations(self, queryset):
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset
+        return queryset.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+        )
+
+    def get_queryset(self):
+        return self.annotate_relations(Recipe.visible.prefetch_related(
+            Prefetch('author', queryset=annotate_is_subscribed(
+                User.objects.all(), self.request.user
+            )),
+            Prefetch('tags', queryset=Tag.objects.order_by('id')),
+            Prefetch('recipe', queryset=IngredientRecipe.objects.order_by(
+                'id'
+            )),
+        ))
+
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
-    def create_favorite_or_cart(self, serializer_class, pk, request):
-        user = request.user
-        data = {'user': user.id, 'recipe': pk}
-        serializer = serializer_class(data=data, context={'request': request})
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    def is_sideloaded(self):
+        return self.request.query_params.get('sideload') in ('1', 'true')
+
+    def list(self, request, *args, **kwargs):
+        if self.is_sideloaded():
+            handler = self.sideloaded_list
+        elif settings.FAST_SERIALIZATION:
+            handler = self.fast_list
+        else:
+            return super().list(request, *args, **kwargs)
+        return self.cached_response(handler, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.FAST_SERIALIZATION:
+            return super().retrieve(request, *args, **kwargs)
+        return self.cached_response(
+            self.fast_retrieve, request, *args, **kwargs
+        )
+
+    def serialize_fast(self, rows):
+        return timed_serialization(
+            serialize_recipes, rows, self.request, annotate_is_subscribed(
+                User.objects.all(), self.request.user
+            )
+        )
+
+    def fast_list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(
+            self.annotate_relations(Recipe.visible.all())
+        )
+        page = self.paginate_queryset(recipe_values(queryset, request.user))
+        return self.get_paginated_response(self.serialize_fast(page))
+
+    def fast_retrieve(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(
+            self.annotate_relations(Recipe.visible.all())
+        )
+        row = get_object_or_404(
+            recipe_values(queryset, request.user), pk=kwargs['pk']
+        )
+        return Response(self.serialize_fast([row])[0])
+
+    def sideloaded_list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(
+            self.filter_queryset(self.get_queryset())
+        )
+        data = sideload_recipes(page, self.get_serializer_context())
+        response = self.get_paginated_response(data.pop('results'))
+        response.data.update(data)
+        return response
+
+    def perform_destroy(self, instance):
+        schedule_deletion(instance)
+
+    def create_favorite_or_cart(self, model, pk, request):
+        pk = parse_recipe_id(pk)
+        if pk is None or not model.objects.add(request.user, pk):
+            return self.relation_error(pk, RECIPE_ALREADY_EXISTS)
+        return Response(
+            get_short_recipe(request, pk), status=status.HTTP_201_CREATED
+        )
 
     def delete_favorite_or_cart(self, model, pk, request):
-        user = request.user
-        recipe = get_object_or_404(Recipe, pk=pk)
-        queryset = model.objects.filter(user=user, recipe=recipe)
-        deleted_count, _ = queryset.delete()
-        if deleted_count == 0:
+        pk = parse_recipe_id(pk)
+        if pk is None or not model.objects.remove(request.user, pk):
+            return self.relation_error(pk, RECIPE_NOT_ADD)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def relation_error(self, pk, message):
+        """404 для несуществующего рецепта, иначе 400 с message."""
+        if pk is None or not Recipe.visible.filter(pk=pk).exists():
             return Response(
-                {'message': RECIPE_NOT_ADD},
-                status=status.HTTP_400_BAD_REQUEST
+                {'message': RECIPE_NOT_FOUND},
+                status=status.HTTP_404_NOT_FOUND
             )
+        return Response(
+            {'message': message}, status=status.HTTP_400_BAD_REQUEST
+        )
 
-        return Response(status=status.HTTP_204_NO_CONTENT)
+    def batch_favorite_or_cart(self, model, request):
+        serializer = RecipeBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            results = model.objects.apply_batch(
+                request.user, **serializer.validated_data
+            )
+        return Response({
+            operation: [
+                {'id': pk, 'status': result}
+                for pk, result in statuses.items()
+            ]
+            for operation, statuses in results.items()
+        })
 
-    @action(detail=False, methods=['GET'])
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='favorite/batch',
+        url_name='favorite-batch',
+        permission_classes=[IsAuthenticated]
+    )
+    def favorite_batch(self, request):
+        return self.batch_favorite_or_cart(Favorite, request)
+
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='shopping_cart/batch',
+        url_name='shopping_cart-batch',
+        permission_classes=[IsAuthenticated]
+    )
+    def shopping_cart_batch(self, request):
+        return self.batch_favorite_or_cart(ShoppingCart, request)
+
+    @action(
+        detail=False,
+        methods=['delete'],
+        url_path='shopping_cart/clear',
+        url_name='shopping_cart-clear',
+        permission_classes=[IsAuthenticated]
+    )
+    def shopping_cart_clear(self, request):
+        return Response({
+            'removed': ShoppingCart.objects.clear(request.user)
+        })
+
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=[IsAuthenticated]
+    )
     def download_shopping_cart(self, request):
-        ingredients_list = IngredientRecipe.objects.filter(
-            recipe__shopping_cart__user=request.user
-        ).values('ingredient__name', 'ingredient__measurement_unit').annotate(
+        totals = list(IngredientRecipe.objects.filter(
+            recipe__shopping_cart__user=request.user,
+            recipe__pending_deletion=False
+        ).values_list('ingredient_id').annotate(
             total_amount=Sum('amount')
-        ).order_by('ingredient__name', 'ingredient__measurement_unit')
+        ).order_by())
+        catalog = ingredient_registry.get(
+            [ingredient_id for ingredient_id, _ in totals]
+        )
+        ingredients_list = sorted(
+            (*catalog[ingredient_id], total_amount)
+            for ingredient_id, total_amount in totals
+        )
 
-        buffer = download_pdf_shopping_cart(request.user, ingredients_list)
-        filename = f'{request.user.username}\'s-{SHOPPING_CART_NAME}'
-        return FileResponse(
-            buffer,
-            as_attachment=True,
-            filename=filename
+        def render():
+            # reportlab загружается при первом PDF, а не в каждом воркере.
+            from .pdf_generator import download_pdf_shopping_cart
+
+            return download_pdf_shopping_cart(
+                request.user, ingredients_list
+            )
+
+        export = get_export(
+            'shopping_cart', request.user.pk,
+            (SHOPPING_CART_EXPORT_VERSION, request.user.username,
+             ingredients_list),
+            'pdf', render
         )
+        filename = f'{request.user.username}\'s-{SHOPPING_CART_NAME}'
+        return send_file(export, filename=filename, as_attachment=True)
 
     @action(
         detail=True,
@@ -81,8 +297,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
         url_name='shopping_cart'
     )
     def shopping_cart(self, request, pk=None):
-        serializer_class = ShoppingCartSerializer
-        return self.create_favorite_or_cart(serializer_class, pk, request)
+        model = ShoppingCart
+        return self.create_favorite_or_cart(model, pk, request)
 
     @shopping_cart.mapping.delete
     def shopping_cart_delete(self, request, pk=None):
@@ -96,8 +312,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
         url_name='favorite'
     )
     def favorite(self, request, pk):
-        serializer_class = FavoriteSerializer
-        return self.create_favorite_or_cart(serializer_class, pk, request)
+        model = Favorite
+        return self.create_favorite_or_cart(model, pk, request)
 
     @favorite.mapping.delete
     def favorite_delete(self, request, pk):
@@ -105,13 +321,15 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return self.delete_favorite_or_cart(model, pk, request)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CachedReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
+    cache_tags = ('tags',)
     serializer_class = TagSerializer
 
 
-class UserViewSet(UserViewSet):
+class UserViewSet(AnonymousResponseCacheMixin, UserViewSet):
     queryset = User.objects.all()
+    cache_tags = ('users',)
     serializer_class = UserReadSerializer
     permission_classes = (IsOwnerOrReadOnly,)
     pagination_class = RecipePaginator
@@ -119,8 +337,29 @@ class UserViewSet(UserViewSet):
     def get_permissions(self):
         if self.action == 'me':
             return [IsAuthenticated()]
+        if self.action in ('update', 'partial_update', 'destroy'):
+            return [CurrentUserOrAdmin()]
         return super().get_permissions()
 
+    def get_queryset(self):
+        return annotate_is_subscribed(
+            super().get_queryset().filter(pending_deletion=False),
+            self.request.user
+        )
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        record_change(USER, CREATED, serializer.instance.pk)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        record_change(USER, UPDATED, serializer.instance.pk)
+
+    def perform_destroy(self, instance):
+        schedule_deletion(instance)
+
     @action(
         detail=False,
         permission_classes=(IsAuthenticated,),
@@ -128,13 +367,55 @@ class UserViewSet(UserViewSet):
     )
     def subscriptions(self, request):
         user = self.request.user
-        queryset = User.objects.filter(sub_author__user=user)
+        recipes = Recipe.visible.all()
+        limit = get_recipes_limit(request)
+        if limit is not None:
+            # Только первые limit рецептов каждого автора, а не все.
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.visible.filter(
+                    author=OuterRef('author')
+                ).values('pk')[:limit]
+            ))
+        # После GROUP BY от Count Django не применяет Meta.ordering.
+        queryset = User.objects.filter(
+            sub_author__user=user, pending_deletion=False
+        ).annotate(
+            recipes_count=Count(
+                'recipes', filter=Q(recipes__pending_deletion=False)
+            ),
+            is_subscribed=Value(True, output_field=BooleanField()),
+        ).order_by('username', 'id').prefetch_related(
+            Prefetch('recipes', queryset=recipes)
+        )
         page = self.paginate_queryset(queryset)
         serializer = SubscriptionSerializer(
             page, many=True, context={'request': request}
         )
         return self.get_paginated_response(serializer.data)
 
+    @action(
+        detail=False,
+        url_path='me/export',
+        url_name='me-export',
+        permission_classes=(IsAuthenticated,)
+    )
+    def export(self, request):
+        """Все данные пользователя потоком NDJSON или zip-архивом."""
+        archive = request.query_params.get('archive', 'ndjson')
+        if archive == 'zip':
+            content, content_type = iter_zip(request.user), 'application/zip'
+        elif archive == 'ndjson':
+            content, content_type = (
+                iter_ndjson(request.user), 'application/x-ndjson'
+            )
+        else:
+            raise ValidationError({'archive': EXPORT_ARCHIVE_INVALID})
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = content_disposition(
+            f'{request.user.username}-export.{archive}', as_attachment=True
+        )
+        return response
+
     @action(
         detail=True,
         methods=('post', 'delete'),
@@ -143,7 +424,9 @@ class UserViewSet(UserViewSet):
     )
     def subscribe(self, request, id):
         user = request.user
-        author = get_object_or_404(User, pk=id)
+        author = get_object_or_404(
+            User.objects.filter(pending_deletion=False), pk=id
+        )
         subscription = user.sub_user.filter(author=author)
         data = {'user': user.id, 'author': id}
         serializer = SubscriptionCreateSerializer(
@@ -152,14 +435,21 @@ class UserViewSet(UserViewSet):
         )
         if request.method == 'POST':
             serializer.is_valid(raise_exception=True)
-            serializer.save()
+            with transaction.atomic():
+                serializer.save()
+                record_change(FOLLOW, CREATED, author.pk, user_id=user.pk)
             serializer = SubscriptionSerializer(
                 author, context={'request': request}
             )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if request.method == 'DELETE':
-            deleted_count, _ = subscription.delete()
+            with transaction.atomic():
+                deleted_count, _ = subscription.delete()
+                if deleted_count:
+                    record_change(
+                        FOLLOW, DELETED, author.pk, user_id=user.pk
+                    )
             if deleted_count == 0:
                 return Response(
                     {'message': NO_EXIST_SUB},
@@ -168,8 +458,9 @@ class UserViewSet(UserViewSet):
             return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CachedReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
+    cache_tags = ('ingredients',)
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
@@ -0,0 +1,40 @@
+from django.contrib import admin
+
+from .constants import FAILED, PENDING
+from .jobs import get_stage_label
+from .models import DeletionJob
+
+
+@admin.register(DeletionJob)
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'entity', 'entity_id', 'status', 'get_stage', 'get_progress',
+        'updated_at',
+    )
+    list_filter = ('status', 'entity')
+    readonly_fields = ('get_stage', 'get_progress')
+    actions = ('retry',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Этап')
+    def get_stage(self, obj):
+        return get_stage_label(obj)
+
+    @admin.display(description='Прогресс')
+    def get_progress(self, obj):
+        if not obj.total:
+            return f'{obj.deleted}'
+        percent = min(obj.deleted * 100 // obj.total, 100)
+        return f'{obj.deleted} из {obj.total} ({percent}%)'
+
+    @admin.action(description='Перезапустить с прерванного этапа')
+    def retry(self, request, queryset):
+        updated = queryset.filter(status=FAILED).update(
+            status=PENDING, error=''
+        )
+        self.message_user(request, f'Перезапущено заданий: {updated}')
@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class DeletionConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'deletion'
+    verbose_name = 'Удаление'
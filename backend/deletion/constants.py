@@ -0,0 +1,19 @@
+from outbox.constants import RECIPE, USER
+
+ENTITIES = (
+    (USER, 'Пользователь'),
+    (RECIPE, 'Рецепт'),
+)
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+
+STATUSES = (
+    (PENDING, 'В очереди'),
+    (DONE, 'Выполнено'),
+    (FAILED, 'Ошибка'),
+)
+
+ENTITY_LIMIT = 32
+STATUS_LIMIT = 16
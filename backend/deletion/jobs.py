@@ -0,0 +1,187 @@
+"""
+Удаление пользователей и рецептов по частям.
+
+schedule_deletion() в транзакции запроса только помечает объект
+pending_deletion — он сразу пропадает из API — и ставит задание.
+Команда process_deletions удаляет зависимые строки пачками по
+DELETION['BATCH_SIZE']: пачка и прогресс задания фиксируются одной
+короткой транзакцией, поэтому горячие таблицы не блокируются надолго,
+объекты не загружаются в память, а прерванное задание продолжается
+с того же этапа. Сам объект удаляется последним обычным delete():
+крупных зависимостей у него к этому времени нет, и каскад Django
+убирает только мелочь вроде токена.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections, router, transaction
+from django.utils import timezone
+from outbox.constants import DELETED, RECIPE, USER
+from outbox.events import record_change
+from recipes.models import Favorite, IngredientRecipe, Recipe, ShoppingCart
+from user.models import Follow
+
+from .constants import DONE, FAILED, PENDING
+from .models import DeletionJob
+
+User = get_user_model()
+
+FINAL_STAGE = 'Объект'
+
+
+def schedule_deletion(obj):
+    """
+    Скрывает пользователя или рецепт и ставит задание на удаление.
+    Событие DELETED пишется сразу: для API объекта уже нет.
+    """
+    with transaction.atomic():
+        if isinstance(obj, User):
+            entity, payload = USER, {}
+            # Неактивного пользователя не пропускает аутентификация.
+            obj.is_active = False
+            update_fields = ('pending_deletion', 'is_active')
+            # Кэш ответов с рецептами сбрасывает сохранение автора:
+            # они помечены тегом 'users'.
+            Recipe.objects.filter(author=obj).update(
+                pending_deletion=True
+            )
+        else:
+            entity, payload = RECIPE, {'author_id': obj.author_id}
+            update_fields = ('pending_deletion',)
+        obj.pending_deletion = True
+        obj.save(update_fields=update_fields)
+        _, created = DeletionJob.objects.get_or_create(
+            entity=entity, entity_id=obj.pk
+        )
+        if created:
+            record_change(entity, DELETED, obj.pk, **payload)
+
+
+def get_stages(job):
+    """Этапы задания: название и queryset строк, удаляемых на нём."""
+    tags = Recipe.tags.through.objects
+    if job.entity == RECIPE:
+        recipe = {'recipe_id': job.entity_id}
+        return (
+            ('Избранное', Favorite.objects.filter(**recipe)),
+            ('Списки покупок', ShoppingCart.objects.filter(**recipe)),
+            ('Ингредиенты', IngredientRecipe.objects.filter(**recipe)),
+            ('Теги', tags.filter(**recipe)),
+        )
+    user = {'user_id': job.entity_id}
+    recipes = {'recipe__author_id': job.entity_id}
+    return (
+        ('Подписки', Follow.objects.filter(**user)),
+        ('Подписчики', Follow.objects.filter(author_id=job.entity_id)),
+        ('Избранное', Favorite.objects.filter(**user)),
+        ('Список покупок', ShoppingCart.objects.filter(**user)),
+        ('Рецепты в избранном', Favorite.objects.filter(**recipes)),
+        ('Рецепты в списках покупок',
+         ShoppingCart.objects.filter(**recipes)),
+        ('Ингредиенты рецептов', IngredientRecipe.objects.filter(**recipes)),
+        ('Теги рецептов', tags.filter(**recipes)),
+        ('Рецепты', Recipe.objects.filter(author_id=job.entity_id)),
+    )
+
+
+def get_stage_label(job):
+    stages = get_stages(job)
+    if job.stage < len(stages):
+        return stages[job.stage][0]
+    return FINAL_STAGE
+
+
+def delete_batch(queryset, batch_size):
+    """
+    Удаляет до batch_size строк одним DELETE по id, возвращает их
+    число. Каскад и сигналы не нужны: у строк этапа нет зависимых,
+    кроме удалённых на прошлых этапах, а сигналы лишь сбросили бы
+    кэши уже скрытого объекта.
+    """
+    opts = queryset.model._meta
+    using = router.db_for_write(queryset.model)
+    ids = list(
+        queryset.using(using).values_list('pk', flat=True)[:batch_size]
+    )
+    if not ids:
+        return 0
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(opts.db_table)} '
+            f'WHERE {quote(opts.pk.column)} IN '
+            f'({", ".join(["%s"] * len(ids))})',
+            ids
+        )
+        return cursor.rowcount
+
+
+def delete_target(job):
+    model = User if job.entity == USER else Recipe
+    deleted, _ = model._base_manager.filter(pk=job.entity_id).delete()
+    return deleted
+
+
+def run_batch(job_id, batch_size):
+    """
+    Выполняет одну пачку задания. Возвращает задание или None, если
+    оно уже завершено или его пачку сейчас выполняет другой процесс.
+    """
+    with transaction.atomic():
+        job = DeletionJob.objects.select_for_update(
+            skip_locked=True
+        ).filter(pk=job_id, status=PENDING).first()
+        if job is None:
+            return None
+        stages = get_stages(job)
+        if job.total is None:
+            job.total = sum(
+                queryset.count() for _, queryset in stages
+            ) + 1
+        if job.stage < len(stages):
+            deleted = delete_batch(stages[job.stage][1], batch_size)
+            if deleted < batch_size:
+                job.stage += 1
+        else:
+            deleted = delete_target(job)
+            job.status = DONE
+            job.finished_at = timezone.now()
+        job.deleted += deleted
+        if job.status == DONE:
+            # Оценка при старте учитывает строки на стыке этапов дважды.
+            job.total = job.deleted
+        job.save()
+    return job
+
+
+def process_job(job_id, batch_size=None, pause=None):
+    """
+    Выполняет задание до конца с паузой между пачками, чтобы не
+    вытеснять запросы API. При ошибке задание получает статус FAILED
+    и может быть перезапущено из админки с того же этапа.
+    """
+    batch_size = batch_size or settings.DELETION['BATCH_SIZE']
+    pause = settings.DELETION['BATCH_PAUSE'] if pause is None else pause
+    job = None
+    while True:
+        try:
+            batch = run_batch(job_id, batch_size)
+        except Exception as error:
+            DeletionJob.objects.filter(pk=job_id).update(
+                status=FAILED, error=repr(error), updated_at=timezone.now()
+            )
+            raise
+        if batch is None:
+            return job
+        job = batch
+        if job.status == DONE:
+            return job
+        time.sleep(pause)
+
+
+def get_pending_jobs():
+    return list(DeletionJob.objects.filter(
+        status=PENDING
+    ).values_list('pk', flat=True))
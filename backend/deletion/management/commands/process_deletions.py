@@ -0,0 +1,50 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from deletion.jobs import get_pending_jobs, get_stage_label, process_job
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет пользователей и рецепты, ожидающие удаления, вместе '
+        'с зависимыми строками пачками по DELETION["BATCH_SIZE"].'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить задания из очереди и выйти.'
+        )
+        parser.add_argument(
+            '--interval', type=float,
+            default=settings.DELETION['POLL_INTERVAL'],
+            help='Пауза между проверками очереди в секундах.'
+        )
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument(
+            '--pause', type=float,
+            help='Пауза между пачками в секундах.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            for job_id in get_pending_jobs():
+                started = time.perf_counter()
+                try:
+                    job = process_job(
+                        job_id, options['batch_size'], options['pause']
+                    )
+                except Exception as error:
+                    self.stderr.write(f'Задание {job_id}: {error!r}')
+                    continue
+                if job is not None:
+                    self.stdout.write(
+                        f'Задание {job_id} ({job.entity}:{job.entity_id}): '
+                        f'{get_stage_label(job)}, удалено строк '
+                        f'{job.deleted} за '
+                        f'{time.perf_counter() - started:.1f} с'
+                    )
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,39 @@
+# Generated by Django 3.2.3 on 2026-10-19 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(choices=[('user', 'Пользователь'), ('recipe', 'Рецепт')], max_length=32, verbose_name='Сущность')),
+                ('entity_id', models.BigIntegerField(verbose_name='Идентификатор сущности')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('done', 'Выполнено'), ('failed', 'Ошибка')], db_index=True, default='pending', max_length=16, verbose_name='Статус')),
+                ('stage', models.PositiveSmallIntegerField(default=0, verbose_name='Этап')),
+                ('deleted', models.PositiveIntegerField(default=0, verbose_name='Удалено строк')),
+                ('total', models.PositiveIntegerField(null=True, verbose_name='Всего строк')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('finished_at', models.DateTimeField(null=True, verbose_name='Завершено')),
+            ],
+            options={
+                'verbose_name': 'Задание на удаление',
+                'verbose_name_plural': 'Задания на удаление',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='deletionjob',
+            constraint=models.UniqueConstraint(fields=('entity', 'entity_id'), name='unique_deletion_job'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+from django.db import models, transaction
+
+from .jobs import schedule_deletion
+
+
+class DeletionAdminMixin:
+    """
+    Удаление из админки через задания: объект скрывается сразу, а его
+    зависимые строки удаляет process_deletions. Страница подтверждения
+    не собирает связанные объекты — у активного автора их тысячи, —
+    но права на удаление проверяет, как Django, для всех моделей
+    каскада.
+    """
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(pending_deletion=False)
+
+    def get_cascade_models(self):
+        """Модель и все модели, строки которых удалит каскад."""
+        found, stack = set(), [self.model]
+        while stack:
+            model = stack.pop()
+            if model in found:
+                continue
+            found.add(model)
+            stack.extend(
+                relation.related_model
+                for relation in model._meta.related_objects
+                if relation.on_delete is models.CASCADE
+            )
+        return found
+
+    def get_deleted_objects(self, objs, request):
+        deleted = [str(obj) for obj in objs]
+        perms_needed = set()
+        for model in self.get_cascade_models():
+            model_admin = self.admin_site._registry.get(model)
+            if model_admin and not model_admin.has_delete_permission(
+                request
+            ):
+                perms_needed.add(model._meta.verbose_name)
+        return deleted, {
+            self.model._meta.verbose_name_plural: len(deleted)
+        }, perms_needed, []
+
+    def delete_model(self, request, obj):
+        schedule_deletion(obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            for obj in queryset:
+                schedule_deletion(obj)
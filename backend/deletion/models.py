@@ -0,0 +1,67 @@
+from django.db import models
+
+from .constants import ENTITIES, ENTITY_LIMIT, PENDING, STATUS_LIMIT, STATUSES
+
+
+class DeletionJob(models.Model):
+    """
+    Удаление скрытого пользователя или рецепта. stage — номер этапа
+    из deletion.jobs.get_stages(), deleted и total — удалено строк
+    и сколько их было при первом запуске.
+    """
+    entity = models.CharField(
+        max_length=ENTITY_LIMIT,
+        choices=ENTITIES,
+        verbose_name='Сущность',
+    )
+    entity_id = models.BigIntegerField(
+        verbose_name='Идентификатор сущности',
+    )
+    status = models.CharField(
+        max_length=STATUS_LIMIT,
+        choices=STATUSES,
+        default=PENDING,
+        db_index=True,
+        verbose_name='Статус',
+    )
+    stage = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Этап',
+    )
+    deleted = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Удалено строк',
+    )
+    total = models.PositiveIntegerField(
+        null=True,
+        verbose_name='Всего строк',
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name='Ошибка',
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Создано',
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Обновлено',
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        verbose_name='Завершено',
+    )
+
+    class Meta:
+        verbose_name = 'Задание на удаление'
+        verbose_name_plural = 'Задания на удаление'
+        ordering = ('id',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=('entity', 'entity_id'), name='unique_deletion_job'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.entity}:{self.entity_id} {self.status}'
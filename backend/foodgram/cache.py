@@ -0,0 +1,211 @@
+"""
+Двухуровневый кэш: LRU в памяти воркера поверх общего для всех
+воркеров бэкенда из settings.CACHES.
+
+Каждая запись помечается тегами (например, ``recipe:42``) и хранит
+версии этих тегов на момент записи. Инвалидация тега увеличивает его
+версию в общем кэше, после чего записи со старой версией считаются
+устаревшими во всех воркерах. Версии тегов запоминаются в процессе не
+дольше TWO_TIER_CACHE['VERSION_TTL'] секунд.
+
+Общий уровень включается TWO_TIER_CACHE['SHARED'] и требует Redis или
+memcached. Без него записи и версии тегов хранятся в памяти процесса:
+так можно работать с одним процессом при разработке.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+
+KEY_PREFIX = 'tt:'
+TAG_PREFIX = 'tt-tag:'
+LOCK_PREFIX = 'tt-lock:'
+LOCK_POLL_INTERVAL = 0.05
+PROCESS_MAX_ENTRIES = 100000
+
+# Не общие для воркеров или без атомарных add и incr.
+NON_ATOMIC_BACKENDS = (DummyCache, FileBasedCache, LocMemCache)
+
+
+def new_version():
+    # Версия от текущего времени не совпадёт с потерянной при вытеснении.
+    return time.time_ns()
+
+
+class TwoTierCache:
+    """Кэш с локальным LRU-уровнем и тегированной инвалидацией."""
+
+    def __init__(self, options):
+        self.shared_enabled = options['SHARED']
+        self.alias = options['SHARED_CACHE_ALIAS']
+        self.local_max_size = options['LOCAL_MAX_SIZE']
+        self.local_ttl = options['LOCAL_TTL']
+        self.version_ttl = options['VERSION_TTL']
+        self._local = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._process = LocMemCache('two-tier-cache', {
+            'TIMEOUT': None,
+            'OPTIONS': {'MAX_ENTRIES': PROCESS_MAX_ENTRIES},
+        })
+
+    @property
+    def shared(self):
+        if not self.shared_enabled:
+            return self._process
+        return caches[self.alias]
+
+    def check_shared(self):
+        """Проверка при запуске, что общий уровень на подходящем кэше."""
+        if self.shared_enabled and isinstance(
+            caches[self.alias], NON_ATOMIC_BACKENDS
+        ):
+            raise ImproperlyConfigured(
+                'TWO_TIER_CACHE_SHARED требует общего кэша с атомарными '
+                'add и incr (Redis, memcached). Кэш в файлах медленно '
+                'вытесняет записи и теряет инвалидации.'
+            )
+
+    def tag_versions(self, tags):
+        """Текущие версии тегов с коротким кэшированием в процессе."""
+        now = time.monotonic()
+        versions, missing = {}, []
+        with self._lock:
+            for tag in tags:
+                memo = self._versions.get(tag)
+                if memo is not None and memo[0] > now:
+                    versions[tag] = memo[1]
+                else:
+                    missing.append(tag)
+        if missing:
+            stored = self.shared.get_many(
+                [TAG_PREFIX + tag for tag in missing]
+            )
+            for tag in missing:
+                version = stored.get(TAG_PREFIX + tag)
+                if version is None:
+                    version = new_version()
+                    if not self.shared.add(TAG_PREFIX + tag, version, None):
+                        version = self.shared.get(TAG_PREFIX + tag, version)
+                versions[tag] = version
+            with self._lock:
+                for tag in missing:
+                    self._versions[tag] = (
+                        now + self.version_ttl, versions[tag]
+                    )
+        return versions
+
+    def _is_fresh(self, tag_versions):
+        if not tag_versions:
+            return True
+        return self.tag_versions(tag_versions) == tag_versions
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return entry[1]
+
+    def _set_local(self, key, entry, timeout):
+        ttl = self.local_ttl if timeout is None else min(
+            timeout, self.local_ttl
+        )
+        with self._lock:
+            self._local[key] = (time.monotonic() + ttl, entry)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_max_size:
+                self._local.popitem(last=False)
+
+    def get(self, key, default=None):
+        entry = self._get_local(key)
+        if entry is None:
+            entry = self.shared.get(KEY_PREFIX + key)
+            if entry is None:
+                return default
+            self._set_local(key, entry, None)
+        tag_versions, value = entry
+        if not self._is_fresh(tag_versions):
+            self.delete(key)
+            return default
+        return value
+
+    def set(self, key, value, tags=(), timeout=None, tag_versions=None):
+        """
+        Сохраняет значение с версиями тегов. Версии, полученные до
+        вычисления значения, можно передать в tag_versions: тогда
+        инвалидация во время вычисления не даст сохранить устаревшие
+        данные как свежие.
+        """
+        if tag_versions is None:
+            tag_versions = self.tag_versions(tags)
+        entry = (tag_versions, value)
+        self.shared.set(KEY_PREFIX + key, entry, timeout)
+        self._set_local(key, entry, timeout)
+
+    def delete(self, key):
+        with self._lock:
+            self._local.pop(key, None)
+        self.shared.delete(KEY_PREFIX + key)
+
+    def get_or_set(self, key, compute, tags=(), timeout=None):
+        value = self.get(key)
+        if value is None:
+            tag_versions = self.tag_versions(tags)
+            value = compute()
+            self.set(key, value, timeout=timeout, tag_versions=tag_versions)
+        return value
+
+    def acquire(self, key, timeout):
+        """
+        Захватывает право пересчитать значение ключа (single-flight).
+        Остальные воркеры в это время ждут результат в wait().
+        """
+        return self.shared.add(LOCK_PREFIX + key, True, timeout)
+
+    def release(self, key):
+        self.shared.delete(LOCK_PREFIX + key)
+
+    def wait(self, key, timeout):
+        """Ждёт значение, которое пересчитывает другой воркер."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            value = self.get(key)
+            if value is not None:
+                return value
+            if not self.shared.has_key(LOCK_PREFIX + key):
+                return self.get(key)
+        return None
+
+    def clear_local(self):
+        """Очищает уровень в памяти процесса."""
+        with self._lock:
+            self._local.clear()
+            self._versions.clear()
+        if not self.shared_enabled:
+            self._process.clear()
+
+    def invalidate_tags(self, *tags):
+        """Делает устаревшими все записи с любым из тегов."""
+        for tag in tags:
+            try:
+                self.shared.incr(TAG_PREFIX + tag)
+            except ValueError:
+                self.shared.set(TAG_PREFIX + tag, new_version(), None)
+        with self._lock:
+            for tag in tags:
+                self._versions.pop(tag, None)
+
+
+two_tier_cache = TwoTierCache(settings.TWO_TIER_CACHE)
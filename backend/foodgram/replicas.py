@@ -0,0 +1,177 @@
+"""
+Маршрутизация чтения на реплики БД.
+
+Безопасные запросы (GET, HEAD, OPTIONS) читают с одной из реплик из
+settings.DATABASE_REPLICAS, выбранной на весь запрос. После записи
+клиент на REPLICA_STICKY_SECONDS остаётся на основной БД, чтобы сразу
+видеть свои изменения: метка хранится в общем для воркеров кэше.
+Доступность реплик проверяет фоновый поток каждого процесса, а не
+запрос. Реплика, упавшая в проверке или посреди запроса, исключается
+из ротации на REPLICA_EVICTION_SECONDS, а запрос повторяется на
+основной БД.
+"""
+import contextvars
+import hashlib
+import os
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import DatabaseError
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+STICKY_CACHE_PREFIX = 'replica-sticky:'
+
+_read_alias = contextvars.ContextVar('replica_read_alias', default=None)
+
+
+class ReplicaHealth:
+    """Отслеживает доступность реплик и временно исключает упавшие."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._evicted_until = {}
+        self._pid = None
+
+    def evict(self, alias):
+        with self._lock:
+            self._evicted_until[alias] = (
+                time.monotonic() + settings.REPLICA_EVICTION_SECONDS
+            )
+
+    def is_available(self, alias):
+        with self._lock:
+            return self._evicted_until.get(alias, 0) <= time.monotonic()
+
+    def available_replicas(self):
+        return [
+            alias for alias in settings.DATABASE_REPLICAS
+            if self.is_available(alias)
+        ]
+
+    def check(self, alias):
+        """Проверочный запрос в собственном соединении потока."""
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except DatabaseError:
+            return False
+        finally:
+            connection.close()
+        return True
+
+    def run(self):
+        while True:
+            for alias in settings.DATABASE_REPLICAS:
+                if not self.check(alias):
+                    self.evict(alias)
+            time.sleep(settings.REPLICA_HEALTH_CHECK_INTERVAL)
+
+    def start(self):
+        """
+        Запускает проверки в текущем процессе. Потоки не переживают
+        fork, поэтому воркер gunicorn с preload_app запускает свой.
+        """
+        pid = os.getpid()
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+        threading.Thread(
+            target=self.run, name='replica-health', daemon=True
+        ).start()
+
+
+health = ReplicaHealth()
+
+
+def get_client_key(request):
+    """Ключ клиента для привязки к основной БД после записи."""
+    credentials = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+    if not credentials:
+        return None
+    digest = hashlib.sha1(credentials.encode()).hexdigest()
+    return STICKY_CACHE_PREFIX + digest
+
+
+class ReplicaRouter:
+    """Направляет чтение на реплику, выбранную для текущего запроса."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    """Выбирает реплику для чтения и отмечает клиентов после записи."""
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        if isinstance(
+            caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache)
+        ):
+            raise ImproperlyConfigured(
+                'Метки записи для реплик должны храниться в общем для '
+                'воркеров кэше: укажите CACHE_BACKEND.'
+            )
+        self.get_response = get_response
+
+    def __call__(self, request):
+        client_key = get_client_key(request)
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            if client_key and response.status_code < 400:
+                cache.set(
+                    client_key, True, settings.REPLICA_STICKY_SECONDS
+                )
+            return response
+
+        health.start()
+        alias = None
+        if client_key is None or not cache.get(client_key):
+            replicas = health.available_replicas()
+            if replicas:
+                alias = random.choice(replicas)
+        response = self.read(request, alias)
+        if getattr(request, '_replica_failed', False):
+            # Реплика упала посреди запроса: безопасный запрос можно
+            # повторить на основной БД.
+            request._replica_failed = False
+            response = self.read(request, None)
+        return response
+
+    def read(self, request, alias):
+        token = _read_alias.set(alias)
+        try:
+            return self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+
+    def process_exception(self, request, exception):
+        """
+        Исключения представления Django превращает в ответ 500 раньше,
+        чем они дойдут до __call__, поэтому ошибка реплики ловится здесь.
+        """
+        alias = _read_alias.get()
+        if alias is not None and isinstance(exception, DatabaseError):
+            health.evict(alias)
+            request._replica_failed = True
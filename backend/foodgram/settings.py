@@ -23,6 +23,8 @@ INSTALLED_APPS = [
     'recipes.apps.RecipesConfig',
     'user.apps.UserConfig',
     'api.apps.ApiConfig',
+    'outbox.apps.OutboxConfig',
+    'deletion.apps.DeletionConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -37,7 +39,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.throttling.InFlightMiddleware',
+    'api.allocations.AllocationMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'foodgram.replicas.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -88,6 +94,66 @@ TEST_DATABASE = {
 
 DATABASES = TEST_DATABASE if os.getenv('TEST_DATABASE', default=False) == 'True' else PROD_DATABASE
 
+# Реплики для чтения: хосты Postgres или пути к файлам SQLite через запятую.
+DB_REPLICAS = [
+    replica for replica in os.getenv('DB_REPLICAS', '').split(',') if replica
+]
+REPLICA_KEY = 'NAME' if DATABASES is TEST_DATABASE else 'HOST'
+
+for number, replica in enumerate(DB_REPLICAS, start=1):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        REPLICA_KEY: BASE_DIR / replica if REPLICA_KEY == 'NAME' else replica,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [
+    f'replica_{number}' for number in range(1, len(DB_REPLICAS) + 1)
+]
+
+DATABASE_ROUTERS = ['foodgram.replicas.ReplicaRouter']
+
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+
+REPLICA_HEALTH_CHECK_INTERVAL = int(
+    os.getenv('REPLICA_HEALTH_CHECK_INTERVAL', 10)
+)
+
+REPLICA_EVICTION_SECONDS = int(os.getenv('REPLICA_EVICTION_SECONDS', 30))
+
+# Общий для всех воркеров gunicorn кэш. Файловый бэкенд — только для
+# разработки; в продакшене memcached (PyMemcacheCache) или Redis.
+CACHE_BACKEND = os.getenv(
+    'CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'
+)
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', '/tmp/foodgram_cache'),
+        'TIMEOUT': int(os.getenv('CACHE_TIMEOUT', 300)),
+        # У memcached OPTIONS передаются клиенту, а не кэшу Django.
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 100000)),
+        } if CACHE_BACKEND.endswith('FileBasedCache') else {},
+    },
+}
+
+# Без общего уровня two_tier_cache хранит всё в памяти процесса. Общий
+# уровень включается только с кэшем на Redis или memcached.
+TWO_TIER_CACHE = {
+    'SHARED': os.getenv('TWO_TIER_CACHE_SHARED', 'False') == 'True',
+    'SHARED_CACHE_ALIAS': 'default',
+    'LOCAL_MAX_SIZE': int(os.getenv('LOCAL_CACHE_MAX_SIZE', 2048)),
+    'LOCAL_TTL': int(os.getenv('LOCAL_CACHE_TTL', 60)),
+    # Как долго воркер доверяет запомненным версиям тегов.
+    'VERSION_TTL': float(os.getenv('CACHE_VERSION_TTL', 1)),
+}
+
+# Кэш ответов API для анонимных пользователей.
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 300))
+RESPONSE_CACHE_MAX_AGE = int(os.getenv('RESPONSE_CACHE_MAX_AGE', 30))
+RESPONSE_CACHE_LOCK_TIMEOUT = int(os.getenv('RESPONSE_CACHE_LOCK_TIMEOUT', 5))
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -124,6 +190,25 @@ STATICFILES_DIRS = ((BASE_DIR / 'static/'),)
 MEDIA_ROOT = BASE_DIR / 'media'
 MEDIA_URL = '/media/'
 
+# Сгенерированные файлы пользователей, например PDF списка покупок.
+EXPORTS_ROOT = Path(os.getenv('EXPORTS_ROOT', BASE_DIR / 'exports'))
+
+# Отдача файлов nginx через X-Accel-Redirect: каталог -> internal-локация.
+X_ACCEL = {
+    'ENABLED': os.getenv('X_ACCEL_ENABLED', 'False') == 'True',
+    'LOCATIONS': {
+        MEDIA_ROOT: '/internal/media/',
+        EXPORTS_ROOT: '/internal/exports/',
+    },
+}
+
+MEDIA_GC = {
+    # Картинка рецепта пишется на диск до фиксации транзакции:
+    # файлы моложе срока не удаляются, даже если ссылки на них нет.
+    'GRACE_HOURS': float(os.getenv('MEDIA_GC_GRACE_HOURS', 24)),
+    'CHUNK_SIZE': int(os.getenv('MEDIA_GC_CHUNK_SIZE', 2000)),
+}
+
 NUM_POSTS_ON_HOME_PAGE = 10
 
 REST_FRAMEWORK = {
@@ -131,10 +216,142 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.CostThrottle',
+    ],
+    # Прокси перед бэкендом: IP анонимов берётся из X-Forwarded-For.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 1)),
+}
+
+# Корзины жетонов: RATE — пополнение в жетонах в секунду, BURST — ёмкость.
+# Включается только с общим кэшем на Redis или memcached.
+THROTTLING = {
+    'ENABLED': os.getenv('THROTTLING_ENABLED', 'False') == 'True',
+    'CACHE_ALIAS': os.getenv('THROTTLING_CACHE_ALIAS', 'default'),
+    'USER': {
+        'RATE': float(os.getenv('THROTTLE_USER_RATE', 10)),
+        'BURST': int(os.getenv('THROTTLE_USER_BURST', 120)),
+    },
+    'ANON': {
+        'RATE': float(os.getenv('THROTTLE_ANON_RATE', 5)),
+        'BURST': int(os.getenv('THROTTLE_ANON_BURST', 60)),
+    },
+    'ENDPOINT': {
+        'RATE': float(os.getenv('THROTTLE_ENDPOINT_RATE', 5)),
+        'BURST': int(os.getenv('THROTTLE_ENDPOINT_BURST', 60)),
+    },
+    # Цена запроса в жетонах по '<МЕТОД> <url_name>', остальные стоят 1.
+    'COSTS': {
+        'GET recipes-download-shopping-cart': 20,
+        'GET users-me-export': 20,
+        'POST recipes-list': 10,
+        'PUT recipes-detail': 10,
+        'PATCH recipes-detail': 10,
+        'POST recipes-favorite-batch': 5,
+        'POST recipes-shopping_cart-batch': 5,
+        'POST batch': 5,
+        'POST users-list': 5,
+        'POST users-set-password': 5,
+        'POST login': 5,
+    },
+    'ADMISSION': {
+        'ENABLED': os.getenv('ADMISSION_CONTROL_ENABLED', 'False') == 'True',
+        # Сколько запросов воркеры обрабатывают одновременно.
+        'CAPACITY': int(os.getenv(
+            'ADMISSION_CAPACITY', os.getenv('WEB_CONCURRENCY', 1)
+        )),
+        # Доля занятых воркеров, после которой отклоняются запросы
+        # ценой от EXPENSIVE_COST.
+        'SHED_AT': float(os.getenv('ADMISSION_SHED_AT', 0.75)),
+        'EXPENSIVE_COST': int(os.getenv('ADMISSION_EXPENSIVE_COST', 10)),
+        'RETRY_AFTER': int(os.getenv('ADMISSION_RETRY_AFTER', 1)),
+        'COUNTER_TTL': int(os.getenv('ADMISSION_COUNTER_TTL', 300)),
+    },
+}
+
+# Чтение рецептов из values() и рендеринг через orjson.
+# Совпадение с обычными сериализаторами: check_serializer_parity.
+FAST_SERIALIZATION = os.getenv('FAST_SERIALIZATION', 'True') == 'True'
+
+# Токены кэшируются в two_tier_cache, инвалидация — по тегам.
+TOKEN_AUTH_CACHE = {
+    'TTL': int(os.getenv('TOKEN_AUTH_CACHE_TTL', 300)),
+}
+
+METRICS = {
+    'ENABLED': os.getenv('METRICS_ENABLED', 'True') == 'True',
+    # Каталог для снимков счётчиков воркеров gunicorn.
+    'DIR': os.getenv('METRICS_DIR', '/tmp/foodgram_metrics'),
+    'FLUSH_INTERVAL': float(os.getenv('METRICS_FLUSH_INTERVAL', 5)),
+    # Без токена /api/metrics закрыт, с ним — требует заголовок
+    # Authorization: Bearer <токен>.
+    'TOKEN': os.getenv('METRICS_TOKEN'),
+}
+
+SLOW_QUERIES = {
+    'ENABLED': os.getenv('SLOW_QUERIES_ENABLED', 'False') == 'True',
+    'THRESHOLD_MS': float(os.getenv('SLOW_QUERIES_THRESHOLD_MS', 100)),
+    # Доля медленных запросов, попадающих в журнал.
+    'SAMPLE_RATE': float(os.getenv('SLOW_QUERIES_SAMPLE_RATE', 1)),
+    'EXPLAIN': os.getenv('SLOW_QUERIES_EXPLAIN', 'True') == 'True',
+    # ANALYZE выполняет медленный запрос второй раз, вне транзакций.
+    'EXPLAIN_ANALYZE': os.getenv(
+        'SLOW_QUERIES_EXPLAIN_ANALYZE', 'False'
+    ) == 'True',
+    'LOG_FILE': os.getenv(
+        'SLOW_QUERIES_LOG_FILE', BASE_DIR / 'logs' / 'slow_queries.jsonl'
+    ),
+    'MAX_BYTES': int(os.getenv('SLOW_QUERIES_MAX_BYTES', 10 * 1024 * 1024)),
+    'BACKUP_COUNT': int(os.getenv('SLOW_QUERIES_BACKUP_COUNT', 5)),
+}
+
+# Выборочный профиль памяти tracemalloc по действиям DRF.
+ALLOCATION_PROFILING = {
+    'ENABLED': os.getenv('ALLOCATION_PROFILING_ENABLED', 'False') == 'True',
+    # Доля профилируемых запросов: трассировка замедляет запрос в разы.
+    'SAMPLE_RATE': float(os.getenv('ALLOCATION_SAMPLE_RATE', 0.01)),
+    'FRAMES': int(os.getenv('ALLOCATION_FRAMES', 25)),
+    'DIR': os.getenv('ALLOCATION_DIR', '/tmp/foodgram_allocations'),
+    'FLUSH_INTERVAL': float(os.getenv('ALLOCATION_FLUSH_INTERVAL', 5)),
+    # Мест выделения в снимке на действие и в ответе эндпоинта.
+    'SITES_LIMIT': 50,
+    'TOP': int(os.getenv('ALLOCATION_TOP', 10)),
+}
+
+OUTBOX = {
+    # Потребители журнала изменений: имя=строка импорта обработчика
+    # через запятую, например log=outbox.handlers.log_events.
+    'CONSUMERS': dict(
+        consumer.split('=', 1)
+        for consumer in os.getenv('OUTBOX_CONSUMERS', '').split(',')
+        if consumer
+    ),
+    'BATCH_SIZE': int(os.getenv('OUTBOX_BATCH_SIZE', 500)),
+    # Сколько секунд ждать события с пропущенным id, прежде чем
+    # считать его транзакцию откаченной.
+    'GAP_TIMEOUT': float(os.getenv('OUTBOX_GAP_TIMEOUT', 60)),
+    'POLL_INTERVAL': float(os.getenv('OUTBOX_POLL_INTERVAL', 1)),
+    'RETENTION_DAYS': int(os.getenv('OUTBOX_RETENTION_DAYS', 7)),
+}
+
+DELETION = {
+    'BATCH_SIZE': int(os.getenv('DELETION_BATCH_SIZE', 500)),
+    # Пауза между пачками, чтобы удаление не вытесняло запросы API.
+    'BATCH_PAUSE': float(os.getenv('DELETION_BATCH_PAUSE', 0.05)),
+    'POLL_INTERVAL': float(os.getenv('DELETION_POLL_INTERVAL', 5)),
 }
 
+USER_IMPORT = {
+    'BATCH_SIZE': int(os.getenv('USER_IMPORT_BATCH_SIZE', 1000)),
+    # 0 — по числу процессоров.
+    'WORKERS': int(os.getenv('USER_IMPORT_WORKERS', 0)),
+}
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -158,3 +375,9 @@ MAX_LEN_TITLE = 30
 EMPTY_VALUE_ADMIN_PANEL = '--пусто--'
 
 PAGINATION_SIZE = 6
+
+# Максимум id в одном пакетном запросе к избранному и списку покупок.
+RECIPE_BATCH_MAX_SIZE = int(os.getenv('RECIPE_BATCH_MAX_SIZE', 200))
+
+# Максимум вложенных запросов в POST /api/batch/.
+BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', 10))
@@ -0,0 +1,118 @@
+"""
+Прогрев приложения до приёма запросов.
+
+С preload_app прогрев выполняется в мастере gunicorn, и воркеры
+получают всё загруженное при fork, разделяя память copy-on-write.
+Без preload_app каждый воркер прогревается сам до начала работы.
+"""
+import os
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import get_resolver
+from rest_framework.serializers import BaseSerializer
+from recipes.registry import ingredient_registry
+
+from api import serializers
+from api.pdf_generator import FONT_NAME, register_fonts
+from api.views import TagViewSet
+
+MEMORY_FIELDS = ('Rss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean',
+                 'Private_Dirty')
+
+
+def warm_urls():
+    """Заполняет словари reverse() корневого резолвера и пространств имён."""
+    resolver = get_resolver()
+    return len(resolver.reverse_dict) + sum(
+        len(namespace.reverse_dict)
+        for _, namespace in resolver.namespace_dict.values()
+    )
+
+
+def warm_serializers():
+    """
+    Импортирует сериализаторы и строит их поля: импорты и кэши _meta
+    моделей оказываются в памяти до fork.
+    """
+    return sum(
+        len(value().fields) for value in vars(serializers).values()
+        if isinstance(value, type) and issubclass(value, BaseSerializer)
+        and value.__module__ == serializers.__name__
+    )
+
+
+def warm_ingredients():
+    return len(ingredient_registry.get())
+
+
+def warm_tags():
+    """Кладёт список тегов в двухуровневый кэш ответов."""
+    host = next(
+        (host for host in settings.ALLOWED_HOSTS if host != '*'),
+        'localhost'
+    ).lstrip('.')
+    request = RequestFactory().get('/api/tags/', HTTP_HOST=host)
+    view = TagViewSet.as_view({'get': 'list'}, throttle_classes=())
+    return len(view(request).data)
+
+
+def warm_fonts():
+    register_fonts()
+    return FONT_NAME
+
+
+STAGES = (
+    ('urls', warm_urls),
+    ('serializers', warm_serializers),
+    ('ingredients', warm_ingredients),
+    ('tags', warm_tags),
+    ('fonts', warm_fonts),
+)
+
+
+def warmup(log):
+    """
+    Выполняет этапы прогрева и закрывает подключения к БД, чтобы
+    воркеры не унаследовали их сокеты. Ошибка этапа не мешает запуску.
+    """
+    for name, stage in STAGES:
+        started = time.perf_counter()
+        try:
+            result = stage()
+        except Exception:
+            log.exception('Прогрев %s не удался', name)
+            continue
+        log.info(
+            'Прогрев %s: %s за %.0f мс', name, result,
+            (time.perf_counter() - started) * 1000
+        )
+    connections.close_all()
+
+
+def memory_usage():
+    """Rss, общая и частная память процесса в КБ из /proc/self/smaps_rollup."""
+    usage = {}
+    try:
+        with open('/proc/self/smaps_rollup') as file:
+            for line in file:
+                name, _, value = line.partition(':')
+                if name in MEMORY_FIELDS:
+                    usage[name] = int(value.split()[0])
+    except OSError:
+        import resource
+
+        usage['Rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage
+
+
+def report_memory(log, role):
+    usage = memory_usage()
+    shared = usage.get('Shared_Clean', 0) + usage.get('Shared_Dirty', 0)
+    private = usage.get('Private_Clean', 0) + usage.get('Private_Dirty', 0)
+    log.info(
+        '%s %s: RSS %d КБ, общая %d КБ, частная %d КБ',
+        role, os.getpid(), usage.get('Rss', 0), shared, private
+    )
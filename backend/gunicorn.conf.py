@@ -0,0 +1,116 @@
+"""
+Настройки gunicorn для продакшена.
+
+Число воркеров считается по доступным процессору и памяти с учётом
+ограничений cgroup контейнера. Если памяти на 2 * CPU + 1 процессов
+не хватает, воркеров меньше, а недостающий параллелизм добирается
+потоками gthread. Всё можно переопределить переменными окружения.
+"""
+import math
+import os
+
+KB = 1024
+MB = 1024 * KB
+
+
+def read_first_line(path):
+    try:
+        with open(path) as file:
+            return file.readline().strip()
+    except OSError:
+        return None
+
+
+def cpu_count():
+    """CPU процесса с учётом квоты cgroup v2 или v1."""
+    count = len(os.sched_getaffinity(0))
+    quota = read_first_line('/sys/fs/cgroup/cpu.max')
+    if quota:
+        limit, _, period = quota.partition(' ')
+    else:
+        limit = read_first_line('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+        period = read_first_line('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+    if limit and limit not in ('max', '-1') and period:
+        count = min(count, math.ceil(int(limit) / int(period)))
+    return max(count, 1)
+
+
+def memory_limit():
+    """Память контейнера в байтах: лимит cgroup или вся память машины."""
+    total = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    for path in ('/sys/fs/cgroup/memory.max',
+                 '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        limit = read_first_line(path)
+        if limit and limit.isdigit():
+            return min(int(limit), total)
+    return total
+
+
+def worker_layout():
+    """Число воркеров и потоков в каждом."""
+    cpu_workers = 2 * cpu_count() + 1
+    worker_memory = int(os.getenv('GUNICORN_WORKER_MEMORY_MB', 150)) * MB
+    # Часть памяти остаётся мастеру, кэшу страниц и пикам запросов.
+    budget = memory_limit() * float(os.getenv('GUNICORN_MEMORY_SHARE', 0.7))
+    memory_workers = max(int(budget // worker_memory), 1)
+    count = int(os.getenv(
+        'WEB_CONCURRENCY', min(cpu_workers, memory_workers)
+    ))
+    threads = int(os.getenv(
+        'GUNICORN_THREADS', math.ceil(cpu_workers / count)
+    ))
+    return count, max(threads, 1)
+
+
+workers, threads = worker_layout()
+worker_class = os.getenv(
+    'GUNICORN_WORKER_CLASS', 'gthread' if threads > 1 else 'sync'
+)
+# Ёмкость для контроля допуска в api.throttling.
+os.environ.setdefault('ADMISSION_CAPACITY', str(workers * threads))
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8080')
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+# Перезапуск воркера после max_requests запросов ограничивает рост
+# памяти, разброс не даёт всем воркерам перезапуститься разом.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+# Файлы пульса воркеров в памяти, а не на overlayfs контейнера.
+worker_tmp_dir = os.getenv('GUNICORN_WORKER_TMP_DIR', '/dev/shm')
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+
+
+def when_ready(server):
+    server.log.info(
+        'Воркеров: %s, потоков: %s, класс: %s',
+        workers, threads, worker_class
+    )
+    if preload_app:
+        from foodgram.warmup import report_memory, warmup
+
+        warmup(server.log)
+        report_memory(server.log, 'Мастер')
+
+
+def post_fork(server, worker):
+    """
+    Подключения к БД, открытые в мастере, не закрываются в воркере:
+    сокет общий, и закрытие оборвало бы его и у других процессов.
+    Воркер просто забывает их и открывает свои.
+    """
+    if preload_app:
+        from django.db import connections
+
+        for connection in connections.all():
+            connection.connection = None
+
+
+def post_worker_init(worker):
+    from foodgram.warmup import report_memory, warmup
+
+    if not preload_app:
+        warmup(worker.log)
+    report_memory(worker.log, 'Воркер')
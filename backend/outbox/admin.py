@@ -0,0 +1,21 @@
+from django.contrib import admin
+
+from .models import ConsumerCheckpoint, OutboxEvent
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'entity', 'entity_id', 'action', 'created_at')
+    list_filter = ('entity', 'action')
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ConsumerCheckpoint)
+class ConsumerCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('name', 'position', 'updated_at')
@@ -0,0 +1,22 @@
+# Сущности, изменения которых попадают в журнал.
+RECIPE = 'recipe'
+FAVORITE = 'favorite'
+SHOPPING_CART = 'shopping_cart'
+FOLLOW = 'follow'
+USER = 'user'
+INGREDIENT = 'ingredient'
+TAG = 'tag'
+
+CREATED = 'created'
+UPDATED = 'updated'
+DELETED = 'deleted'
+
+ACTIONS = (
+    (CREATED, 'Создано'),
+    (UPDATED, 'Изменено'),
+    (DELETED, 'Удалено'),
+)
+
+ENTITY_LIMIT = 32
+ACTION_LIMIT = 16
+CONSUMER_NAME_LIMIT = 64
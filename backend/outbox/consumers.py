@@ -0,0 +1,104 @@
+"""
+Доставка событий журнала потребителям.
+
+Потребитель — имя и обработчик, функция от списка событий OutboxEvent.
+Обработчики перечислены в settings.OUTBOX['CONSUMERS'] строками
+импорта. Каждый опрос берёт пачку событий после позиции потребителя
+в порядке id, передаёт её обработчику и сдвигает позицию в той же
+транзакции: при ошибке обработчика позиция не меняется и пачка придёт
+снова, так что обработчики должны быть идемпотентными. Строка позиции
+блокируется на время опроса, поэтому один потребитель может работать
+в нескольких процессах.
+
+Id событий выдаются при INSERT, а видны после COMMIT, и транзакция
+с меньшим id может зафиксироваться позже. Поэтому на пропуске в id
+опрос останавливается, пока событию за пропуском меньше GAP_TIMEOUT
+секунд, а более старый пропуск считается откатом.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import ConsumerCheckpoint, OutboxEvent
+
+
+class Consumer:
+
+    def __init__(self, name, handler, batch_size=None, gap_timeout=None):
+        self.name = name
+        self.handler = handler
+        self.batch_size = batch_size or settings.OUTBOX['BATCH_SIZE']
+        self.gap_timeout = timedelta(seconds=(
+            settings.OUTBOX['GAP_TIMEOUT'] if gap_timeout is None
+            else gap_timeout
+        ))
+
+    def visible(self, events, position):
+        """События до первого пропуска в id, который ещё может закрыться."""
+        settled = timezone.now() - self.gap_timeout
+        expected = position + 1
+        for index, event in enumerate(events):
+            if event.pk != expected and event.created_at > settled:
+                return events[:index]
+            expected = event.pk + 1
+        return events
+
+    def poll(self):
+        """Обрабатывает одну пачку, возвращает число событий в ней."""
+        with transaction.atomic():
+            ConsumerCheckpoint.objects.get_or_create(name=self.name)
+            checkpoint = ConsumerCheckpoint.objects.select_for_update().get(
+                name=self.name
+            )
+            events = self.visible(list(OutboxEvent.objects.filter(
+                pk__gt=checkpoint.position
+            ).order_by('pk')[:self.batch_size]), checkpoint.position)
+            if not events:
+                return 0
+            self.handler(events)
+            checkpoint.position = events[-1].pk
+            checkpoint.save(update_fields=('position', 'updated_at'))
+        return len(events)
+
+    def drain(self):
+        """Опрашивает, пока есть видимые события."""
+        total = 0
+        while True:
+            processed = self.poll()
+            total += processed
+            if processed < self.batch_size:
+                return total
+
+
+def get_consumers(names=None, **options):
+    """Потребители из настроек, при names — только перечисленные."""
+    configured = settings.OUTBOX['CONSUMERS']
+    unknown = set(names or ()) - set(configured)
+    if unknown:
+        raise KeyError(', '.join(sorted(unknown)))
+    return [
+        Consumer(name, import_string(path), **options)
+        for name, path in configured.items()
+        if not names or name in names
+    ]
+
+
+def prune_events(retention):
+    """
+    Удаляет события старше retention, которые обработаны всеми
+    настроенными потребителями. Возвращает число удалённых.
+    """
+    names = list(settings.OUTBOX['CONSUMERS'])
+    positions = dict(ConsumerCheckpoint.objects.filter(
+        name__in=names
+    ).values_list('name', 'position'))
+    if not names or len(positions) < len(names):
+        return 0
+    deleted, _ = OutboxEvent.objects.filter(
+        pk__lte=min(positions.values()),
+        created_at__lt=timezone.now() - retention,
+    ).delete()
+    return deleted
@@ -0,0 +1,41 @@
+"""
+Запись изменений в журнал.
+
+Событие пишется в той же транзакции, что и изменение: оно появится,
+только если изменение зафиксировано, и пропадёт вместе с откатом.
+Поэтому вызывать record_change() можно только внутри atomic().
+"""
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.transaction import TransactionManagementError
+
+from .models import OutboxEvent
+
+
+def check_atomic(using):
+    if not transaction.get_connection(using).in_atomic_block:
+        raise TransactionManagementError(
+            'Событие журнала нужно записывать внутри transaction.atomic().'
+        )
+
+
+def make_event(entity, action, entity_id=None, **payload):
+    return OutboxEvent(
+        entity=entity, action=action, entity_id=entity_id, payload=payload
+    )
+
+
+def record_change(entity, action, entity_id=None, using=DEFAULT_DB_ALIAS,
+                  **payload):
+    """Записывает одно событие в текущей транзакции."""
+    check_atomic(using)
+    return OutboxEvent.objects.using(using).create(
+        entity=entity, action=action, entity_id=entity_id, payload=payload
+    )
+
+
+def record_changes(events, using=DEFAULT_DB_ALIAS):
+    """Записывает события из make_event() одним INSERT."""
+    if not events:
+        return
+    check_atomic(using)
+    OutboxEvent.objects.using(using).bulk_create(events)
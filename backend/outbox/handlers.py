@@ -0,0 +1,16 @@
+"""
+Готовые обработчики событий журнала. Подключаются в
+settings.OUTBOX['CONSUMERS'], например {'log': 'outbox.handlers.log_events'}.
+"""
+import logging
+
+logger = logging.getLogger('foodgram.outbox')
+
+
+def log_events(events):
+    """Пишет события в лог, пример обработчика и отладка."""
+    for event in events:
+        logger.info(
+            '%s %s:%s %s', event.pk, event.entity, event.entity_id,
+            event.action, extra={'payload': event.payload}
+        )
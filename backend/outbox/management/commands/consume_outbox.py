@@ -0,0 +1,61 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from outbox.consumers import get_consumers, prune_events
+
+
+class Command(BaseCommand):
+    help = (
+        'Доставляет события журнала изменений потребителям из '
+        'settings.OUTBOX["CONSUMERS"] и сдвигает их позиции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--consumer', action='append', dest='consumers',
+            help='Только этот потребитель, можно повторять.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Обработать накопившиеся события и выйти.'
+        )
+        parser.add_argument(
+            '--interval', type=float,
+            default=settings.OUTBOX['POLL_INTERVAL'],
+            help='Пауза между опросами в секундах.'
+        )
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument(
+            '--prune', action='store_true',
+            help='Удалить события, обработанные всеми потребителями '
+                 'и старше OUTBOX["RETENTION_DAYS"].'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            consumers = get_consumers(
+                options['consumers'], batch_size=options['batch_size']
+            )
+        except KeyError as error:
+            raise CommandError(f'Неизвестные потребители: {error.args[0]}')
+        if not consumers:
+            raise CommandError('В OUTBOX["CONSUMERS"] нет потребителей.')
+
+        while True:
+            for consumer in consumers:
+                processed = consumer.drain()
+                if processed:
+                    self.stdout.write(
+                        f'{consumer.name}: обработано событий {processed}'
+                    )
+            if options['prune']:
+                deleted = prune_events(
+                    timedelta(days=settings.OUTBOX['RETENTION_DAYS'])
+                )
+                if deleted:
+                    self.stdout.write(f'Удалено событий: {deleted}')
+            if options['once']:
+                return
+            time.sleep(options['interval'])
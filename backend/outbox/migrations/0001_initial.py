@@ -0,0 +1,43 @@
+# Generated by Django 3.2.3 on 2026-10-19 08:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumerCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True, verbose_name='Потребитель')),
+                ('position', models.BigIntegerField(default=0, verbose_name='Последнее событие')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Позиция потребителя',
+                'verbose_name_plural': 'Позиции потребителей',
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(max_length=32, verbose_name='Сущность')),
+                ('entity_id', models.BigIntegerField(null=True, verbose_name='Идентификатор сущности')),
+                ('action', models.CharField(choices=[('created', 'Создано'), ('updated', 'Изменено'), ('deleted', 'Удалено')], max_length=16, verbose_name='Действие')),
+                ('payload', models.JSONField(default=dict, verbose_name='Данные')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Записано')),
+            ],
+            options={
+                'verbose_name': 'Событие',
+                'verbose_name_plural': 'События',
+                'ordering': ('id',),
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import transaction
+
+from .constants import CREATED, DELETED, UPDATED
+from .events import make_event, record_change, record_changes
+
+
+class OutboxAdminMixin:
+    """
+    Записывает в журнал изменения, сделанные в админке. Сохранение
+    из списка (list_editable) и массовое удаление админка выполняет
+    без транзакции, поэтому каждое изменение оборачивается в неё здесь.
+    """
+    outbox_entity = None
+
+    def get_outbox_change(self, obj, action):
+        """Аргументы record_change() для изменённого объекта."""
+        return {
+            'entity': self.outbox_entity, 'action': action,
+            'entity_id': obj.pk,
+        }
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            record_change(**self.get_outbox_change(
+                obj, UPDATED if change else CREATED
+            ))
+
+    def delete_model(self, request, obj):
+        change = self.get_outbox_change(obj, DELETED)
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            record_change(**change)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            events = [
+                make_event(**self.get_outbox_change(obj, DELETED))
+                for obj in queryset
+            ]
+            super().delete_queryset(request, queryset)
+            record_changes(events)
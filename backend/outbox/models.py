@@ -0,0 +1,66 @@
+from django.db import models
+
+from .constants import (ACTION_LIMIT, ACTIONS, CONSUMER_NAME_LIMIT,
+                        ENTITY_LIMIT)
+
+
+class OutboxEvent(models.Model):
+    """
+    Изменение, записанное в той же транзакции, что и само изменение.
+    Для связей с рецептами и подписок entity_id — id рецепта или
+    автора, а пользователь лежит в payload.
+    """
+    entity = models.CharField(
+        max_length=ENTITY_LIMIT,
+        verbose_name='Сущность',
+    )
+    entity_id = models.BigIntegerField(
+        null=True,
+        verbose_name='Идентификатор сущности',
+    )
+    action = models.CharField(
+        max_length=ACTION_LIMIT,
+        choices=ACTIONS,
+        verbose_name='Действие',
+    )
+    payload = models.JSONField(
+        default=dict,
+        verbose_name='Данные',
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Записано',
+    )
+
+    class Meta:
+        verbose_name = 'Событие'
+        verbose_name_plural = 'События'
+        ordering = ('id',)
+
+    def __str__(self):
+        return f'{self.entity}:{self.entity_id} {self.action}'
+
+
+class ConsumerCheckpoint(models.Model):
+    """Id последнего события, обработанного потребителем."""
+    name = models.CharField(
+        max_length=CONSUMER_NAME_LIMIT,
+        unique=True,
+        verbose_name='Потребитель',
+    )
+    position = models.BigIntegerField(
+        default=0,
+        verbose_name='Последнее событие',
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Обновлено',
+    )
+
+    class Meta:
+        verbose_name = 'Позиция потребителя'
+        verbose_name_plural = 'Позиции потребителей'
+
+    def __str__(self):
+        return f'{self.name}: {self.position}'
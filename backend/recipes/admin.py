@@ -1,56 +1,93 @@
+from deletion.mixins import DeletionAdminMixin
 from django.conf import settings
 from django.contrib import admin
+from django.db.models import Count
+from outbox.constants import (FAVORITE, INGREDIENT, RECIPE, SHOPPING_CART,
+                              TAG, UPDATED)
+from outbox.mixins import OutboxAdminMixin
 
+from .admin_filters import AuthorFilter, RecipeFilter, UserFilter
 from .models import (Favorite, Ingredient, IngredientRecipe, Recipe,
                      ShoppingCart, Tag)
 
 
+class RecipeRelationAdminMixin(OutboxAdminMixin):
+    """События связей пишутся по рецепту, как и из API."""
+
+    def get_outbox_change(self, obj, action):
+        return {
+            'entity': self.outbox_entity, 'action': action,
+            'entity_id': obj.recipe_id, 'user_id': obj.user_id,
+        }
+
+
 class RecipeIngredientAdmin(admin.StackedInline):
     model = IngredientRecipe
     autocomplete_fields = ('ingredient',)
 
 
 @admin.register(IngredientRecipe)
-class RecipeIngredientAmountAdmin(admin.ModelAdmin):
+class RecipeIngredientAmountAdmin(OutboxAdminMixin, admin.ModelAdmin):
     list_display = ('ingredient', 'recipe', 'amount')
     list_display_links = ('ingredient', 'recipe')
     list_editable = ('amount',)
-    search_fields = ('ingredients', 'recipe')
+    list_filter = (RecipeFilter,)
+    list_select_related = ('ingredient', 'recipe')
+    search_fields = ('ingredient__name__startswith',)
+    autocomplete_fields = ('ingredient', 'recipe')
+    show_full_result_count = False
     empty_value_display = settings.EMPTY_VALUE_ADMIN_PANEL
 
+    def get_outbox_change(self, obj, action):
+        """Количество ингредиента — часть рецепта."""
+        return {
+            'entity': RECIPE, 'action': UPDATED, 'entity_id': obj.recipe_id,
+        }
+
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(RecipeRelationAdminMixin, admin.ModelAdmin):
+    outbox_entity = FAVORITE
     list_display = ('id', 'user', 'recipe')
-    list_filter = ('id', 'user')
-    search_fields = ('user',)
+    list_filter = (UserFilter, RecipeFilter)
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username__startswith',)
+    autocomplete_fields = ('user', 'recipe')
+    show_full_result_count = False
     empty_value_display = settings.EMPTY_VALUE_ADMIN_PANEL
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(OutboxAdminMixin, admin.ModelAdmin):
+    outbox_entity = INGREDIENT
     list_display = ('id', 'name', 'measurement_unit')
-    search_fields = ('name', 'measurement_unit')
-    list_filter = ('name',)
+    search_fields = ('name__startswith',)
+    list_filter = ('measurement_unit',)
     empty_value_display = settings.EMPTY_VALUE_ADMIN_PANEL
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(DeletionAdminMixin, OutboxAdminMixin, admin.ModelAdmin):
+    outbox_entity = RECIPE
     list_display = (
         'id', 'name', 'author', 'get_ingredients',
         'get_tags', 'get_count_recipe_in_favorites',
 
     )
-    list_filter = ('name', 'author', 'tags')
+    list_filter = (AuthorFilter, 'tags')
     list_display_links = ('name',)
-    search_fields = (
-        'name', 'cooking_time', 'author__username',
-        'ingredients__name'
-    )
+    list_select_related = ('author',)
+    search_fields = ('name__startswith', 'author__username__startswith')
+    autocomplete_fields = ('author',)
     inlines = (RecipeIngredientAdmin,)
+    show_full_result_count = False
     empty_value_display = settings.EMPTY_VALUE_ADMIN_PANEL
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            'ingredients', 'tags'
+        ).annotate(favorites_count=Count('favorite_recipe'))
+
     @admin.display(description='Игредиенты')
     def get_ingredients(self, obj):
         ingredients = [
@@ -58,9 +95,12 @@ class RecipeAdmin(admin.ModelAdmin):
         ]
         return ', '.join(ingredients)
 
-    @admin.display(description='Количество данного рецепта в избранном')
+    @admin.display(
+        description='Количество данного рецепта в избранном',
+        ordering='favorites_count'
+    )
     def get_count_recipe_in_favorites(self, obj):
-        return obj.favorite_recipe.count()
+        return obj.favorites_count
 
     @admin.display(description='Тэги')
     def get_tags(self, obj):
@@ -71,15 +111,20 @@ class RecipeAdmin(admin.ModelAdmin):
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(RecipeRelationAdminMixin, admin.ModelAdmin):
+    outbox_entity = SHOPPING_CART
     list_display = ('id', 'user', 'recipe')
-    list_filter = ('user', 'recipe')
-    search_fields = ('user', 'recipe')
+    list_filter = (UserFilter, RecipeFilter)
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username__startswith',)
+    autocomplete_fields = ('user', 'recipe')
+    show_full_result_count = False
     empty_value_display = settings.EMPTY_VALUE_ADMIN_PANEL
 
 
 @admin.register(Tag)
-class TagAdmin(admin.ModelAdmin):
+class TagAdmin(OutboxAdminMixin, admin.ModelAdmin):
+    outbox_entity = TAG
     list_display = ('id', 'name', 'color', 'slug')
     list_filter = ('name',)
     list_editable = ('name', 'color', 'slug')
@@ -0,0 +1,47 @@
+from django.contrib import admin
+
+
+class PrefixInputFilter(admin.SimpleListFilter):
+    """
+    Фильтр админки с полем ввода вместо списка всех значений.
+    Фильтрует по началу строки, что позволяет использовать индекс.
+    """
+    template = 'admin/prefix_input_filter.html'
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        # Непустой список нужен, чтобы фильтр отобразился в сайдбаре.
+        return ((None, None),)
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value:
+            return queryset.filter(**{self.lookup: value.strip()})
+        return queryset
+
+    def choices(self, changelist):
+        all_choice = next(super().choices(changelist))
+        all_choice['query_parts'] = (
+            (key, value)
+            for key, value in changelist.get_filters_params().items()
+            if key != self.parameter_name
+        )
+        yield all_choice
+
+
+class UserFilter(PrefixInputFilter):
+    title = 'пользователю'
+    parameter_name = 'username'
+    lookup = 'user__username__startswith'
+
+
+class AuthorFilter(PrefixInputFilter):
+    title = 'автору'
+    parameter_name = 'author'
+    lookup = 'author__username__startswith'
+
+
+class RecipeFilter(PrefixInputFilter):
+    title = 'рецепту'
+    parameter_name = 'recipe_name'
+    lookup = 'recipe__name__startswith'
@@ -3,3 +3,8 @@ MAX_AMOUNT = 32767
 TAG_NAME_LIMIT = 16
 TAG_COLOR_LIMIT = 7
 INGREDIENT_RECIPE_LIMIT = 200
+BATCH_ADDED = 'added'
+BATCH_ALREADY_ADDED = 'already_added'
+BATCH_REMOVED = 'removed'
+BATCH_NOT_ADDED = 'not_added'
+BATCH_NOT_FOUND = 'not_found'
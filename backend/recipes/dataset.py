@@ -0,0 +1,133 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from user.models import Follow
+
+from .models import (Favorite, Ingredient, IngredientRecipe, Recipe,
+                     ShoppingCart, Tag)
+
+User = get_user_model()
+
+DEFAULT_SCALE = {
+    'users': 100,
+    'follows': 10,
+    'recipes': 1000,
+    'ingredients': 500,
+    'ingredients_per_recipe': 8,
+    'tags': 6,
+    'tags_per_recipe': 2,
+    'favorites': 20,
+    'cart': 5,
+}
+BATCH_SIZE = 1000
+MEASUREMENT_UNITS = ('г', 'кг', 'мл', 'шт.', 'ст. л.', 'по вкусу')
+DATASET_PASSWORD = 'dataset-password'
+DATASET_IMAGE = 'recipes/images/dataset.png'
+
+
+def sample_ids(rng, ids, count, exclude=None):
+    picked = rng.sample(ids, min(count + 1, len(ids)))
+    return [pk for pk in picked if pk != exclude][:count]
+
+
+@transaction.atomic
+def generate_dataset(prefix='dataset', seed=0, **scale):
+    """
+    Детерминированно создаёт пользователей, подписки, теги,
+    ингредиенты, рецепты, избранное и списки покупок через
+    bulk_create. Масштаб задаётся ключами DEFAULT_SCALE.
+    Возвращает id созданных пользователей и рецептов.
+    """
+    scale = {**DEFAULT_SCALE, **scale}
+    rng = random.Random(seed)
+
+    Tag.objects.bulk_create([
+        Tag(
+            name=f'{prefix}-tag-{number}'[:16],
+            slug=f'{prefix}-tag-{number}',
+            color=f'#{rng.randrange(0x1000000):06X}',
+        )
+        for number in range(scale['tags'])
+    ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+    tag_ids = list(Tag.objects.filter(
+        slug__startswith=f'{prefix}-tag-'
+    ).order_by('id').values_list('id', flat=True))
+
+    Ingredient.objects.bulk_create([
+        Ingredient(
+            name=f'{prefix} ингредиент {number:05d}',
+            measurement_unit=rng.choice(MEASUREMENT_UNITS),
+        )
+        for number in range(scale['ingredients'])
+    ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+    ingredient_ids = list(Ingredient.objects.filter(
+        name__startswith=f'{prefix} ингредиент '
+    ).order_by('id').values_list('id', flat=True))
+
+    password = make_password(DATASET_PASSWORD)
+    User.objects.bulk_create([
+        User(
+            username=f'{prefix}_user_{number}',
+            email=f'{prefix}_user_{number}@example.com',
+            first_name=f'Имя {number}',
+            last_name=f'Фамилия {number}',
+            password=password,
+        )
+        for number in range(scale['users'])
+    ], batch_size=BATCH_SIZE)
+    user_ids = list(User.objects.filter(
+        username__startswith=f'{prefix}_user_'
+    ).order_by('id').values_list('id', flat=True))
+
+    Follow.objects.bulk_create([
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id in user_ids
+        for author_id in sample_ids(
+            rng, user_ids, scale['follows'], exclude=user_id
+        )
+    ], batch_size=BATCH_SIZE)
+
+    Recipe.objects.bulk_create([
+        Recipe(
+            name=f'{prefix} рецепт {number}',
+            text=f'Описание рецепта {number}. ' * rng.randint(1, 10),
+            cooking_time=rng.randint(1, 180),
+            author_id=rng.choice(user_ids),
+            image=DATASET_IMAGE,
+        )
+        for number in range(scale['recipes'])
+    ], batch_size=BATCH_SIZE)
+    recipe_ids = list(Recipe.objects.filter(
+        name__startswith=f'{prefix} рецепт '
+    ).order_by('id').values_list('id', flat=True))
+
+    RecipeTag = Recipe.tags.through
+    RecipeTag.objects.bulk_create([
+        RecipeTag(recipe_id=recipe_id, tag_id=tag_id)
+        for recipe_id in recipe_ids
+        for tag_id in sample_ids(rng, tag_ids, scale['tags_per_recipe'])
+    ], batch_size=BATCH_SIZE)
+    IngredientRecipe.objects.bulk_create([
+        IngredientRecipe(
+            recipe_id=recipe_id,
+            ingredient_id=ingredient_id,
+            amount=rng.randint(1, 500),
+        )
+        for recipe_id in recipe_ids
+        for ingredient_id in sample_ids(
+            rng, ingredient_ids, scale['ingredients_per_recipe']
+        )
+    ], batch_size=BATCH_SIZE)
+
+    for model, count in ((Favorite, scale['favorites']),
+                         (ShoppingCart, scale['cart'])):
+        model.objects.bulk_create([
+            model(user_id=user_id, recipe_id=recipe_id)
+            for user_id in user_ids
+            for recipe_id in sample_ids(rng, recipe_ids, count)
+        ], batch_size=BATCH_SIZE)
+
+    return {'user_ids': user_ids, 'recipe_ids': recipe_ids,
+            'tag_ids': tag_ids, 'ingredient_ids': ingredient_ids}
@@ -0,0 +1,73 @@
+import time
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management.base import BaseCommand, CommandError
+from recipes.media import collect_garbage
+
+MB = 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки рецептов, на которые нет ссылок, и по '
+        'желанию заменяет одинаковые картинки жёсткими ссылками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что было бы удалено и объединено.'
+        )
+        parser.add_argument(
+            '--dedupe', action='store_true',
+            help='Объединить одинаковые по содержимому картинки.'
+        )
+        parser.add_argument(
+            '--grace-hours', type=float,
+            default=settings.MEDIA_GC['GRACE_HOURS'],
+            help='Не трогать файлы моложе этого срока.'
+        )
+        parser.add_argument('--chunk-size', type=int)
+        parser.add_argument(
+            '--interval', type=float,
+            help='Повторять проход каждые столько секунд.'
+        )
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, FileSystemStorage):
+            raise CommandError(
+                'Сборка мусора работает только с FileSystemStorage.'
+            )
+        while True:
+            try:
+                stats = collect_garbage(
+                    options['grace_hours'] * 3600, options['dedupe'],
+                    options['dry_run'], options['chunk_size']
+                )
+            except ValueError as error:
+                raise CommandError(error)
+            self.report(stats, options['dry_run'])
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
+
+    def report(self, stats, dry_run):
+        seconds = max(stats['seconds'], 1e-6)
+        deleted, linked, freed = (
+            ('Будет удалено', 'будет заменено', 'будет освобождено')
+            if dry_run else ('Удалено', 'заменено', 'освобождено')
+        )
+        self.stdout.write(
+            f'Файлов {stats["files"]} ({stats["bytes"] / MB:.1f} МБ), '
+            f'моложе срока {stats["young"]}, сирот {stats["orphans"]}'
+        )
+        self.stdout.write(
+            f'{deleted} {stats["deleted"]}, {linked} ссылками '
+            f'{stats["linked"]}, {freed} '
+            f'{stats["freed_bytes"] / MB:.1f} МБ'
+        )
+        self.stdout.write(
+            f'{seconds:.2f} с: {stats["files"] / seconds:.0f} файлов/с, '
+            f'хэширование {stats["hashed_bytes"] / MB / seconds:.1f} МБ/с'
+        )
@@ -2,6 +2,11 @@ import csv
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from foodgram.cache import two_tier_cache
+from outbox.constants import CREATED, INGREDIENT
+from outbox.events import make_event, record_changes
 from recipes.models import Ingredient
 
 
@@ -30,4 +35,18 @@ class Command(BaseCommand):
                     ingredient = create_function(row)
                     ingredients_to_create.append(ingredient)
 
-        Ingredient.objects.bulk_create(ingredients_to_create)
+        with transaction.atomic():
+            # bulk_create не везде возвращает id, новые строки
+            # находим по id больше прежнего максимума.
+            last_id = Ingredient.objects.aggregate(
+                last_id=Max('id')
+            )['last_id'] or 0
+            Ingredient.objects.bulk_create(ingredients_to_create)
+            record_changes([
+                make_event(INGREDIENT, CREATED, ingredient_id)
+                for ingredient_id in Ingredient.objects.filter(
+                    pk__gt=last_id
+                ).values_list('id', flat=True)
+            ])
+        # bulk_create не отправляет сигналы, сбрасываем кэш вручную.
+        two_tier_cache.invalidate_tags('ingredients')
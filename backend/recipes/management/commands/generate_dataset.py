@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from recipes.dataset import DEFAULT_SCALE, generate_dataset
+
+
+class Command(BaseCommand):
+    help = 'Создаёт синтетический набор данных заданного масштаба.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--prefix', default='dataset',
+            help='Префикс имён, должен быть новым для каждого запуска.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        for name, default in DEFAULT_SCALE.items():
+            parser.add_argument(
+                f'--{name.replace("_", "-")}', type=int, default=default,
+                dest=name
+            )
+
+    def handle(self, *args, **options):
+        scale = {name: options[name] for name in DEFAULT_SCALE}
+        started = time.perf_counter()
+        result = generate_dataset(
+            prefix=options['prefix'], seed=options['seed'], **scale
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(result["user_ids"])}, '
+            f'рецептов: {len(result["recipe_ids"])} '
+            f'за {time.perf_counter() - started:.1f} с.'
+        ))
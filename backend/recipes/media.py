@@ -0,0 +1,167 @@
+"""
+Сборка мусора в каталоге картинок рецептов.
+
+Старая картинка остаётся на диске после замены и после удаления
+рецепта. Ссылки из Recipe.image и файлы каталога идут двумя
+отсортированными потоками и сливаются за один проход: файл без ссылки
+— сирота. Удаляются только сироты старше срока ожидания: картинка
+нового рецепта пишется на диск до фиксации транзакции и какое-то
+время выглядит сиротой. С dedupe одинаковые по содержимому картинки
+заменяются жёсткими ссылками на одну из них.
+"""
+import hashlib
+import os
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.functions import Collate
+
+from .models import Recipe
+
+IMAGES_DIR = Recipe._meta.get_field('image').upload_to
+# Порядок строк в БД должен совпадать с порядком str в Python.
+BYTE_ORDER_COLLATIONS = {'postgresql': 'C', 'sqlite': 'BINARY'}
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def iter_references(chunk_size):
+    """Имена картинок из Recipe.image по возрастанию, без повторов."""
+    collation = BYTE_ORDER_COLLATIONS.get(connection.vendor)
+    order = Collate('image', collation) if collation else 'image'
+    previous = None
+    for image in Recipe.objects.filter(
+        image__startswith=IMAGES_DIR
+    ).order_by(order).values_list('image', flat=True).iterator(
+        chunk_size=chunk_size
+    ):
+        name = image[len(IMAGES_DIR):]
+        if previous is not None and name < previous:
+            # Без правильного порядка слияние приняло бы файлы
+            # с ссылками за сирот.
+            raise ValueError(f'Ссылки не по порядку: {previous}, {name}')
+        if name != previous:
+            yield name
+        previous = name
+
+
+def iter_files(directory):
+    """
+    Файлы каталога по возрастанию имени. Порядок scandir произволен,
+    поэтому записи каталога сортируются в памяти.
+    """
+    if not directory.is_dir():
+        return
+    with os.scandir(directory) as entries:
+        files = sorted(
+            (entry for entry in entries
+             if entry.is_file(follow_symlinks=False)),
+            key=lambda entry: entry.name
+        )
+    yield from files
+
+
+def merge(files, references):
+    """Пары (файл, есть ли на него ссылка) за один проход."""
+    reference = next(references, None)
+    for entry in files:
+        while reference is not None and reference < entry.name:
+            reference = next(references, None)
+        yield entry, reference == entry.name
+
+
+def file_digest(path, stats):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+            stats['hashed_bytes'] += len(chunk)
+    return digest.digest()
+
+
+def replace_with_link(source, target):
+    """Атомарно заменяет target жёсткой ссылкой на source."""
+    temporary = f'{target}.gc-{os.getpid()}'
+    os.link(source, temporary)
+    os.replace(temporary, target)
+
+
+def delete_orphans(directory, names, dry_run, stats):
+    """
+    Удаляет сирот пачкой. Перед удалением ссылки проверяются ещё раз:
+    за время прохода их могли сохранить в рецепт.
+    """
+    referenced = set(Recipe.objects.filter(
+        image__in=[IMAGES_DIR + name for name in names]
+    ).values_list('image', flat=True))
+    for name, size in names.items():
+        if IMAGES_DIR + name in referenced:
+            continue
+        if not dry_run:
+            try:
+                os.unlink(directory / name)
+            except FileNotFoundError:
+                continue
+        stats['deleted'] += 1
+        stats['freed_bytes'] += size
+
+
+def link_duplicates(directory, candidates, dry_run, stats):
+    """
+    Заменяет одинаковые по содержимому файлы ссылками на первый
+    по имени. Хэшируются только файлы с совпадающим размером.
+    """
+    for size, files in candidates.items():
+        if len({inode for _, inode in files}) < 2:
+            continue
+        by_digest = defaultdict(list)
+        for name, inode in sorted(files):
+            by_digest[file_digest(directory / name, stats)].append(
+                (name, inode)
+            )
+        for (source, source_inode), *duplicates in by_digest.values():
+            for name, inode in duplicates:
+                if inode == source_inode:
+                    continue
+                if not dry_run:
+                    replace_with_link(directory / source, directory / name)
+                stats['linked'] += 1
+                stats['freed_bytes'] += size
+
+
+def collect_garbage(grace, dedupe=False, dry_run=False, chunk_size=None):
+    """
+    Удаляет картинки без ссылок старше grace секунд, с dedupe —
+    объединяет дубликаты. Возвращает счётчики прохода.
+    """
+    chunk_size = chunk_size or settings.MEDIA_GC['CHUNK_SIZE']
+    directory = Path(settings.MEDIA_ROOT) / IMAGES_DIR
+    started = time.perf_counter()
+    settled = time.time() - grace
+    stats = Counter()
+    orphans = {}
+    candidates = defaultdict(list)
+    for entry, referenced in merge(
+        iter_files(directory), iter_references(chunk_size)
+    ):
+        stat = entry.stat(follow_symlinks=False)
+        stats['files'] += 1
+        stats['bytes'] += stat.st_size
+        if stat.st_mtime > settled:
+            stats['young'] += 1
+        elif not referenced:
+            stats['orphans'] += 1
+            orphans[entry.name] = stat.st_size
+            if len(orphans) >= chunk_size:
+                delete_orphans(directory, orphans, dry_run, stats)
+                orphans = {}
+        elif dedupe:
+            candidates[stat.st_size].append((entry.name, stat.st_ino))
+    if orphans:
+        delete_orphans(directory, orphans, dry_run, stats)
+    if dedupe:
+        link_duplicates(directory, candidates, dry_run, stats)
+    stats['seconds'] = time.perf_counter() - started
+    return stats
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.3 on 2026-10-19 08:34
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicates(apps, schema_editor):
+    for name in ('Favorite', 'ShoppingCart'):
+        model = apps.get_model('recipes', name)
+        keep = model.objects.values('user', 'recipe').annotate(
+            keep_id=Min('id')
+        ).values('keep_id')
+        model.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['recipe', 'user'], name='favorite_recipe_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingcart',
+            index=models.Index(fields=['recipe', 'user'], name='shopping_cart_recipe_user_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_favorite_recipe'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_shopping_cart_recipe'),
+        ),
+    ]
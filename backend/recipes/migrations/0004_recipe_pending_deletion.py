@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2026-10-19 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_unique_recipe_relations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='pending_deletion',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Ожидает удаления'),
+        ),
+    ]
@@ -2,10 +2,14 @@ from colorfield.fields import ColorField
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connections, models, transaction
 from django.db.models import UniqueConstraint
+from outbox.constants import CREATED, DELETED, FAVORITE, SHOPPING_CART
+from outbox.events import make_event, record_changes
 
-from .constants import (INGREDIENT_RECIPE_LIMIT, MAX_AMOUNT, MIN_AMOUNT,
+from .constants import (BATCH_ADDED, BATCH_ALREADY_ADDED, BATCH_NOT_ADDED,
+                        BATCH_NOT_FOUND, BATCH_REMOVED,
+                        INGREDIENT_RECIPE_LIMIT, MAX_AMOUNT, MIN_AMOUNT,
                         TAG_COLOR_LIMIT, TAG_NAME_LIMIT)
 
 User = get_user_model()
@@ -114,6 +118,13 @@ class IngredientRecipe(models.Model):
         return self.amount
 
 
+class VisibleRecipeManager(models.Manager):
+    """Рецепты, кроме ожидающих удаления."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(pending_deletion=False)
+
+
 class Recipe(models.Model):
     """Модель для рецептов."""
     created_at = models.DateTimeField(
@@ -161,6 +172,16 @@ class Recipe(models.Model):
         ],
         verbose_name='Время приготовления'
     )
+    pending_deletion = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Ожидает удаления',
+    )
+
+    # API читает рецепты через visible: скрытые ждут, пока их
+    # зависимые строки удалит deletion.jobs.
+    objects = models.Manager()
+    visible = VisibleRecipeManager()
 
     class Meta:
         verbose_name = 'Рецепт'
@@ -171,6 +192,100 @@ class Recipe(models.Model):
         return self.name[:settings.MAX_LEN_TITLE]
 
 
+class RecipeRelationQuerySet(models.QuerySet):
+
+    def add(self, user, recipe_id):
+        """
+        Добавляет связь одним запросом INSERT ... SELECT: строка
+        появится, только если рецепт существует, не ожидает удаления
+        и связи ещё нет.
+        Возвращает True, если строка добавлена.
+        """
+        recipe_id = int(recipe_id)
+        table = self.model._meta.db_table
+        recipe_table = Recipe._meta.db_table
+        with transaction.atomic(using=self.db):
+            with connections[self.db].cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {table} (user_id, recipe_id) '
+                    f'SELECT %s, id FROM {recipe_table} WHERE id = %s '
+                    'AND NOT pending_deletion ON CONFLICT DO NOTHING',
+                    [user.pk, recipe_id]
+                )
+                added = cursor.rowcount == 1
+            if added:
+                self.record_many(user, [(CREATED, recipe_id)])
+        return added
+
+    def remove(self, user, recipe_id):
+        """Удаляет связь одним DELETE, возвращает True при успехе."""
+        recipe_id = int(recipe_id)
+        with transaction.atomic(using=self.db):
+            deleted, _ = self.filter(user=user, recipe_id=recipe_id).delete()
+            if deleted:
+                self.record_many(user, [(DELETED, recipe_id)])
+        return deleted > 0
+
+    def clear(self, user):
+        """Удаляет все связи пользователя, возвращает их число."""
+        with transaction.atomic(using=self.db):
+            recipe_ids = list(self.filter(user=user).select_for_update(
+            ).values_list('recipe_id', flat=True))
+            if recipe_ids:
+                self.filter(user=user, recipe_id__in=recipe_ids).delete()
+                self.record_many(user, (
+                    (DELETED, recipe_id) for recipe_id in recipe_ids
+                ))
+        return len(recipe_ids)
+
+    def record_many(self, user, changes):
+        """Записывает пары (действие, id рецепта) одним INSERT."""
+        record_changes([
+            make_event(
+                self.model.outbox_entity, action, recipe_id, user_id=user.pk
+            )
+            for action, recipe_id in changes
+        ], using=self.db)
+
+    def apply_batch(self, user, add=(), remove=()):
+        """
+        Добавляет и удаляет связи пачкой: один SELECT по рецептам
+        с признаком связи, один INSERT, один DELETE и INSERT событий
+        журнала. Вызывать внутри транзакции. Возвращает статус для
+        каждого id.
+        """
+        requested = set(add) | set(remove)
+        linked = dict(Recipe.visible.filter(pk__in=requested).annotate(
+            linked=models.Exists(self.filter(
+                user=user, recipe=models.OuterRef('pk')
+            ))
+        ).values_list('pk', 'linked'))
+        to_add = [pk for pk in add if pk in linked and not linked[pk]]
+        to_remove = [pk for pk in remove if linked.get(pk)]
+        if to_add:
+            self.bulk_create(
+                [self.model(user=user, recipe_id=pk) for pk in to_add],
+                ignore_conflicts=True
+            )
+        if to_remove:
+            self.filter(user=user, recipe_id__in=to_remove).delete()
+        self.record_many(user, [(CREATED, pk) for pk in to_add]
+                         + [(DELETED, pk) for pk in to_remove])
+
+        results = {'add': {}, 'remove': {}}
+        for pk in add:
+            results['add'][pk] = (
+                BATCH_NOT_FOUND if pk not in linked
+                else BATCH_ALREADY_ADDED if linked[pk] else BATCH_ADDED
+            )
+        for pk in remove:
+            results['remove'][pk] = (
+                BATCH_NOT_FOUND if pk not in linked
+                else BATCH_REMOVED if linked[pk] else BATCH_NOT_ADDED
+            )
+        return results
+
+
 class BaseRecipeRelation(models.Model):
     """
     Базовая абстрактная модель для связей с рецептами.
@@ -189,17 +304,30 @@ class BaseRecipeRelation(models.Model):
         help_text='Выберите рецепт',
     )
 
+    objects = RecipeRelationQuerySet.as_manager()
+
     class Meta:
         abstract = True
 
 
 class Favorite(BaseRecipeRelation):
     """Модель для избранных рецептов."""
+    outbox_entity = FAVORITE
 
     class Meta:
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранное'
         default_related_name = 'favorite_recipe'
+        constraints = [
+            UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_favorite_recipe')
+        ]
+        indexes = [
+            models.Index(
+                fields=('recipe', 'user'),
+                name='favorite_recipe_user_idx')
+        ]
 
     def __str__(self):
         f'Пользователь с именем {self.user} добавил {self.recipe} в избранное.'
@@ -210,11 +338,22 @@ class ShoppingCart(BaseRecipeRelation):
     Модель для списка покупок пользователя.
     Связь пользователя и рецепта в списке покупок.
     """
+    outbox_entity = SHOPPING_CART
 
     class Meta:
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Список покупок'
         default_related_name = 'shopping_cart'
+        constraints = [
+            UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_shopping_cart_recipe')
+        ]
+        indexes = [
+            models.Index(
+                fields=('recipe', 'user'),
+                name='shopping_cart_recipe_user_idx')
+        ]
 
     def __str__(self):
         f'Пользователь {self.author} добавил {self.recipe} в список покупок.'
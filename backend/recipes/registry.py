@@ -0,0 +1,91 @@
+"""
+Справочник ингредиентов в памяти воркера.
+
+Каталог ингредиентов небольшой и почти не меняется, поэтому названия и
+единицы измерения берутся из неизменяемого снимка, а не из JOIN с
+таблицей Ingredient. Снимок хранит отсортированные id в array и
+параллельные кортежи названий и единиц. Актуальность проверяется по
+версии тега 'ingredients' двухуровневого кэша, которую сбрасывают
+сигналы модели и csv_upload.
+"""
+import threading
+from array import array
+from bisect import bisect_left
+
+from foodgram.cache import two_tier_cache
+
+from .models import Ingredient
+
+CACHE_TAG = 'ingredients'
+
+
+class IngredientCatalog:
+    """Неизменяемый снимок справочника ингредиентов."""
+    __slots__ = ('version', 'ids', 'names', 'units')
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.ids = array('q', (row[0] for row in rows))
+        self.names = tuple(row[1] for row in rows)
+        self.units = tuple(row[2] for row in rows)
+
+    def _index(self, ingredient_id):
+        index = bisect_left(self.ids, ingredient_id)
+        if index < len(self.ids) and self.ids[index] == ingredient_id:
+            return index
+        raise KeyError(ingredient_id)
+
+    def __contains__(self, ingredient_id):
+        try:
+            self._index(ingredient_id)
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, ingredient_id):
+        """Пара (название, единица измерения) по id."""
+        index = self._index(ingredient_id)
+        return self.names[index], self.units[index]
+
+
+class IngredientRegistry:
+    """Загружает снимок один раз и перечитывает его при смене версии."""
+
+    def __init__(self):
+        self._catalog = None
+        self._lock = threading.Lock()
+
+    def _load(self, version):
+        rows = list(Ingredient.objects.order_by('id').values_list(
+            'id', 'name', 'measurement_unit'
+        ))
+        return IngredientCatalog(version, rows)
+
+    def get(self, ids=()):
+        """
+        Актуальный снимок. Если в нём нет каких-то из ids, а в БД они
+        есть, снимок перечитывается: версия тега могла ещё не дойти
+        до воркера.
+        """
+        version = two_tier_cache.tag_versions((CACHE_TAG,))[CACHE_TAG]
+        catalog = self._catalog
+        if catalog is not None and catalog.version == version:
+            missing = [pk for pk in ids if pk not in catalog]
+            if not missing or not Ingredient.objects.filter(
+                pk__in=missing
+            ).exists():
+                return catalog
+        with self._lock:
+            if self._catalog is catalog:
+                self._catalog = self._load(version)
+            return self._catalog
+
+    def clear(self):
+        with self._lock:
+            self._catalog = None
+
+
+ingredient_registry = IngredientRegistry()
@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.testing import isolated_settings
+from recipes.dataset import generate_dataset
+
+User = get_user_model()
+
+SMALL_SCALE = {
+    'users': 4, 'follows': 2, 'recipes': 4, 'ingredients': 10,
+    'ingredients_per_recipe': 2, 'tags': 3, 'tags_per_recipe': 1,
+    'favorites': 2, 'cart': 2,
+}
+LARGE_SCALE = {
+    'users': 30, 'follows': 8, 'recipes': 120, 'ingredients': 60,
+    'ingredients_per_recipe': 6, 'tags': 6, 'tags_per_recipe': 3,
+    'favorites': 10, 'cart': 6,
+}
+
+# Страница списка админки -> бюджет запросов. Фильтры и поиск идут
+# по началу строки с индексом, а не списком всех значений в сайдбаре.
+CHANGELISTS = {
+    '/admin/recipes/recipe/': 7,
+    '/admin/recipes/recipe/?q=small&author=small': 7,
+    '/admin/recipes/ingredient/': 6,
+    '/admin/recipes/ingredient/?q=small': 6,
+    '/admin/recipes/ingredientrecipe/': 4,
+    '/admin/recipes/ingredientrecipe/?recipe_name=small': 4,
+    '/admin/recipes/favorite/': 4,
+    '/admin/recipes/favorite/?username=small&recipe_name=small': 4,
+    '/admin/recipes/shoppingcart/': 4,
+    '/admin/recipes/shoppingcart/?q=small': 4,
+    '/admin/recipes/tag/': 6,
+    '/admin/user/follow/': 4,
+    '/admin/user/follow/?username=small&author=small': 4,
+    '/admin/user/member/': 4,
+    '/admin/user/member/?q=small': 4,
+}
+
+
+@isolated_settings()
+class AdminChangelistQueriesTest(TestCase):
+    """Число запросов страниц админки не зависит от объёма таблиц."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+        generate_dataset(prefix='small', seed=0, **SMALL_SCALE)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(context)
+
+    def test_changelist_queries(self):
+        for url in CHANGELISTS:
+            # Первый запрос заполняет кэши процесса, например ContentType.
+            self.client.get(url)
+        small = {url: self.count_queries(url) for url in CHANGELISTS}
+        generate_dataset(prefix='large', seed=1, **LARGE_SCALE)
+        for url, budget in CHANGELISTS.items():
+            with self.subTest(url=url):
+                self.assertLessEqual(small[url], budget)
+                with self.assertNumQueries(small[url]):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
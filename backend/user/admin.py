@@ -1,8 +1,12 @@
+from deletion.mixins import DeletionAdminMixin
 from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import Group
+from outbox.constants import FOLLOW, USER
+from outbox.mixins import OutboxAdminMixin
+from recipes.admin_filters import AuthorFilter, UserFilter
 
 from .models import Follow
 
@@ -10,14 +14,28 @@ Member = get_user_model()
 
 
 @admin.register(Follow)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(OutboxAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'user', 'author', 'subscribe_date')
-    search_fields = ('user__username', 'author__username')
+    list_filter = (UserFilter, AuthorFilter)
+    list_select_related = ('user', 'author')
+    search_fields = (
+        'user__username__startswith', 'author__username__startswith'
+    )
+    autocomplete_fields = ('user', 'author')
+    show_full_result_count = False
     empty_value_display = settings.EMPTY_VALUE_ADMIN_PANEL
 
+    def get_outbox_change(self, obj, action):
+        """События подписок пишутся по автору, как и из API."""
+        return {
+            'entity': FOLLOW, 'action': action,
+            'entity_id': obj.author_id, 'user_id': obj.user_id,
+        }
+
 
 @admin.register(Member)
-class MemberAdmin(UserAdmin):
+class MemberAdmin(DeletionAdminMixin, OutboxAdminMixin, UserAdmin):
+    outbox_entity = USER
     list_display = (
         'id', 'username', 'email', 'first_name', 'last_name',
         'password', 'is_superuser', 'is_active', 'date_joined', 'is_staff'
@@ -27,9 +45,12 @@ class MemberAdmin(UserAdmin):
         'password', 'is_superuser', 'is_active', 'is_staff'
     )
     list_filter = (
-        'email', 'first_name', 'date_joined'
+        'is_active', 'is_staff', 'date_joined'
+    )
+    search_fields = (
+        'username__startswith', 'email__startswith', 'first_name'
     )
-    search_fields = ('username', 'email', 'first_name')
+    show_full_result_count = False
     empty_value_display = settings.EMPTY_VALUE_ADMIN_PANEL
 
 
@@ -0,0 +1,250 @@
+"""
+Массовый импорт пользователей из CSV или JSONL.
+
+Строки обрабатываются пачками. Поля проверяются валидаторами модели,
+уникальность username и email — двумя запросами на пачку. PBKDF2
+нагружает процессор, поэтому пароли хэшируются в пуле процессов, а
+пользователи вставляются bulk_create. Подписки из колонки follows
+создаются после всех пачек, когда известны id авторов из файла.
+"""
+import csv
+import json
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from foodgram.cache import two_tier_cache
+from outbox.constants import CREATED, FOLLOW, USER
+from outbox.events import make_event, record_changes
+
+from .models import Follow
+
+User = get_user_model()
+
+FIELDS = ('email', 'username', 'first_name', 'last_name', 'password')
+
+
+def read_rows(file, file_format):
+    """
+    Пары (номер строки, словарь полей) из открытого файла. Вместо
+    словаря для битой строки JSONL отдаётся текст ошибки.
+    """
+    if file_format == 'jsonl':
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as error:
+                row = f'некорректный JSON: {error.msg}'
+            else:
+                if not isinstance(row, dict):
+                    row = 'строка должна быть объектом JSON'
+            yield line_number, row
+        return
+    # Первая строка CSV — заголовок, follows — имена через пробел.
+    reader = csv.DictReader(file)
+    for row in reader:
+        row['follows'] = (row.get('follows') or '').split()
+        yield reader.line_num, row
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+class UserImport:
+    """Импорт с накоплением счётчиков и проблем по номерам строк."""
+
+    def __init__(self, workers=None, batch_size=None, dry_run=False):
+        self.workers = workers or settings.USER_IMPORT['WORKERS'] or None
+        self.batch_size = batch_size or settings.USER_IMPORT['BATCH_SIZE']
+        self.dry_run = dry_run
+        self.executor = None
+        self.stats = Counter()
+        self.timings = Counter()
+        self.problems = []
+        self.usernames = set()
+        self.emails = set()
+        # Номер строки -> (username, авторы), только для годных строк.
+        self.follows = {}
+
+    def problem(self, line_number, message):
+        self.stats['skipped'] += 1
+        self.problems.append((line_number, message))
+        # Подписки отклонённой строки не должны достаться чужому
+        # пользователю с тем же username.
+        self.follows.pop(line_number, None)
+
+    def get_executor(self):
+        """Пул для хэширования, создаётся при первой пачке с паролями."""
+        if self.executor is None:
+            # Без fork (macOS, Windows) воркеры пула настраивают Django
+            # сами.
+            self.executor = ProcessPoolExecutor(
+                self.workers, initializer=django.setup
+            )
+        return self.executor
+
+    def run(self, rows):
+        started = time.perf_counter()
+        try:
+            for batch in batches(rows, self.batch_size):
+                self.import_batch(batch)
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+        if not self.dry_run:
+            self.create_follows()
+            # bulk_create не отправляет сигналы, сбрасываем кэш вручную.
+            two_tier_cache.invalidate_tags('users')
+        self.timings['total'] = time.perf_counter() - started
+        return self.stats
+
+    def build(self, line_number, row):
+        """Пользователь из строки или None, если строка с ошибкой."""
+        self.stats['read'] += 1
+        if isinstance(row, str):
+            self.problem(line_number, row)
+            return None
+        follows = row.get('follows') or []
+        if not isinstance(follows, list) or not all(
+            isinstance(author, str) for author in follows
+        ):
+            self.problem(line_number, 'follows: ожидается список имён')
+            return None
+        user = User(**{
+            field: (row.get(field) or '').strip() for field in FIELDS
+        })
+        # Как create_user при регистрации: домен в нижнем регистре.
+        user.email = User.objects.normalize_email(user.email)
+        try:
+            user.clean_fields(exclude=('password',))
+            user.clean()
+        except ValidationError as error:
+            self.problem(line_number, '; '.join(
+                f'{field}: {" ".join(messages)}'
+                for field, messages in error.message_dict.items()
+            ))
+            return None
+        if user.username in self.usernames or user.email in self.emails:
+            self.problem(line_number, 'повтор username или email в файле')
+            return None
+        self.usernames.add(user.username)
+        self.emails.add(user.email)
+        if follows:
+            self.follows[line_number] = (user.username, follows)
+        return user
+
+    def import_batch(self, batch):
+        users = {}
+        for line_number, row in batch:
+            user = self.build(line_number, row)
+            if user is not None:
+                users[line_number] = user
+        taken_usernames = set(User.objects.filter(
+            username__in=[user.username for user in users.values()]
+        ).values_list('username', flat=True))
+        taken_emails = set(User.objects.filter(
+            email__in=[user.email for user in users.values()]
+        ).values_list('email', flat=True))
+        for line_number, user in list(users.items()):
+            if user.username in taken_usernames:
+                self.problem(line_number, f'username {user.username} занят')
+            elif user.email in taken_emails:
+                self.problem(line_number, f'email {user.email} занят')
+            else:
+                continue
+            del users[line_number]
+        if self.dry_run or not users:
+            self.stats['valid'] += len(users)
+            return
+
+        started = time.perf_counter()
+        passwords = [user.password or None for user in users.values()]
+        for user, password in zip(users.values(), self.get_executor().map(
+            make_password, passwords,
+            chunksize=max(len(passwords) // 64, 1)
+        )):
+            user.password = password
+        self.timings['hashing'] += time.perf_counter() - started
+        self.stats['hashed'] += len(passwords)
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            # Конфликт с параллельной регистрацией не роняет пачку:
+            # такие строки не вставятся и не найдутся ниже по email.
+            User.objects.bulk_create(
+                users.values(), batch_size=self.batch_size,
+                ignore_conflicts=True
+            )
+            created = {
+                (username, email): pk
+                for username, email, pk in User.objects.filter(
+                    username__in=[user.username for user in users.values()]
+                ).values_list('username', 'email', 'id')
+            }
+            new_ids = []
+            for line_number, user in users.items():
+                pk = created.get((user.username, user.email))
+                if pk is None:
+                    self.problem(line_number, 'конфликт при вставке')
+                else:
+                    new_ids.append(pk)
+            record_changes([
+                make_event(USER, CREATED, user_id) for user_id in new_ids
+            ])
+        self.timings['insert'] += time.perf_counter() - started
+        self.stats['created'] += len(new_ids)
+
+    def create_follows(self):
+        """Подписки на пользователей из файла и уже существующих."""
+        started = time.perf_counter()
+        follows = (
+            (line_number, follower, author)
+            for line_number, (follower, authors) in self.follows.items()
+            for author in authors
+        )
+        for batch in batches(follows, self.batch_size):
+            ids = dict(User.objects.filter(username__in={
+                username for _, follower, author in batch
+                for username in (follower, author)
+            }).values_list('username', 'id'))
+            edges = {}
+            for line_number, follower, author in batch:
+                if author not in ids or follower not in ids:
+                    self.problems.append((
+                        line_number,
+                        f'подписка на {author}: пользователь не найден'
+                    ))
+                elif author != follower:
+                    edges[ids[follower], ids[author]] = line_number
+            existing = set(Follow.objects.filter(
+                user_id__in={user_id for user_id, _ in edges}
+            ).values_list('user_id', 'author_id'))
+            new = [edge for edge in edges if edge not in existing]
+            with transaction.atomic():
+                Follow.objects.bulk_create(
+                    [Follow(user_id=user_id, author_id=author_id)
+                     for user_id, author_id in new],
+                    ignore_conflicts=True
+                )
+                record_changes([
+                    make_event(FOLLOW, CREATED, author_id, user_id=user_id)
+                    for user_id, author_id in new
+                ])
+            self.stats['follows'] += len(new)
+        self.timings['follows'] = time.perf_counter() - started
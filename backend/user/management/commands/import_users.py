@@ -0,0 +1,75 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from user.importing import UserImport, read_rows
+
+FORMATS = ('csv', 'jsonl')
+SHOWN_PROBLEMS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт пользователей и их подписки из CSV или JSONL с полями '
+        'email, username, first_name, last_name, password и follows.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=Path)
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='По умолчанию — по расширению файла.'
+        )
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument(
+            '--workers', type=int,
+            help='Процессов для хэширования паролей.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только проверить строки и уникальность.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in FORMATS:
+            raise CommandError(
+                f'Формат {path.name} не распознан, укажите --format.'
+            )
+        importer = UserImport(
+            options['workers'], options['batch_size'], options['dry_run']
+        )
+        try:
+            with open(path, encoding='utf-8', newline='') as file:
+                importer.run(read_rows(file, file_format))
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        self.report(importer)
+
+    def report(self, importer):
+        stats, timings = importer.stats, importer.timings
+        for line_number, message in importer.problems[:SHOWN_PROBLEMS]:
+            self.stderr.write(f'Строка {line_number}: {message}')
+        if len(importer.problems) > SHOWN_PROBLEMS:
+            self.stderr.write(
+                f'... и ещё {len(importer.problems) - SHOWN_PROBLEMS}'
+            )
+        if importer.dry_run:
+            self.stdout.write(
+                f'Прочитано {stats["read"]}, можно создать '
+                f'{stats["valid"]}, пропущено {stats["skipped"]}'
+            )
+            return
+        self.stdout.write(
+            f'Прочитано {stats["read"]}, создано {stats["created"]}, '
+            f'пропущено {stats["skipped"]}, подписок {stats["follows"]}'
+        )
+        total = max(timings['total'], 1e-6)
+        self.stdout.write(
+            f'{total:.2f} с: {stats["created"] / total:.0f} польз./с; '
+            f'хэширование {timings["hashing"]:.2f} с '
+            f'({stats["hashed"] / max(timings["hashing"], 1e-6):.0f}/с, '
+            f'процессов {importer.workers or "по числу CPU"}), '
+            f'вставка {timings["insert"]:.2f} с, '
+            f'подписки {timings["follows"]:.2f} с'
+        )
@@ -26,6 +26,11 @@ class Member(AbstractUser):
         max_length=MAX_LNAME_LENGTH,
         verbose_name='Фамилия'
     )
+    pending_deletion = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Ожидает удаления',
+    )
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name', 'password']
 
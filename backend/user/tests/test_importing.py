@@ -0,0 +1,125 @@
+import io
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from api.testing import isolated_settings
+from user.importing import UserImport, read_rows
+from user.models import Follow
+
+User = get_user_model()
+
+
+def row(username, email=None, follows=None):
+    return {
+        'email': email or f'{username}@example.com', 'username': username,
+        'first_name': username, 'last_name': username,
+        'password': 'Qwerty-123456', 'follows': follows or [],
+    }
+
+
+def jsonl(*lines):
+    return io.StringIO(''.join(
+        (line if isinstance(line, str) else json.dumps(line)) + '\n'
+        for line in lines
+    ))
+
+
+@isolated_settings()
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']
+)
+class UserImportTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.existing = User.objects.create_user(
+            username='alice', email='alice@example.com', password='x'
+        )
+        cls.author = User.objects.create_user(
+            username='bob', email='bob@example.com', password='x'
+        )
+
+    def run_import(self, file, file_format='jsonl', **options):
+        importer = UserImport(workers=1, **options)
+        importer.run(read_rows(file, file_format))
+        return importer
+
+    def problem_lines(self, importer):
+        return dict(importer.problems)
+
+    def test_rejected_row_follows_are_dropped(self):
+        importer = self.run_import(jsonl(
+            row('alice', 'other@example.com', follows=['bob']),
+            row('carol', follows=['bob']),
+        ))
+        self.assertIn(1, self.problem_lines(importer))
+        self.assertEqual(
+            set(Follow.objects.values_list(
+                'user__username', 'author__username'
+            )),
+            {('carol', 'bob')}
+        )
+
+    def test_malformed_rows_reported_per_line(self):
+        importer = self.run_import(jsonl(
+            row('carol'),
+            '{not json',
+            '[1, 2]',
+            row('dave', follows='bob'),
+        ))
+        problems = self.problem_lines(importer)
+        self.assertEqual(set(problems), {2, 3, 4})
+        self.assertIn('JSON', problems[2])
+        self.assertIn('follows', problems[4])
+        self.assertEqual(importer.stats['created'], 1)
+        self.assertFalse(Follow.objects.filter(user__username='dave'))
+
+    def test_collisions_in_file_and_database(self):
+        importer = self.run_import(jsonl(
+            row('carol'),
+            row('carol', 'carol2@example.com'),
+            row('dave', 'carol@example.com'),
+            row('alice', 'new@example.com'),
+            row('erin', 'bob@EXAMPLE.COM'),
+            row('frank'),
+        ))
+        self.assertEqual(set(self.problem_lines(importer)), {2, 3, 4, 5})
+        self.assertEqual(importer.stats['created'], 2)
+        self.assertEqual(
+            set(User.objects.filter(
+                username__in=('carol', 'frank', 'dave', 'erin')
+            ).values_list('username', flat=True)),
+            {'carol', 'frank'}
+        )
+
+    def test_email_domain_normalized(self):
+        self.run_import(jsonl(row('carol', 'Carol@EXAMPLE.COM')))
+        self.assertEqual(
+            User.objects.get(username='carol').email, 'Carol@example.com'
+        )
+
+    def test_csv(self):
+        file = io.StringIO(
+            'email,username,first_name,last_name,password,follows\n'
+            'carol@example.com,carol,C,C,Qwerty-123456,bob alice\n'
+        )
+        importer = self.run_import(file, 'csv')
+        self.assertEqual(importer.stats['created'], 1)
+        self.assertEqual(importer.stats['follows'], 2)
+
+    def test_dry_run_creates_nothing(self):
+        users = User.objects.count()
+        with mock.patch(
+            'user.importing.ProcessPoolExecutor'
+        ) as executor:
+            importer = self.run_import(
+                jsonl(row('carol', follows=['bob'])), dry_run=True
+            )
+        executor.assert_not_called()
+        self.assertEqual(importer.stats['valid'], 1)
+        self.assertEqual(User.objects.count(), users)
+        self.assertFalse(Follow.objects.exists())